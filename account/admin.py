@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
 from account.models import User, Customer, Consignee, Shipper, Carrier, Agent
+from shipment_module.autocomplete import PrefixAutocompleteMixin
 from shipment_module.models import Shipment
 
 
@@ -31,7 +32,8 @@ class ShipmentInline(admin.TabularInline):
 # User Admin
 # -------------------------
 @admin.register(User)
-class UserModelAdmin(UserAdmin):
+class UserModelAdmin(PrefixAutocompleteMixin, UserAdmin):
+    autocomplete_prefix_fields = ("username",)
     fieldsets = (
         (None, {"fields": ("username", "password")}),
         (_("Personal info"), {"fields": ("first_name", "last_name", "email")}),
@@ -60,7 +62,8 @@ class UserModelAdmin(UserAdmin):
 # Customer Admin
 # -------------------------
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
+    autocomplete_prefix_fields = ("name",)
     list_display = ("name", "email", "phone", "address", "marketing_channel")
     search_fields = ("name", "email", "phone")
     ordering = ("name",)
@@ -71,7 +74,8 @@ class CustomerAdmin(admin.ModelAdmin):
 # Consignee Admin
 # -------------------------
 @admin.register(Consignee)
-class ConsigneeAdmin(admin.ModelAdmin):
+class ConsigneeAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
+    autocomplete_prefix_fields = ("name",)
     list_display = ("name", "national_id", "email", "phone")
     search_fields = ("name", "national_id", "email", "phone")
     ordering = ("name",)
@@ -84,7 +88,8 @@ class ConsigneeAdmin(admin.ModelAdmin):
 # Shipper Admin
 # -------------------------
 @admin.register(Shipper)
-class ShipperAdmin(admin.ModelAdmin):
+class ShipperAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
+    autocomplete_prefix_fields = ("name",)
     list_display = ("name", "email", "phone", "address")
     search_fields = ("name", "email", "phone")
     ordering = ("name",)
@@ -94,12 +99,15 @@ class ShipperAdmin(admin.ModelAdmin):
 # Carrier Admin
 # -------------------------
 @admin.register(Carrier)
-class CarrierAdmin(admin.ModelAdmin):
+class CarrierAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
+    autocomplete_prefix_fields = ("name", "abbreviation")
     list_display = ("name", "abbreviation", "national_id")
     search_fields = ("name", "abbreviation", "national_id")
     ordering = ("name",)
 
 @admin.register(Agent)
-class AgentAdmin(admin.ModelAdmin):
+class AgentAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
+    autocomplete_prefix_fields = ("name", "code")
     list_display = ("id", "name", "code", "email", "phone")
-    search_fields = ("name", "code")
\ No newline at end of file
+    search_fields = ("name", "code")
+    ordering = ("name",)
\ No newline at end of file
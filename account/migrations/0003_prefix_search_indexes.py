@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_consignee_postal_code'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='agent',
+            name='code',
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='agent',
+            name='name',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='carrier',
+            name='abbreviation',
+            field=models.CharField(blank=True, db_index=True, max_length=10, null=True, verbose_name='Abbreviation'),
+        ),
+        migrations.AlterField(
+            model_name='carrier',
+            name='name',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='Carrier Name'),
+        ),
+        migrations.AlterField(
+            model_name='consignee',
+            name='name',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='Name'),
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='name',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='Name'),
+        ),
+        migrations.AlterField(
+            model_name='shipper',
+            name='name',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='Name'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:34
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0003_prefix_search_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='agent',
+            name='code',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='agent',
+            name='name',
+            field=models.CharField(max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='carrier',
+            name='abbreviation',
+            field=models.CharField(blank=True, max_length=10, null=True, verbose_name='Abbreviation'),
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='name',
+            field=models.CharField(max_length=255, verbose_name='Name'),
+        ),
+        migrations.AddIndex(
+            model_name='agent',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='agent_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agent',
+            index=models.Index(django.db.models.functions.text.Lower('code'), name='agent_code_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carrier',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='carrier_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carrier',
+            index=models.Index(django.db.models.functions.text.Lower('abbreviation'), name='carrier_abbreviation_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consignee',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='consignee_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='customer_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipper',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='shipper_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='user_username_lower_idx'),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
 
+from .tracking import DirtyFieldsMixin
+
 
 # Create your models here.
 class User(AbstractUser):
@@ -10,9 +13,11 @@ class User(AbstractUser):
     class Meta:
         verbose_name = "User"
         verbose_name_plural = "1. Users"
+        # Lower() indexes serve the autocomplete prefix search (shipment_module.autocomplete)
+        indexes = [models.Index(Lower("username"), name="user_username_lower_idx")]
 
 
-class Customer(models.Model):
+class Customer(DirtyFieldsMixin, models.Model):
     name = models.CharField(max_length=255, verbose_name=_('Name'))
     about = models.CharField(max_length=255, blank=True, null=True, verbose_name=_('About'))
     address = models.TextField(blank=True, null=True, verbose_name=_('Address'))
@@ -24,13 +29,14 @@ class Customer(models.Model):
     class Meta:
         verbose_name = "Customer"
         verbose_name_plural = "2. Customers"
+        indexes = [models.Index(Lower("name"), name="customer_name_lower_idx")]
 
     def __str__(self):
         return self.name
 
 
-class Shipper(models.Model):
-    name = models.CharField(max_length=255, verbose_name=_('Name'))
+class Shipper(DirtyFieldsMixin, models.Model):
+    name = models.CharField(max_length=255, verbose_name=_('Name'), db_index=True)
     address = models.TextField(blank=True, null=True, verbose_name=_('Address'))
     country = models.CharField(max_length=100, blank=True, null=True, verbose_name=_('Country'))
     phone = models.CharField(max_length=50, blank=True, null=True, verbose_name=_('Phone Number'))
@@ -39,13 +45,14 @@ class Shipper(models.Model):
     class Meta:
         verbose_name = "Shipper"
         verbose_name_plural = "3. Shippers"
+        indexes = [models.Index(Lower("name"), name="shipper_name_lower_idx")]
 
     def __str__(self):
         return self.name
 
 
-class Consignee(models.Model):
-    name = models.CharField(max_length=255, verbose_name=_('Name'))
+class Consignee(DirtyFieldsMixin, models.Model):
+    name = models.CharField(max_length=255, verbose_name=_('Name'), db_index=True)
     company = models.CharField(max_length=255, verbose_name=_('Company'))
     address = models.TextField(blank=True, null=True, verbose_name=_('Address'))
     country = models.CharField(max_length=100, blank=True, null=True, verbose_name=_('Country'))
@@ -57,25 +64,30 @@ class Consignee(models.Model):
     class Meta:
         verbose_name = "Consignee"
         verbose_name_plural = "4. Consignees"
+        indexes = [models.Index(Lower("name"), name="consignee_name_lower_idx")]
 
     def __str__(self):
         return self.name
 
 
-class Carrier(models.Model):
-    name = models.CharField(max_length=255, verbose_name="Carrier Name")
+class Carrier(DirtyFieldsMixin, models.Model):
+    name = models.CharField(max_length=255, verbose_name="Carrier Name", db_index=True)
     national_id = models.CharField(max_length=20, blank=True, null=True, verbose_name="National ID")
     abbreviation = models.CharField(max_length=10, blank=True, null=True, verbose_name="Abbreviation")
 
     class Meta:
         verbose_name = "Carrier"
         verbose_name_plural = "5. Carriers"
+        indexes = [
+            models.Index(Lower("name"), name="carrier_name_lower_idx"),
+            models.Index(Lower("abbreviation"), name="carrier_abbreviation_lower_idx"),
+        ]
 
     def __str__(self):
         return self.name
     
     
-class Agent(models.Model):
+class Agent(DirtyFieldsMixin, models.Model):
     name = models.CharField(max_length=200)
     code = models.CharField(max_length=50, blank=True, null=True)
     phone = models.CharField(max_length=50, blank=True, null=True)
@@ -84,6 +96,10 @@ class Agent(models.Model):
     class Meta:
         verbose_name = "Agent"
         verbose_name_plural = "6. Agents"
+        indexes = [
+            models.Index(Lower("name"), name="agent_name_lower_idx"),
+            models.Index(Lower("code"), name="agent_code_lower_idx"),
+        ]
 
     def __str__(self):
         return self.name
\ No newline at end of file
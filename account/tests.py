@@ -1,3 +1,42 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from .models import Customer
+from .tracking import full_saves
+
+
+def update_sql(queries):
+    return [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+
+
+class DirtyFieldTrackingTests(TestCase):
+    def setUp(self):
+        Customer.objects.create(name="Acme", phone="1")
+        self.customer = Customer.objects.get()
+
+    def test_only_changed_columns_are_written(self):
+        self.customer.phone = "2"
+        with CaptureQueriesContext(connection) as queries:
+            self.customer.save()
+        [sql] = update_sql(queries)
+        self.assertIn('"phone"', sql)
+        self.assertNotIn('"name"', sql)
+        self.assertEqual(self.customer.get_dirty_fields(), [])
+        self.assertEqual(Customer.objects.get().phone, "2")
+
+    def test_unchanged_save_writes_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.customer.save()
+        self.assertEqual(update_sql(queries), [])
+
+    def test_columns_left_out_of_update_fields_stay_dirty(self):
+        self.customer.phone = "2"
+        self.customer.country = "IR"
+        self.customer.save(update_fields=["phone"])
+        self.assertEqual(self.customer.get_dirty_fields(), ["country"])
+
+    def test_full_saves(self):
+        with full_saves(), CaptureQueriesContext(connection) as queries:
+            self.customer.save()
+        self.assertIn('"name"', update_sql(queries)[0])
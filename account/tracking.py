@@ -0,0 +1,104 @@
+import copy
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+_full_saves = ContextVar("full_saves", default=False)
+
+
+@contextmanager
+def full_saves():
+    """Within the block, tracked models write every column again (benchmarks, debugging)."""
+    token = _full_saves.set(True)
+    try:
+        yield
+    finally:
+        _full_saves.reset(token)
+
+
+class DirtyFieldsMixin:
+    """
+    Snapshot the column values a row was loaded with and, on save(), UPDATE
+    only the columns that differ, plus auto_now columns (updated_at).
+
+    Whatever save() derives before calling super().save() (Shipment's
+    transit_time, confirm_date, measure columns) is compared too, so derived
+    columns are written exactly when their value changed.  An explicit
+    update_fields is respected.  New rows, saves to another database and
+    force_insert/force_update saves are written in full.
+
+    `derived_fields` ({field: (fields save() derives from it, ...)}) widens an
+    explicit update_fields by the derived columns that changed with it.
+    """
+    derived_fields = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._take_snapshot()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if getattr(self, "_snapshot", None) is None or fields is None:
+            self._take_snapshot()
+        else:
+            self._take_snapshot(fields)
+
+    def _tracked_fields(self):
+        return [field for field in self._meta.concrete_fields if not field.primary_key]
+
+    def _take_snapshot(self, names=None):
+        # deferred fields are not in __dict__; they are never reported dirty unless assigned
+        snapshot = {
+            field.attname: copy.deepcopy(self.__dict__[field.attname])
+            for field in self._tracked_fields()
+            if field.attname in self.__dict__ and (names is None or field.name in names or field.attname in names)
+        }
+        if names is None:
+            self._snapshot = snapshot
+        else:
+            self._snapshot.update(snapshot)
+
+    def get_dirty_fields(self):
+        """Names of the loaded (or since assigned) fields whose value changed."""
+        snapshot = getattr(self, "_snapshot", None)
+        if snapshot is None:
+            return [field.name for field in self._tracked_fields()]
+        return [
+            field.name
+            for field in self._tracked_fields()
+            if field.attname in self.__dict__
+            and (field.attname not in snapshot or snapshot[field.attname] != self.__dict__[field.attname])
+        ]
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get("using") or self._state.db
+        incremental = (
+            not _full_saves.get()
+            and not self._state.adding
+            and getattr(self, "_snapshot", None) is not None
+            and using == self._state.db
+            and not args
+            and not kwargs.get("force_insert")
+            and not kwargs.get("force_update")
+        )
+        written = None
+        if incremental:
+            dirty = self.get_dirty_fields()
+            if kwargs.get("update_fields") is None:
+                auto_now = [field.name for field in self._tracked_fields() if getattr(field, "auto_now", False)]
+                kwargs["update_fields"] = dirty + auto_now
+            else:
+                requested = list(kwargs["update_fields"])
+                derived = [name for source in requested for name in self.derived_fields.get(source, ()) if name in dirty]
+                kwargs["update_fields"] = requested + derived
+            kwargs["update_fields"] = written = list(dict.fromkeys(kwargs["update_fields"]))
+        elif kwargs.get("update_fields") is not None:
+            written = list(kwargs["update_fields"])
+        super().save(*args, **kwargs)
+        if written is None or getattr(self, "_snapshot", None) is None:
+            self._take_snapshot()
+        else:
+            # columns left out of update_fields stay dirty
+            self._take_snapshot(written)
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import json
 import os
 from pathlib import Path
 from decouple import config
@@ -48,6 +49,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # first, so the session/auth queries of a request are counted too; off unless INSTRUMENTATION_ENABLED
+    "shipment_module.instrumentation.InstrumentationMiddleware",
+    # before sessions/auth, so their reads follow the request's routing too; a no-op without a replica
+    "shipment_module.routing.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -78,11 +83,34 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections are kept open for DATABASE_CONN_MAX_AGE seconds (0 = one per
+# request, None = forever) and pinged before reuse when health checks are on.
+DATABASE_CONN_MAX_AGE = config(
+    "DATABASE_CONN_MAX_AGE", default="60", cast=lambda v: None if v.lower() == "none" else int(v)
+)
+DATABASE_CONN_HEALTH_CHECKS = config("DATABASE_CONN_HEALTH_CHECKS", default=True, cast=bool)
+
 if config('DATABASE') == 'SQLITE':
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DATABASE_CONN_HEALTH_CHECKS,
+            'OPTIONS': {
+                # seconds a writer waits for the lock (busy_timeout) instead of failing with "database is locked"
+                'timeout': config("SQLITE_BUSY_TIMEOUT", default=5, cast=float),
+                # take the write lock at BEGIN, so a reader never has to upgrade mid-transaction and deadlock
+                'transaction_mode': config("SQLITE_TRANSACTION_MODE", default="IMMEDIATE"),
+                # run on every new connection; WAL lets readers proceed while one writer commits
+                'init_command': ";".join([
+                    f"PRAGMA journal_mode={config('SQLITE_JOURNAL_MODE', default='WAL')}",
+                    "PRAGMA synchronous=NORMAL",
+                    f"PRAGMA cache_size=-{config('SQLITE_CACHE_KB', default=20000, cast=int)}",
+                    "PRAGMA temp_store=MEMORY",
+                    f"PRAGMA mmap_size={config('SQLITE_MMAP_BYTES', default=128 * 1024 * 1024, cast=int)}",
+                ]),
+            },
         }
     }
 elif config('DATABASE') == 'MYSQL':
@@ -94,8 +122,62 @@ elif config('DATABASE') == 'MYSQL':
             'PASSWORD': config('DATABASE_PASSWORD'),
             'HOST': config('DATABASE_HOST'),
             'PORT': config('DATABASE_PORT'),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DATABASE_CONN_HEALTH_CHECKS,
         }
     }
+    # Optional pool shared by the threads of a worker (django-db-connection-pool);
+    # connections go back to the pool at the end of each request.
+    if config("DATABASE_POOL", default=False, cast=bool):
+        from importlib.util import find_spec
+        from django.core.exceptions import ImproperlyConfigured
+
+        if find_spec("dj_db_conn_pool") is None:
+            raise ImproperlyConfigured(
+                "DATABASE_POOL requires django-db-connection-pool (pip install django-db-connection-pool[mysql])."
+            )
+        DATABASES['default'].update({
+            'ENGINE': 'dj_db_conn_pool.backends.mysql',
+            'CONN_MAX_AGE': 0,
+            'POOL_OPTIONS': {
+                'POOL_SIZE': config("DATABASE_POOL_SIZE", default=10, cast=int),
+                'MAX_OVERFLOW': config("DATABASE_POOL_MAX_OVERFLOW", default=10, cast=int),
+                'RECYCLE': config("DATABASE_POOL_RECYCLE", default=3600, cast=int),
+                'PRE_PING': DATABASE_CONN_HEALTH_CHECKS,
+            },
+        })
+
+# Optional read replica.  Read-only views, exports and reports read from it
+# (shipment_module.routing); writes, transactions and the ref allocator stay
+# on the primary.  For SQLite a second file stands in for the replica.
+if config("DATABASE_REPLICA_NAME", default="") or config("DATABASE_REPLICA_HOST", default=""):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': config("DATABASE_REPLICA_NAME", default=str(DATABASES['default']['NAME'])),
+    }
+    if config('DATABASE') == 'MYSQL':
+        DATABASES['replica'].update({
+            'HOST': config("DATABASE_REPLICA_HOST", default=DATABASES['default']['HOST']),
+            'PORT': config("DATABASE_REPLICA_PORT", default=DATABASES['default']['PORT']),
+            'USER': config("DATABASE_REPLICA_USER", default=DATABASES['default']['USER']),
+            'PASSWORD': config("DATABASE_REPLICA_PASSWORD", default=DATABASES['default']['PASSWORD']),
+            # tests read the primary's test database through the replica alias
+            'TEST': {'MIRROR': 'default'},
+        })
+REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+DATABASE_ROUTERS = ["shipment_module.routing.ReplicaRouter"]
+REPLICA_VIEWS = config(
+    "REPLICA_VIEWS",
+    default=(
+        "admin:shipment_module_shipment_changelist,admin:shipment_module_shipment_export_stream,"
+        "admin:shipment_module_lanemonthlyrollup_changelist,admin:shipment_module_console_planner,"
+        "shipment:manifest-*,shipment:invoice-*,shipment:api-shipment-list"
+    ),
+    cast=lambda v: [s.strip() for s in v.split(",") if s.strip()],
+)
+# after a request writes, that browser reads from the primary for this long (replica lag margin)
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=15, cast=int)
+REPLICA_STICKY_COOKIE = "primary_reads"
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -147,6 +229,71 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "account.User"
 
 X_FRAME_OPTIONS = "SAMEORIGIN"
+# exports (import-export and the streaming CSV) need <app>.export_<model>
+IMPORT_EXPORT_EXPORT_PERMISSION_CODE = "export"
 SILENCED_SYSTEM_CHECKS = ["security.W019"]
 
-MANAGER_PHONE = config("MANAGER_PHONE")
\ No newline at end of file
+MANAGER_PHONE = config("MANAGER_PHONE")
+# SMS outbox, drained by `manage.py drain_sms_outbox`
+SMS_GATEWAY = config("SMS_GATEWAY", default="shipment_module.utils.ConsoleSmsGateway")
+SMS_BATCH_SIZE = config("SMS_BATCH_SIZE", default=50, cast=int)
+SMS_RATE_LIMIT = config("SMS_RATE_LIMIT", default=10, cast=float)  # messages per second, 0 = unlimited
+SMS_MAX_ATTEMPTS = config("SMS_MAX_ATTEMPTS", default=5, cast=int)
+SMS_RETRY_BACKOFF = config("SMS_RETRY_BACKOFF", default=30, cast=int)  # seconds, doubled per attempt
+
+# USD value of one unit of each Charge currency, used for Shipment.charges_total_usd,
+# e.g. CHARGE_USD_RATES='{"USD": 1, "EUR": 1.08, "AED": 0.2723}'
+CHARGE_USD_RATES = config("CHARGE_USD_RATES", default='{"USD": 1}', cast=json.loads)
+
+# Shared cache for version stamps, cached counts/facets/invoices and lookup choices.
+# CACHE_BACKEND=file keeps entries across restarts and shares them between worker processes.
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+}
+CACHE_BACKEND = config("CACHE_BACKEND", default="locmem")
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[CACHE_BACKEND],
+        "LOCATION": config(
+            "CACHE_LOCATION",
+            default=os.path.join(BASE_DIR, "cache") if CACHE_BACKEND == "file" else "anibar",
+        ),
+        "TIMEOUT": config("CACHE_TIMEOUT", default=300, cast=int),
+        "OPTIONS": {"MAX_ENTRIES": config("CACHE_MAX_ENTRIES", default=10000, cast=int)},
+    }
+}
+
+# Change feed: rows stamped this recently (seconds) wait for the next pull, so
+# transactions still committing cannot slip behind a consumer's cursor
+CHANGE_FEED_LAG = config("CHANGE_FEED_LAG", default=5, cast=int)
+
+# Request instrumentation (wall time, queries, SQL time, repeated statements) for
+# the views matching INSTRUMENTED_VIEWS; one JSON line per request goes to
+# INSTRUMENTATION_LOG and totals to the staff page at /shipment/instrumentation/
+INSTRUMENTATION_ENABLED = config("INSTRUMENTATION_ENABLED", default=False, cast=bool)
+INSTRUMENTED_VIEWS = config(
+    "INSTRUMENTED_VIEWS",
+    default="admin:shipment_module_shipment_*,shipment:manifest-*,shipment:invoice-*",
+    cast=lambda v: [s.strip() for s in v.split(",") if s.strip()],
+)
+# a statement run this many times in one request is reported as a likely N+1
+INSTRUMENTATION_DUPLICATE_THRESHOLD = config("INSTRUMENTATION_DUPLICATE_THRESHOLD", default=3, cast=int)
+INSTRUMENTATION_LOG = config("INSTRUMENTATION_LOG", default=os.path.join(BASE_DIR, "instrumentation.log"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "instrumentation": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": INSTRUMENTATION_LOG,
+            "maxBytes": config("INSTRUMENTATION_LOG_BYTES", default=10 * 1024 * 1024, cast=int),
+            "backupCount": config("INSTRUMENTATION_LOG_BACKUPS", default=5, cast=int),
+            "delay": True,  # no file until something is logged
+        },
+    },
+    "loggers": {
+        "shipment_module.instrumentation": {"handlers": ["instrumentation"], "level": "INFO", "propagate": False},
+    },
+}
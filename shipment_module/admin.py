@@ -1,7 +1,18 @@
-from django.contrib import admin
-from django.urls import reverse
+import copy
+from functools import lru_cache
+
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.db import connection
+from django.db.models import Count
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.urls import get_script_prefix, path, reverse
 from import_export.admin import ImportExportModelAdmin
-from django.utils.html import format_html
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
 
 
 from .models import (
@@ -12,8 +23,38 @@ from .models import (
     Console,
     Charge,
     ShipmentComment,
+    OutboundMessage,
+    LaneMonthlyRollup,
+    RollupState,
 )
+from .caching import record_form_queries
+from .exports import streaming_export_response
+from .autocomplete import PrefixAutocompleteMixin
+from .bulk import add_operators, bulk_update_shipments, confirm_shipments
+from .consoles import console_members, console_summary, flag_outliers, move_shipments
+from .filters import FacetRelatedFieldListFilter
+from .forms import BulkUpdateForm
+from .invoices import invoice_page, invoice_queryset
+from .manifest import batch_manifest_response
+from .paginators import CachedCountPaginator
+from .rollups import ROLLUP_GROUPS, ROLLUP_NAME, rollup_summary
+from .routing import replica_reads
 from .resources import ShipmentModelResource
+from .search import search_shipments
+from .utils import QueryCounter
+
+
+MANIFEST_PK_PLACEHOLDER = 987654321
+
+
+@lru_cache(maxsize=8)
+def manifest_url_template(script_prefix):
+    # reversed once per script prefix; rows only substitute their pk
+    return reverse("shipment:manifest-detail", args=[MANIFEST_PK_PLACEHOLDER])
+
+
+def manifest_url(pk):
+    return manifest_url_template(get_script_prefix()).replace(str(MANIFEST_PK_PLACEHOLDER), str(pk))
 
 
 # -------------------------------
@@ -41,9 +82,12 @@ class CommentInline(admin.TabularInline):
 @admin.register(Shipment)
 class ShipmentAdmin(ImportExportModelAdmin):
     resource_class = ShipmentModelResource
-    filter_horizontal = ("operators",)
     inlines = [ChargeInline, CommentInline]
-    autocomplete_fields = ['shipper', 'hawb_shipper', 'cnee', 'hawb_cnee']
+    # every relation is an autocomplete widget: the form only renders the selected rows
+    autocomplete_fields = [
+        'client', 'sp', 'pol', 'pod', 'term', 'carrier', 'agent', 'console',
+        'shipper', 'hawb_shipper', 'cnee', 'hawb_cnee', 'operators',
+    ]
 
     list_display = (
         "ref",
@@ -75,16 +119,16 @@ class ShipmentAdmin(ImportExportModelAdmin):
     list_filter = (
         "confirmed",
         "inq_replied",
-        "client",
-        "carrier",
-        "agent",
-        "console",
-        "pol",
-        "pod",
-        "term",
+        ("client", FacetRelatedFieldListFilter),
+        ("carrier", FacetRelatedFieldListFilter),
+        ("agent", FacetRelatedFieldListFilter),
+        ("console", FacetRelatedFieldListFilter),
+        ("pol", FacetRelatedFieldListFilter),
+        ("pod", FacetRelatedFieldListFilter),
+        ("term", FacetRelatedFieldListFilter),
         "priority",
         "eta",
-        "sp",
+        ("sp", FacetRelatedFieldListFilter),
     )
 
     search_fields = (
@@ -102,7 +146,12 @@ class ShipmentAdmin(ImportExportModelAdmin):
 
     search_help_text = "Search by Ref, Client, S/P, MAWB, HAWB, Shipper, Consignee, or Carrier"
     list_per_page = 50
-    readonly_fields = ("transit_time", "manifest_download_link")
+    # one joined query per page for every FK in list_display
+    list_select_related = ("client", "sp", "carrier", "agent", "console", "pol", "pod", "term")
+    # counts come from CachedCountPaginator; skip the second unfiltered COUNT(*)
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ("transit_time", "manifest_download_link", "charge_totals_display", "charges_total_usd")
 
     fieldsets = (
         ("1. Basic Details", {
@@ -120,10 +169,146 @@ class ShipmentAdmin(ImportExportModelAdmin):
                 
             )
         }),
+        ("3. Charge Totals", {
+            "fields": ("charge_totals_display", "charges_total_usd"),
+        }),
     )
 
     
 
+    # read-only actions read from the replica (see routing.py)
+    actions = [
+        "export_selected_csv", "download_manifests", "download_manifests_zip", "print_invoices",
+        "bulk_confirm", "bulk_set_priority", "bulk_assign_console", "bulk_assign_carrier", "bulk_add_operators",
+    ]
+
+    def get_urls(self):
+        urls = [
+            path(
+                "export-stream/",
+                self.admin_site.admin_view(self.export_stream_view),
+                name="shipment_module_shipment_export_stream",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def export_stream_view(self, request):
+        """
+        Stream every shipment matching the changelist filters/search in the query
+        string, e.g. export-stream/?confirmed__exact=1&file_format=xlsx
+        """
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+        params = request.GET.copy()
+        file_format = params.pop("file_format", ["csv"])[-1]
+        # ChangeList reads its filters from request.GET; hand it a copy of the
+        # request carrying only the changelist parameters
+        changelist_request = copy.copy(request)
+        changelist_request.GET = params
+        try:
+            queryset = self.get_changelist_instance(changelist_request).get_queryset(changelist_request)
+            return streaming_export_response(queryset, file_format)
+        except (IncorrectLookupParameters, ImproperlyConfigured, ValueError) as e:
+            return HttpResponseBadRequest(str(e))
+
+    @admin.action(description="Export selected shipments (streaming CSV)", permissions=["export"])
+    @replica_reads()
+    def export_selected_csv(self, request, queryset):
+        return streaming_export_response(queryset, "csv")
+
+    @admin.action(description="Download manifests of selected shipments (one file)")
+    @replica_reads()
+    def download_manifests(self, request, queryset):
+        return batch_manifest_response(queryset)
+
+    @admin.action(description="Download manifests of selected shipments (ZIP)")
+    @replica_reads()
+    def download_manifests_zip(self, request, queryset):
+        return batch_manifest_response(queryset, as_zip=True)
+
+    @admin.action(description="Print invoices of selected shipments")
+    @replica_reads()
+    def print_invoices(self, request, queryset):
+        return HttpResponse(invoice_page(invoice_queryset(queryset).order_by("ref", "pk"), request))
+
+    # bulk edits: one UPDATE per 1000 selected rows instead of a save() per row (see bulk.py)
+    @admin.action(description="Confirm selected shipments", permissions=["change"])
+    def bulk_confirm(self, request, queryset):
+        updated = confirm_shipments(queryset)
+        self.message_user(request, f"{updated} shipment(s) confirmed.")
+
+    @admin.action(description="Set priority of selected shipments", permissions=["change"])
+    def bulk_set_priority(self, request, queryset):
+        return self.bulk_update_action(request, queryset, "priority", "bulk_set_priority")
+
+    @admin.action(description="Assign console to selected shipments", permissions=["change"])
+    def bulk_assign_console(self, request, queryset):
+        return self.bulk_update_action(request, queryset, "console", "bulk_assign_console")
+
+    @admin.action(description="Assign carrier to selected shipments", permissions=["change"])
+    def bulk_assign_carrier(self, request, queryset):
+        return self.bulk_update_action(request, queryset, "carrier", "bulk_assign_carrier")
+
+    @admin.action(description="Add operators to selected shipments", permissions=["change"])
+    def bulk_add_operators(self, request, queryset):
+        return self.bulk_update_action(request, queryset, "operators", "bulk_add_operators")
+
+    def bulk_update_action(self, request, queryset, field_name, action):
+        """Ask for the new value on an intermediate page, then apply it to the selection."""
+        form = BulkUpdateForm(
+            request.POST if "apply" in request.POST else None, field_name=field_name, admin_site=self.admin_site
+        )
+        if form.is_valid():
+            value = form.cleaned_data["value"]
+            if field_name == "operators":
+                updated = add_operators(queryset, value)
+            else:
+                updated = bulk_update_shipments(queryset, **{field_name: value})
+            self.message_user(request, f"{updated} shipment(s) updated.")
+            return None
+
+        select_across = request.POST.get("select_across") == "1"
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": self.get_action(action)[2],
+            "form": form,
+            "media": self.media + form.media,
+            "action": action,
+            "select_across": select_across,
+            "count": queryset.count(),
+            "selected": [] if select_across else request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, "admin/shipment_module/bulk_update.html", context)
+
+    def process_result(self, result, request):
+        stats = getattr(result, "lookup_cache_stats", None)
+        if stats:
+            self.message_user(
+                request,
+                "Lookup cache: {hits} hits, {misses} misses, {created} created, {queries} queries".format(**stats),
+            )
+        return super().process_result(result, request)
+
+    def get_search_results(self, request, queryset, search_term):
+        # full-text index (FTS5 / FULLTEXT) instead of OR'ed LIKE '%term%' over seven joins
+        if search_term:
+            matched = search_shipments(queryset, search_term)
+            if matched is not None:
+                return matched, False
+        return super().get_search_results(request, queryset, search_term)
+
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().changeform_view(request, object_id, form_url, extra_context)
+            # count the queries made while rendering the form too
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        record_form_queries(self.model, request.method, counter.count)
+        return response
+
     # store current request for comment inline to use
     def get_form(self, request, obj=None, **kwargs):
         self._current_request = request
@@ -161,7 +346,7 @@ class ShipmentAdmin(ImportExportModelAdmin):
     def manifest_link(self, obj):
         if not obj.pk:
             return "-"
-        url = reverse("shipment:manifest-detail", args=[obj.pk])
+        url = manifest_url(obj.pk)
         return format_html(
         '<a href="{}" download '
         'style="color:#0073aa; font-weight:bold; text-decoration:underline;">'
@@ -187,33 +372,188 @@ class ShipmentAdmin(ImportExportModelAdmin):
         )
     manifest_download_link.short_description = ""
 
+    # === 3. CHARGE TOTALS (maintained from the Charge rows) ===
+    def charge_totals_display(self, obj):
+        if not obj.charge_totals:
+            return "-"
+        return format_html_join(", ", "{} {}", ((amount, currency) for currency, amount in obj.charge_totals.items()))
+    charge_totals_display.short_description = "Charge Totals"
+
 
 # -------------------------------
 # Supporting Models
 # -------------------------------
 @admin.register(PolList)
-class PolListAdmin(admin.ModelAdmin):
+class PolListAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
+    autocomplete_prefix_fields = ("data", "airport_abbr")
     list_display = ("data", "country_name", "country_abbr", "airport_abbr")
     search_fields = ("data", "country_name", "airport_abbr")
     ordering = ("data",)
 
 
 @admin.register(PodList)
-class PodListAdmin(admin.ModelAdmin):
+class PodListAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
+    autocomplete_prefix_fields = ("data", "airport_abbr")
     list_display = ("data", "country_name", "country_abbr", "airport_abbr")
     search_fields = ("data", "country_name", "airport_abbr")
     ordering = ("data",)
 
 
 @admin.register(TermList)
-class TermListAdmin(admin.ModelAdmin):
+class TermListAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
+    autocomplete_prefix_fields = ("data",)
     list_display = ("data",)
     search_fields = ("data",)
     ordering = ("data",)
 
 
 @admin.register(Console)
-class ConsoleAdmin(admin.ModelAdmin):
-    list_display = ("id", "code", "created_at")
+class ConsoleAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
+    autocomplete_prefix_fields = ("code",)
+    list_display = ("id", "code", "shipment_count", "created_at", "planner_link")
     search_fields = ("code",)
     ordering = ("-created_at",)
+    actions = ["download_manifests", "download_manifests_zip"]
+
+    def is_changelist(self, request):
+        match = getattr(request, "resolver_match", None)
+        return match is not None and match.url_name == "shipment_module_console_changelist"
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # only the changelist shows the count; autocomplete, the change form
+        # and the planner skip the GROUP BY
+        if self.is_changelist(request):
+            queryset = queryset.annotate(shipment_count=Count("shipment"))
+        return queryset
+
+    @admin.display(description="Shipments", ordering="shipment_count")
+    def shipment_count(self, obj):
+        return obj.shipment_count
+
+    @admin.display(description="Planner")
+    def planner_link(self, obj):
+        return format_html('<a href="{}">Open</a>', reverse("admin:shipment_module_console_planner", args=[obj.pk]))
+
+    def get_urls(self):
+        urls = [
+            path(
+                "<path:object_id>/planner/",
+                self.admin_site.admin_view(self.planner_view),
+                name="shipment_module_console_planner",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def planner_view(self, request, object_id):
+        """
+        Member shipments of one console with their totals and outliers; the
+        selected ones can be moved to another console (or detached) at once.
+        """
+        console = self.get_object(request, object_id)
+        if console is None or not self.has_view_permission(request, console):
+            raise PermissionDenied
+        can_move = request.user.has_perm("shipment_module.change_shipment")
+
+        form = BulkUpdateForm(
+            request.POST if request.method == "POST" else None, field_name="console", admin_site=self.admin_site
+        )
+        if request.method == "POST":
+            if not can_move:
+                raise PermissionDenied
+            selected = [pk for pk in request.POST.getlist("shipments") if pk.strip().isdigit()]
+            if not selected:
+                self.message_user(request, "Select the shipments to move.", messages.WARNING)
+            elif form.is_valid():
+                target = form.cleaned_data["value"]
+                moved = move_shipments(console, selected, target)
+                self.message_user(request, f"{moved} shipment(s) moved to {target.code if target else 'no console'}.")
+                return HttpResponseRedirect(request.path)
+
+        rows = flag_outliers(console_members(console))
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": f"Console {console.code}",
+            "console": console,
+            "rows": rows,
+            "summary": console_summary(rows),
+            "outliers": sum(1 for row in rows if row["flags"]),
+            "form": form,
+            "can_move": can_move,
+            "media": self.media + form.media,
+        }
+        return TemplateResponse(request, "admin/shipment_module/console_planner.html", context)
+
+    @admin.action(description="Download manifests of selected consoles (one file)")
+    @replica_reads()
+    def download_manifests(self, request, queryset):
+        return batch_manifest_response(Shipment.objects.filter(console__in=queryset), filename="Console_Manifests")
+
+    @admin.action(description="Download manifests of selected consoles (ZIP)")
+    @replica_reads()
+    def download_manifests_zip(self, request, queryset):
+        return batch_manifest_response(Shipment.objects.filter(console__in=queryset), as_zip=True, filename="Console_Manifests")
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ("recipient", "status", "attempts", "next_attempt_at", "sent_at", "created_at")
+    list_filter = ("status",)
+    search_fields = ("recipient",)
+    readonly_fields = ("recipient", "body", "attempts", "last_error", "created_at", "sent_at")
+    actions = ["retry_now"]
+
+    @admin.action(description="Retry selected messages now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutboundMessage.SENT).update(
+            status=OutboundMessage.PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} message(s) queued for retry.")
+
+
+@admin.register(LaneMonthlyRollup)
+class LaneMonthlyRollupAdmin(admin.ModelAdmin):
+    """
+    Lane / carrier analytics, read from the rollup table refresh_rollups
+    keeps up to date, never from Shipment itself.
+    """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        by = request.GET.get("by", "lane")
+        if by not in ROLLUP_GROUPS:
+            return HttpResponseBadRequest(f"by must be one of {', '.join(ROLLUP_GROUPS)}")
+        months = {}
+        for name in ("from", "to"):
+            value = request.GET.get(name)
+            if value:
+                try:
+                    months[name] = timezone.datetime.strptime(value, "%Y-%m").date()
+                except ValueError:
+                    return HttpResponseBadRequest(f"{name}: expected YYYY-MM")
+
+        state = RollupState.objects.filter(name=ROLLUP_NAME).first()
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Lane Analytics",
+            "rows": rollup_summary(by, months.get("from"), months.get("to")),
+            "by": by,
+            "groups": list(ROLLUP_GROUPS),
+            "month_from": request.GET.get("from", ""),
+            "month_to": request.GET.get("to", ""),
+            "refreshed_until": state.refreshed_until if state else None,
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, "admin/shipment_module/rollup_dashboard.html", context)
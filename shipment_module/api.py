@@ -0,0 +1,192 @@
+import base64
+import hashlib
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Shipment
+
+
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 1000
+
+# field name in the API -> ORM path; related fields are flattened to their label
+API_FIELDS = {
+    "id": "id",
+    "ref": "ref",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "client": "client__name",
+    "client_id": "client_id",
+    "sp": "sp__username",
+    "pol": "pol__data",
+    "pod": "pod__data",
+    "term": "term__data",
+    "carrier": "carrier__name",
+    "agent": "agent__name",
+    "console": "console__code",
+    "shipper": "shipper__name",
+    "cnee": "cnee__name",
+    "priority": "priority",
+    "mode": "mode",
+    "inq_replied": "inq_replied",
+    "confirmed": "confirmed",
+    "confirm_date": "confirm_date",
+    "mawb": "mawb",
+    "hawb": "hawb",
+    "etd": "etd",
+    "eta": "eta",
+    "transit_time": "transit_time",
+    "pcs": "pcs",
+    "gw": "gw",
+    "cw": "cw",
+    "vol": "vol",
+    "commodity": "commodity",
+    "pcs_num": "pcs_num",
+    "gw_kg": "gw_kg",
+    "cw_kg": "cw_kg",
+    "vol_cbm": "vol_cbm",
+    "charge_totals": "charge_totals",
+    "charges_total_usd": "charges_total_usd",
+}
+API_DEFAULT_FIELDS = ("id", "ref", "created_at", "client", "pol", "pod", "carrier", "confirmed", "etd", "eta", "priority")
+
+
+# -------------------------------
+# Filters
+# -------------------------------
+def list_filter_fields(list_filter):
+    """Field names of a ModelAdmin.list_filter ("confirmed", ("client", SomeFilter), ...)."""
+    return [entry[0] if isinstance(entry, (list, tuple)) else entry for entry in list_filter]
+
+
+def parse_bool(value):
+    if value.lower() in ("1", "true", "yes"):
+        return True
+    if value.lower() in ("0", "false", "no"):
+        return False
+    raise ValidationError(f"expected a boolean, got {value!r}")
+
+
+def build_filters(params, field_names):
+    """
+    Query-string filters for the list_filter fields:
+    booleans and choices by value (?confirmed=1&priority=red), relations by
+    id (?client=12, ?client=none for no relation) and dates by range
+    (?eta_after=2025-01-01&eta_before=2025-02-01, both inclusive).
+    """
+    condition = Q()
+    for name in field_names:
+        field = Shipment._meta.get_field(name)
+        if isinstance(field, models.DateField):
+            for suffix, lookup in (("after", "gte"), ("before", "lte")):
+                value = params.get(f"{name}_{suffix}")
+                if value:
+                    day = parse_date(value)
+                    if day is None:
+                        raise ValidationError(f"{name}_{suffix}: expected YYYY-MM-DD")
+                    condition &= Q(**{f"{name}__{lookup}": day})
+            continue
+
+        value = params.get(name)
+        if not value:
+            continue
+        if isinstance(field, models.BooleanField):
+            condition &= Q(**{name: parse_bool(value)})
+        elif field.is_relation:
+            if value.lower() == "none":
+                condition &= Q(**{f"{name}__isnull": True})
+            elif value.isdigit():
+                condition &= Q(**{field.attname: int(value)})
+            else:
+                raise ValidationError(f"{name}: expected an id or 'none'")
+        else:
+            if field.choices and value not in dict(field.choices):
+                raise ValidationError(f"{name}: expected one of {', '.join(dict(field.choices))}")
+            condition &= Q(**{name: value})
+    return condition
+
+
+# -------------------------------
+# Keyset cursors
+# -------------------------------
+# Pages are ordered by (-created_at, -id), the shipment_created_idx order,
+# and the cursor holds the last row's key: the next page is a range scan
+# from there, whatever its depth, instead of OFFSET skipping rows.
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split("|")
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError):
+        created_at = None
+    if created_at is None:
+        raise ValidationError("invalid cursor")
+    return created_at, pk
+
+
+def parse_fields(value):
+    if not value:
+        return list(API_DEFAULT_FIELDS)
+    fields = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown:
+        raise ValidationError(f"unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def parse_limit(value):
+    if not value:
+        return API_DEFAULT_LIMIT
+    if not value.isdigit() or not 1 <= int(value) <= API_MAX_LIMIT:
+        raise ValidationError(f"limit must be between 1 and {API_MAX_LIMIT}")
+    return int(value)
+
+
+def shipment_page(params, filter_fields, queryset=None):
+    """
+    One page of shipments as {"results": [...], "next": cursor or None}.
+    Only the requested fields (plus the key) are selected, in one query.
+    """
+    fields = parse_fields(params.get("fields"))
+    limit = parse_limit(params.get("limit"))
+    queryset = Shipment.objects.all() if queryset is None else queryset
+    queryset = queryset.filter(build_filters(params, filter_fields))
+
+    if params.get("cursor"):
+        created_at, pk = decode_cursor(params["cursor"])
+        # (created_at, id) < cursor, written so the leading created_at bound is a plain range seek
+        queryset = queryset.filter(
+            Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(pk__lt=pk))
+        )
+
+    paths = {API_FIELDS[name]: name for name in fields}
+    rows = list(
+        queryset.order_by("-created_at", "-pk")
+        .values(*dict.fromkeys(["created_at", "pk", *paths]))[:limit + 1]
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["pk"])
+
+    return {
+        "results": [{paths[path]: row[path] for path in paths} for row in rows],
+        "next": next_cursor,
+    }
+
+
+def render_page(page):
+    """JSON body and its ETag."""
+    body = json.dumps(page, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return body, '"%s"' % hashlib.md5(body.encode()).hexdigest()
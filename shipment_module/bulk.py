@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .caching import bump_version
+from .invoices import evict_invoices
+from .models import Shipment
+from .search import SEARCH_RELATED, refresh_index
+
+
+# ids per UPDATE; keeps the IN list under every backend's parameter limit
+BULK_CHUNK_SIZE = 1000
+
+# Fields Shipment.apply_derived_fields() reads; a bulk update touching one of
+# them would have to recompute what save() derives from it.  "confirmed" is
+# handled by confirm_shipments(); the others are not bulk-editable.
+DERIVED_INPUTS = {"confirmed", "etdw", "eta", "pcs", "gw", "first_gw", "vol", "cw", "first_cw"}
+
+
+# -------------------------------
+# Bulk writes
+# -------------------------------
+# One UPDATE ... WHERE id IN (...) per chunk instead of a full save() per row.
+# updated_at is set in the same statement, which is what the change feed,
+# the rollups and the invoice cache key on; after_bulk_write() does the rest
+# of what the post_save signals would have done.
+def _chunks(queryset):
+    pks = list(queryset.order_by().values_list("pk", flat=True))
+    for start in range(0, len(pks), BULK_CHUNK_SIZE):
+        yield pks[start:start + BULK_CHUNK_SIZE]
+
+
+def after_bulk_write(pks, fields):
+    bump_version("shipment")
+    evict_invoices(pks)
+    if set(fields) & set(SEARCH_RELATED):
+        refresh_index(Shipment.objects.filter(pk__in=pks))
+
+
+def bulk_update_shipments(queryset, **values):
+    """Set `values` on every shipment in `queryset`; returns the number updated."""
+    if set(values) & DERIVED_INPUTS:
+        raise ValueError(f"{', '.join(set(values) & DERIVED_INPUTS)} feed derived fields; use save()")
+    updated = 0
+    for pks in _chunks(queryset):
+        with transaction.atomic():
+            updated += Shipment.objects.filter(pk__in=pks).update(**values, updated_at=timezone.now())
+            after_bulk_write(pks, values)
+    return updated
+
+
+def confirm_shipments(queryset):
+    """
+    Confirm the unconfirmed shipments in `queryset`.  As in save(), a
+    confirm_date already set is kept and a missing one becomes now.
+    """
+    updated = 0
+    for pks in _chunks(queryset.filter(confirmed=False)):
+        now = timezone.now()
+        with transaction.atomic():
+            updated += Shipment.objects.filter(pk__in=pks).update(
+                confirmed=True,
+                confirm_date=Coalesce(F("confirm_date"), Value(now, output_field=DateTimeField())),
+                updated_at=now,
+            )
+            after_bulk_write(pks, ["confirmed", "confirm_date"])
+    return updated
+
+
+def add_operators(queryset, users):
+    """Add `users` to the operators of every shipment in `queryset` (existing links are kept)."""
+    through = Shipment.operators.through
+    updated = 0
+    for pks in _chunks(queryset):
+        with transaction.atomic():
+            through.objects.bulk_create(
+                [through(shipment_id=pk, user_id=user.pk) for pk in pks for user in users],
+                ignore_conflicts=True,
+            )
+            updated += Shipment.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+            after_bulk_write(pks, ["operators"])
+    return updated
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import cache
+
+
+# -------------------------------
+# Version stamps
+# -------------------------------
+# Cached values embed the current version of the table they were computed
+# from; writes bump the version, so stale entries are simply never read again.
+def get_version(name):
+    key = f"version:{name}"
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_version(name):
+    key = f"version:{name}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+# -------------------------------
+# Metrics
+# -------------------------------
+# Counters live in the shared cache so every worker process adds to the same
+# numbers; `manage.py lookup_cache_stats` reads them.
+def incr_metric(name, delta=1):
+    key = f"metric:{name}"
+    if cache.add(key, delta, None):
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+
+
+def get_metrics(names):
+    values = cache.get_many([f"metric:{name}" for name in names])
+    return {name: values.get(f"metric:{name}", 0) for name in names}
+
+
+def form_metric_names(model, method):
+    prefix = f"form:{model._meta.label_lower}:{method}"
+    return f"{prefix}:renders", f"{prefix}:queries"
+
+
+def record_form_queries(model, method, queries):
+    renders, total = form_metric_names(model, method)
+    incr_metric(renders)
+    incr_metric(total, queries)
+
+
+def reset_metrics(names):
+    cache.delete_many([f"metric:{name}" for name in names])
+
+
+
+# -------------------------------
+# In-process LRU
+# -------------------------------
+class VersionedLRU:
+    """
+    In-process LRU in front of the shared cache, for small values read over
+    and over (autocomplete result pages).  Looked up locally, then in the
+    shared cache, then computed.  Keys embed the version stamp of the table
+    the value came from, which the post_save/post_delete signals bump, so
+    entries of an older version are never asked for again and age out.  Local
+    entries also expire after `local_timeout` seconds, which bounds what a
+    worker can serve after the shared cache (and its stamps) is flushed.
+    Hits and misses are counted in-process and added to the shared metrics
+    at most every `flush_interval` seconds, so a local hit stays local.
+    """
+
+    def __init__(self, maxsize=512, timeout=300, local_timeout=60, flush_interval=10):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.local_timeout = local_timeout
+        self.flush_interval = flush_interval
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._flushed_at = time.monotonic()
+
+    def get_or_set(self, key, compute, metric, store=True):
+        """
+        Value of `key`, computing it with `compute()` on a miss; counts
+        metric:<metric>:local_hits / shared_hits / misses.  With store=False
+        (values read from a replica) a miss is computed but kept nowhere.
+        """
+        now = time.monotonic()
+        with self._lock:
+            expires, value = self._local.get(key, (0, None))
+            if expires > now:
+                self._local.move_to_end(key)
+        if expires > now:
+            self._count(f"{metric}:local_hits", now)
+            return value
+
+        value = cache.get(key)
+        if value is None:
+            self._count(f"{metric}:misses", now)
+            value = compute()
+            if not store:
+                return value
+            cache.set(key, value, self.timeout)
+        else:
+            self._count(f"{metric}:shared_hits", now)
+
+        with self._lock:
+            self._local[key] = (now + self.local_timeout, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+        return value
+
+    def _count(self, name, now):
+        with self._lock:
+            self._counts[name] += 1
+            due = now - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Add the counts gathered since the last flush to the shared metrics."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._flushed_at = time.monotonic()
+        for name, delta in counts.items():
+            incr_metric(name, delta)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+
+# autocomplete pages and counts (see paginators.CachedPagePaginator)
+autocomplete_cache = VersionedLRU()
@@ -0,0 +1,128 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .api import API_FIELDS
+from .models import Charge, Shipment, ShipmentComment, Tombstone
+
+
+CHANGE_FEED_CHUNK_SIZE = 1000
+
+
+# -------------------------------
+# Streams
+# -------------------------------
+# type in the feed -> (model, watermark field, exported values)
+CHANGE_STREAMS = {
+    "shipment": (Shipment, "updated_at", API_FIELDS),
+    "charge": (Charge, "updated_at", {
+        name: name for name in
+        ("id", "shipment_id", "description", "amount", "currency", "payer", "created_at", "updated_at")
+    }),
+    "comment": (ShipmentComment, "updated_at", {
+        name: name for name in ("id", "shipment_id", "author_name", "text", "created_at", "updated_at")
+    }),
+    "deleted": (Tombstone, "deleted_at", {
+        name: name for name in ("id", "model", "object_id", "shipment_id", "deleted_at")
+    }),
+}
+
+
+def deleted_with_shipment(origin):
+    """True when a post_delete comes from deleting the parent shipment(s)."""
+    if isinstance(origin, QuerySet):
+        return origin.model is Shipment
+    return isinstance(origin, Shipment)
+
+
+# -------------------------------
+# Cursor
+# -------------------------------
+# {stream: [watermark, last id]} for every stream read so far.  Rows are
+# read in (watermark, id) order, so resuming from a cursor neither skips
+# nor repeats rows.
+def encode_cursor(position):
+    # isoformat keeps the microseconds DjangoJSONEncoder would round off
+    raw = json.dumps(
+        {stream: [watermark.isoformat(), pk] for stream, (watermark, pk) in position.items()},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return {}
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        position = {}
+        for stream, (watermark, pk) in json.loads(raw).items():
+            watermark = parse_datetime(watermark)
+            if stream not in CHANGE_STREAMS or watermark is None:
+                raise ValueError(stream)
+            position[stream] = [watermark, int(pk)]
+    except (ValueError, TypeError, AttributeError, UnicodeDecodeError):
+        raise ValidationError("invalid cursor")
+    return position
+
+
+# -------------------------------
+# Feed
+# -------------------------------
+def iter_changes(cursor=None, limit=None, chunk_size=CHANGE_FEED_CHUNK_SIZE):
+    """
+    Yield the changes after `cursor` as dicts: {"type": <stream>, "data": {...}}
+    for rows, and {"type": "cursor", "cursor": ...} after every chunk, so a
+    consumer can resume from the last cursor it saw.  `limit` caps the rows
+    read per stream; the last cursor then points at the remaining rows.
+
+    Rows stamped within CHANGE_FEED_LAG seconds are held back until the
+    next pull: a transaction still open now may commit rows stamped
+    earlier than what this pull returns, and they would be skipped.
+    """
+    position = decode_cursor(cursor)
+    until = timezone.now() - timedelta(seconds=getattr(settings, "CHANGE_FEED_LAG", 5))
+
+    for stream, (model, field, exported) in CHANGE_STREAMS.items():
+        read = 0
+        while limit is None or read < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - read)
+            queryset = model.objects.filter(**{f"{field}__lte": until})
+            if stream in position:
+                watermark, pk = position[stream]
+                queryset = queryset.filter(
+                    Q(**{f"{field}__gte": watermark}) & (Q(**{f"{field}__gt": watermark}) | Q(pk__gt=pk))
+                )
+            paths = {path: name for name, path in exported.items()}
+            rows = list(
+                queryset.order_by(field, "pk")
+                .values(*dict.fromkeys([field, "pk", *paths]))[:size]
+            )
+            if not rows:
+                break
+            for row in rows:
+                yield {"type": stream, "data": {name: row[path] for path, name in paths.items()}}
+            position[stream] = [rows[-1][field], rows[-1]["pk"]]
+            read += len(rows)
+            yield {"type": "cursor", "cursor": encode_cursor(position)}
+            if len(rows) < size:
+                break
+
+    yield {"type": "cursor", "cursor": encode_cursor(position)}
+
+
+def ndjson_line(change):
+    return json.dumps(change, cls=DjangoJSONEncoder, separators=(",", ":")) + "\n"
+
+
+def iter_ndjson(changes):
+    for change in changes:
+        yield ndjson_line(change)
@@ -0,0 +1,75 @@
+import statistics
+from decimal import Decimal
+
+from .bulk import bulk_update_shipments
+from .models import Shipment
+
+
+# member columns shown by the planner; measures come from the numeric shadow columns
+PLANNER_FIELDS = (
+    "pk", "ref", "client__name", "shipper__name", "cnee__name", "pol_id", "pol__data", "pod_id", "pod__data",
+    "mode", "confirmed", "etd", "eta", "pcs", "gw", "cw", "vol", "pcs_num", "gw_kg", "cw_kg", "vol_cbm",
+    "charge_totals", "charges_total_usd",
+)
+TOTAL_FIELDS = ("pcs_num", "gw_kg", "cw_kg", "vol_cbm")
+# source text -> numeric column; text present but no number means it could not be parsed
+PARSED_FIELDS = {"pcs": "pcs_num", "gw": "gw_kg", "cw": "cw_kg", "vol": "vol_cbm"}
+
+# a weight this many times above / below the console median is flagged
+OUTLIER_FACTOR = 5
+# plausible kg per cbm; outside it the weight or the volume is likely mistyped
+DENSITY_RANGE = (Decimal("10"), Decimal("2500"))
+
+
+def console_members(console):
+    """All shipments of `console` as dicts, in one query."""
+    return list(Shipment.objects.filter(console=console).order_by("ref", "pk").values(*PLANNER_FIELDS))
+
+
+def console_summary(rows):
+    """Totals of the member rows: pieces, weights, volume, charges per currency."""
+    totals = {name: sum((row[name] for row in rows if row[name] is not None), Decimal(0)) for name in TOTAL_FIELDS}
+    charges = {}
+    for row in rows:
+        for currency, amount in (row["charge_totals"] or {}).items():
+            charges[currency] = charges.get(currency, Decimal(0)) + Decimal(amount)
+    return {
+        "shipments": len(rows),
+        "confirmed": sum(1 for row in rows if row["confirmed"]),
+        **totals,
+        "charges": dict(sorted(charges.items())),
+        "charges_total_usd": sum((row["charges_total_usd"] for row in rows if row["charges_total_usd"] is not None), Decimal(0)),
+        # shipments whose USD total is unknown (a currency without a rate)
+        "charges_without_usd": sum(1 for row in rows if row["charge_totals"] and row["charges_total_usd"] is None),
+    }
+
+
+def flag_outliers(rows):
+    """Set row["flags"] to the reasons a member stands out from the rest of the console."""
+    weights = [row["gw_kg"] for row in rows if row["gw_kg"]]
+    median = statistics.median(weights) if len(weights) >= 3 else None
+    lanes = [(row["pol_id"], row["pod_id"]) for row in rows]
+    main_lane = max(set(lanes), key=lanes.count) if lanes else None
+
+    for row in rows:
+        flags = []
+        for source, target in PARSED_FIELDS.items():
+            if row[source] and row[source].strip() and row[target] is None:
+                flags.append(f"{source.upper()} not a number")
+        if median and row["gw_kg"] and not median / OUTLIER_FACTOR <= row["gw_kg"] <= median * OUTLIER_FACTOR:
+            flags.append(f"G.W {row['gw_kg']:.0f} kg vs median {median:.0f} kg")
+        if row["gw_kg"] and row["vol_cbm"]:
+            density = row["gw_kg"] / row["vol_cbm"]
+            if not DENSITY_RANGE[0] <= density <= DENSITY_RANGE[1]:
+                flags.append(f"{density:.0f} kg/cbm")
+        if row["gw_kg"] and row["cw_kg"] is not None and row["cw_kg"] < row["gw_kg"]:
+            flags.append("C.W below G.W")
+        if main_lane and (row["pol_id"], row["pod_id"]) != main_lane and len(set(lanes)) > 1:
+            flags.append("other lane")
+        row["flags"] = flags
+    return rows
+
+
+def move_shipments(console, pks, target):
+    """Move the given members of `console` to `target` (None detaches them); one UPDATE per 1000."""
+    return bulk_update_shipments(Shipment.objects.filter(console=console, pk__in=pks), console=target)
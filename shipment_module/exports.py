@@ -0,0 +1,96 @@
+import csv
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .resources import ShipmentModelResource
+from .routing import pin_reads
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def export_queryset(queryset):
+    """Everything ShipmentModelResource renders, joined or prefetched."""
+    return queryset.select_related(
+        "client", "pol", "pod", "term", "carrier", "console", "agent",
+        "shipper", "cnee", "hawb_shipper", "hawb_cnee",
+    ).prefetch_related("operators")
+
+
+def iter_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Walk the queryset newest first in keyset chunks (pk < last pk), so only
+    one chunk of shipments and their prefetched operators is in memory.
+    """
+    queryset = export_queryset(queryset).order_by("-pk")
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__lt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_pk = chunk[-1].pk
+
+
+def iter_rows(queryset, resource=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Header row, then one rendered row per shipment (same columns as the admin export)."""
+    resource = resource or ShipmentModelResource()
+    yield resource.get_export_headers()
+    for shipment in iter_chunks(queryset, chunk_size):
+        yield resource.export_resource(shipment)
+
+
+class Echo:
+    """File-like object whose write() just hands the line back to the csv writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_xlsx(rows, chunk_size=64 * 1024):
+    # write-only workbooks flush rows to a temp file instead of keeping them in memory
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Shipments")
+    for row in rows:
+        sheet.append(row)
+    with tempfile.TemporaryFile() as f:
+        workbook.save(f)
+        f.seek(0)
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def streaming_export_response(queryset, file_format="csv"):
+    if file_format not in EXPORT_CONTENT_TYPES:
+        raise ValueError(f"Unsupported export format {file_format!r}")
+    # rows are read while the response streams, after the view returned
+    queryset = pin_reads(queryset)
+    if file_format == "xlsx":
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured("XLSX export requires openpyxl (pip install openpyxl).")
+        content = stream_xlsx(iter_rows(queryset))
+    else:
+        content = stream_csv(iter_rows(queryset))
+
+    response = StreamingHttpResponse(content, content_type=EXPORT_CONTENT_TYPES[file_format])
+    stamp = timezone.localtime(timezone.now()).strftime("%Y-%m-%d_%H%M")
+    response["Content-Disposition"] = f'attachment; filename="Shipments_{stamp}.{file_format}"'
+    return response
@@ -0,0 +1,131 @@
+import hashlib
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils.translation import gettext_lazy as _
+
+from .caching import get_version
+from .routing import is_primary
+
+# first of these the related model has is shown as the facet label
+FACET_LABEL_FIELDS = ("name", "data", "code", "username")
+
+
+class FacetRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    """
+    Related filter that lists only the values present in the current result
+    set, with counts from one GROUP BY instead of loading the whole related
+    table.  Facets are cached per filtered query and version-stamped with
+    Shipment and the related model, so writes to either invalidate them;
+    facets read from a replica are not stored.
+
+    Above `autocomplete_threshold` distinct values the sidebar switches to a
+    "starts with" search box plus the `autocomplete_limit` busiest values.
+    """
+    autocomplete_threshold = 50
+    autocomplete_limit = 15
+    cache_timeout = 300
+    search_template = "admin/shipment_module/facet_search_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.related_model = field.remote_field.model
+        related_fields = {f.name for f in self.related_model._meta.get_fields()}
+        self.label_field = next((f for f in FACET_LABEL_FIELDS if f in related_fields), "pk")
+        # a plain parameter name (admin rejects relation lookups it does not know);
+        # queryset() turns it into <field>__<label>__istartswith
+        self.search_kwarg = f"{field_path}_starts"
+        self.search_lookup = f"{field_path}__{self.label_field}__istartswith"
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.request = request
+        self.search_value = (self.used_parameters.get(self.search_kwarg) or [""])[-1]
+        self.hidden_params = []
+
+    def expected_parameters(self):
+        return super().expected_parameters() + [self.search_kwarg]
+
+    def queryset(self, request, queryset):
+        search = self.used_parameters.pop(self.search_kwarg, None)
+        try:
+            queryset = super().queryset(request, queryset)
+        finally:
+            if search is not None:
+                self.used_parameters[self.search_kwarg] = search
+        if self.search_value:
+            queryset = queryset.filter(**{self.search_lookup: self.search_value})
+        return queryset
+
+    def field_choices(self, field, request, model_admin):
+        # facets are computed lazily from the changelist in choices()
+        return []
+
+    def has_output(self):
+        return True
+
+    def get_facets(self, changelist):
+        """[(pk, label, count), ...] for the result set without this filter's own selection."""
+        queryset = changelist.get_queryset(self.request, exclude_parameters=self.expected_parameters())
+        if self.search_value:
+            queryset = queryset.filter(**{self.search_lookup: self.search_value})
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(f"{self.field_path}:{sql}:{params}".encode()).hexdigest()
+        key = "facets:{}:{}:{}:{}".format(
+            self.field_path,
+            get_version("shipment"),
+            get_version(self.related_model._meta.label_lower),
+            digest,
+        )
+        facets = cache.get(key)
+        if facets is None:
+            label = f"{self.field_path}__{self.label_field}"
+            rows = (
+                queryset.order_by()
+                .values_list(self.field_path, label)
+                .annotate(count=Count("pk"))
+                .order_by("-count", label)
+            )
+            facets = list(rows)
+            if is_primary(queryset.db):
+                cache.set(key, facets, self.cache_timeout)
+        return facets
+
+    def choices(self, changelist):
+        facets = self.get_facets(changelist)
+        empty_count = sum(count for pk, label, count in facets if pk is None)
+        facets = [facet for facet in facets if facet[0] is not None]
+
+        if len(facets) > self.autocomplete_threshold or self.search_value:
+            self.template = self.search_template
+            self.hidden_params = [
+                (k, v) for k, v in changelist.params.items() if k != self.search_kwarg
+            ]
+            selected = set(self.lookup_val or [])
+            facets = [f for f in facets if str(f[0]) in selected] + [
+                f for f in facets[: self.autocomplete_limit] if str(f[0]) not in selected
+            ]
+        else:
+            facets = sorted(facets, key=lambda f: str(f[1] or "").lower())
+
+        yield {
+            "selected": self.lookup_val is None and not self.lookup_val_isnull,
+            "query_string": changelist.get_query_string(
+                remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]
+            ),
+            "display": _("All"),
+        }
+        for pk_val, label, count in facets:
+            yield {
+                "selected": self.lookup_val is not None and str(pk_val) in self.lookup_val,
+                "query_string": changelist.get_query_string(
+                    {self.lookup_kwarg: pk_val}, [self.lookup_kwarg_isnull]
+                ),
+                "display": f"{label} ({count})",
+            }
+        if self.include_empty_choice and (empty_count or self.lookup_val_isnull):
+            yield {
+                "selected": bool(self.lookup_val_isnull),
+                "query_string": changelist.get_query_string(
+                    {self.lookup_kwarg_isnull: "True"}, [self.lookup_kwarg]
+                ),
+                "display": f"{self.empty_value_display} ({empty_count})",
+            }
@@ -0,0 +1,30 @@
+from django import forms
+from django.contrib.admin.widgets import AutocompleteSelect, AutocompleteSelectMultiple
+
+from .models import Shipment
+
+
+class BulkUpdateForm(forms.Form):
+    """
+    The value of one Shipment field for a bulk admin action; relations use
+    the same autocomplete widgets as the change form.
+    """
+
+    def __init__(self, *args, field_name, admin_site, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = Shipment._meta.get_field(field_name)
+        if field.many_to_many:
+            self.fields["value"] = forms.ModelMultipleChoiceField(
+                queryset=field.related_model._default_manager.all(),
+                widget=AutocompleteSelectMultiple(field, admin_site),
+            )
+        elif field.is_relation:
+            self.fields["value"] = forms.ModelChoiceField(
+                queryset=field.related_model._default_manager.all(),
+                widget=AutocompleteSelect(field, admin_site),
+                required=not field.null,
+                help_text="Leave empty to clear it." if field.null else "",
+            )
+        else:
+            self.fields["value"] = forms.ChoiceField(choices=field.choices)
+        self.fields["value"].label = field.verbose_name.capitalize()
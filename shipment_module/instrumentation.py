@@ -0,0 +1,190 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from fnmatch import fnmatch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from .caching import get_metrics, incr_metric, reset_metrics
+
+
+logger = logging.getLogger("shipment_module.instrumentation")
+
+# counters kept per view, summed over all requests
+VIEW_COUNTERS = ("requests", "time_ms", "queries", "sql_ms", "duplicate_queries", "n_plus_one")
+VIEWS_KEY = "instrumentation:views"
+TOP_DUPLICATES = 5
+
+
+# -------------------------------
+# Query profiling
+# -------------------------------
+IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+
+
+def fingerprint(sql):
+    """The statement with IN (%s, %s, ...) lists collapsed; values are already parameters."""
+    return IN_LIST.sub("(...)", sql)
+
+
+class QueryProfiler:
+    """
+    Query count, SQL time and executions per fingerprint and per database
+    alias; use with connection.execute_wrapper() (see profile_queries()).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+        self.aliases = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+            self.aliases[context["connection"].alias] += 1
+
+    def duplicates(self, threshold):
+        """{fingerprint: executions} of statements run at least `threshold` times."""
+        return {sql: n for sql, n in self.fingerprints.most_common() if n >= threshold}
+
+
+def profile_queries(profiler):
+    """Wrap every configured database alias (primary and replica) with `profiler`."""
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(profiler))
+    return stack
+
+
+# -------------------------------
+# Aggregates
+# -------------------------------
+# Counters go through incr_metric so every worker adds to the same totals;
+# the per-view maximum and duplicate samples are best-effort get/set.
+def record_request(view, seconds, profiler):
+    threshold = settings.INSTRUMENTATION_DUPLICATE_THRESHOLD
+    duplicates = profiler.duplicates(threshold)
+
+    views = cache.get(VIEWS_KEY, [])
+    if view not in views:
+        cache.set(VIEWS_KEY, [*views, view], None)
+
+    for name, value in (
+        ("requests", 1),
+        ("time_ms", round(seconds * 1000)),
+        ("queries", profiler.count),
+        ("sql_ms", round(profiler.seconds * 1000)),
+        ("duplicate_queries", sum(n - 1 for n in duplicates.values())),
+        ("n_plus_one", 1 if duplicates else 0),
+    ):
+        incr_metric(f"instrumentation:{view}:{name}", value)
+
+    max_key = f"instrumentation:{view}:max_ms"
+    if round(seconds * 1000) > cache.get(max_key, 0):
+        cache.set(max_key, round(seconds * 1000), None)
+
+    if duplicates:
+        samples_key = f"instrumentation:{view}:duplicates"
+        samples = cache.get(samples_key, {})
+        for sql, n in duplicates.items():
+            samples[sql] = max(samples.get(sql, 0), n)
+        top = dict(sorted(samples.items(), key=lambda item: -item[1])[:TOP_DUPLICATES])
+        cache.set(samples_key, top, None)
+    return duplicates
+
+
+def view_report():
+    """Per-view totals and averages, slowest (by total time) first."""
+    rows = []
+    for view in cache.get(VIEWS_KEY, []):
+        totals = get_metrics([f"instrumentation:{view}:{name}" for name in VIEW_COUNTERS])
+        row = {name: totals[f"instrumentation:{view}:{name}"] for name in VIEW_COUNTERS}
+        if not row["requests"]:
+            continue
+        requests = row["requests"]
+        row.update(
+            view=view,
+            avg_ms=row["time_ms"] / requests,
+            avg_queries=row["queries"] / requests,
+            avg_sql_ms=row["sql_ms"] / requests,
+            max_ms=cache.get(f"instrumentation:{view}:max_ms", 0),
+            duplicates=sorted(cache.get(f"instrumentation:{view}:duplicates", {}).items(), key=lambda item: -item[1]),
+        )
+        rows.append(row)
+    return sorted(rows, key=lambda row: -row["time_ms"])
+
+
+def reset_report():
+    views = cache.get(VIEWS_KEY, [])
+    reset_metrics([f"instrumentation:{view}:{name}" for view in views for name in VIEW_COUNTERS])
+    cache.delete_many(
+        [VIEWS_KEY]
+        + [f"instrumentation:{view}:{suffix}" for view in views for suffix in ("max_ms", "duplicates")]
+    )
+
+
+# -------------------------------
+# Middleware
+# -------------------------------
+class InstrumentationMiddleware:
+    """
+    Opt-in (INSTRUMENTATION_ENABLED): for views whose name matches one of
+    INSTRUMENTED_VIEWS, measure wall time (including template rendering),
+    query count, SQL time and repeated statements, write one JSON line to
+    the "shipment_module.instrumentation" log and add to the aggregates
+    shown on the staff report page.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "INSTRUMENTATION_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def view_name(self, request):
+        try:
+            view = resolve(request.path_info).view_name
+        except Resolver404:
+            return None
+        if any(fnmatch(view, pattern) for pattern in settings.INSTRUMENTED_VIEWS):
+            return view
+        return None
+
+    def __call__(self, request):
+        view = self.view_name(request)
+        if view is None:
+            return self.get_response(request)
+
+        profiler = QueryProfiler()
+        started = time.perf_counter()
+        with profile_queries(profiler):
+            response = self.get_response(request)
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        seconds = time.perf_counter() - started
+
+        duplicates = record_request(view, seconds, profiler)
+        logger.info(json.dumps({
+            "view": view,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "ms": round(seconds * 1000, 1),
+            "queries": profiler.count,
+            "queries_by_alias": dict(profiler.aliases),
+            "sql_ms": round(profiler.seconds * 1000, 1),
+            "duplicates": duplicates,
+        }))
+        return response
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .routing import is_primary
+
+
+INVOICE_RELATED = ("client", "sp", "shipper", "cnee", "pol", "pod", "carrier")
+INVOICE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def invoice_queryset(queryset):
+    # every party the invoice template prints, in the same query
+    return queryset.select_related(*INVOICE_RELATED)
+
+
+# -------------------------------
+# Cached invoice bodies
+# -------------------------------
+# Stored under the shipment pk together with its updated_at: a save both
+# evicts the entry (signals.py) and changes updated_at, so a stale body is
+# never served even if the eviction is missed (e.g. queryset.update()).
+# Bodies rendered from replica rows are not stored: a lagging replica could
+# put an old party name back right after a rename evicted it.
+def invoice_cache_key(pk):
+    return f"invoice:{pk}"
+
+
+def invoice_version(shipment):
+    return shipment.updated_at.isoformat() if shipment.updated_at else ""
+
+
+def evict_invoice(pk):
+    cache.delete(invoice_cache_key(pk))
+
+
+def evict_invoices(pks):
+    cache.delete_many([invoice_cache_key(pk) for pk in pks])
+
+
+def render_invoices(shipments):
+    """
+    Rendered invoice bodies of `shipments` (with INVOICE_RELATED loaded), in
+    order; one get_many/set_many round trip for the whole batch.
+    """
+    shipments = list(shipments)
+    cached = cache.get_many([invoice_cache_key(s.pk) for s in shipments])
+    bodies, missing = [], {}
+    for shipment in shipments:
+        key = invoice_cache_key(shipment.pk)
+        version, body = cached.get(key, (None, None))
+        if version != invoice_version(shipment):
+            body = render_to_string("shipment/invoice_body.html", {"shipment": shipment})
+            if is_primary(shipment._state.db):
+                missing[key] = (invoice_version(shipment), body)
+        bodies.append(mark_safe(body))
+    if missing:
+        cache.set_many(missing, INVOICE_CACHE_TIMEOUT)
+    return bodies
+
+
+def invoice_page(shipments, request=None):
+    shipments = list(shipments)
+    context = {"invoices": render_invoices(shipments)}
+    if len(shipments) == 1:
+        context["shipment"] = shipments[0]
+    return render_to_string("shipment/invoice_detail.html", context, request=request)
@@ -0,0 +1,73 @@
+import csv
+import os
+import sys
+
+from django.core.management.base import BaseCommand
+
+from shipment_module.measures import MEASURE_FIELDS, measure_values
+from shipment_module.models import Shipment
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the numeric measure columns (pcs_num, gw_kg, ...) from the text ones, in pk order. "
+        "Resumable through --checkpoint; unparseable values are logged as CSV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument("--checkpoint", help="File holding the last processed pk; resumes from it")
+        parser.add_argument("--start-after", type=int, default=0, help="Start after this pk (ignored with a checkpoint)")
+        parser.add_argument("--log", help="CSV file for unparseable values (default: stderr)")
+        parser.add_argument("--dry-run", action="store_true", help="Parse and log, but write nothing")
+
+    def read_checkpoint(self, path, default):
+        if path and os.path.exists(path):
+            with open(path) as f:
+                return int(f.read().strip() or default)
+        return default
+
+    def write_checkpoint(self, path, last_pk):
+        with open(f"{path}.tmp", "w") as f:
+            f.write(str(last_pk))
+        os.replace(f"{path}.tmp", path)
+
+    def handle(self, *args, **options):
+        checkpoint = options["checkpoint"]
+        last_pk = self.read_checkpoint(checkpoint, options["start_after"])
+        targets = [target for target, _ in MEASURE_FIELDS.values()]
+        columns = ["pk", "ref", *MEASURE_FIELDS, *targets]
+
+        log_file = open(options["log"], "a", newline="") if options["log"] else sys.stderr
+        log = csv.writer(log_file)
+        scanned = updated = failed = 0
+        try:
+            while True:
+                chunk = list(Shipment.objects.filter(pk__gt=last_pk).order_by("pk").only(*columns)[:options["chunk_size"]])
+                if not chunk:
+                    break
+                changed = []
+                for shipment in chunk:
+                    values, errors = measure_values(shipment)
+                    for source, error in errors.items():
+                        log.writerow([shipment.pk, shipment.ref, source, getattr(shipment, source), error])
+                    failed += len(errors)
+                    if any(getattr(shipment, field) != value for field, value in values.items()):
+                        for field, value in values.items():
+                            setattr(shipment, field, value)
+                        changed.append(shipment)
+
+                if changed and not options["dry_run"]:
+                    # only the derived columns; updated_at stays, nothing a consumer sees changed
+                    Shipment.objects.bulk_update(changed, targets)
+                scanned += len(chunk)
+                updated += len(changed)
+                last_pk = chunk[-1].pk
+                if checkpoint and not options["dry_run"]:
+                    self.write_checkpoint(checkpoint, last_pk)
+                self.stderr.write(f"\rscanned={scanned} updated={updated} unparseable={failed} last_pk={last_pk}", ending="")
+        finally:
+            if log_file is not sys.stderr:
+                log_file.close()
+        self.stderr.write("")
+        self.stdout.write(f"scanned={scanned} updated={updated} unparseable={failed}")
@@ -0,0 +1,184 @@
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookiejar import Cookie, CookieJar
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from account.models import User
+from shipment_module.models import Console
+from shipment_module.synthetic import check_synthetic_allowed, generate_synthetic_data, synthetic_shipments
+
+
+class Command(BaseCommand):
+    help = (
+        "Requests/sec of the admin pages under concurrent staff users, in process (through the full "
+        "middleware stack and request signals, so CONN_MAX_AGE applies) or against a running server (--url)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=8, help="Concurrent users (one thread each)")
+        parser.add_argument("--duration", type=float, default=10, help="Seconds to run")
+        parser.add_argument("--shipments", type=int, default=2000,
+                            help="Generate synthetic shipments first if fewer exist")
+        parser.add_argument("--url", default=None, help="Base URL of a running server, e.g. http://127.0.0.1:8000")
+        parser.add_argument("--conn-max-age", default=None,
+                            help="Override DATABASES['default']['CONN_MAX_AGE'] for this run (in process only)")
+        parser.add_argument("--output", default=None, help="Also write the result as JSON here")
+        parser.add_argument("--force", action="store_true",
+                            help="Run with DEBUG off; synthetic data is written to this database")
+
+    def paths(self):
+        shipment = synthetic_shipments().order_by("-pk").first()
+        console = Console.objects.filter(shipment__isnull=False).order_by("-pk").first()
+        paths = [
+            reverse("admin:shipment_module_shipment_changelist"),
+            reverse("admin:shipment_module_shipment_changelist") + "?confirmed__exact=1",
+            reverse("admin:shipment_module_shipment_change", args=[shipment.pk]),
+            reverse("admin:shipment_module_console_changelist"),
+        ]
+        if console:
+            paths.append(reverse("admin:shipment_module_console_planner", args=[console.pk]))
+        return paths
+
+    # -------------------------------
+    # Clients
+    # -------------------------------
+    def in_process_client(self, user):
+        client = Client()
+        client.force_login(user)
+
+        def get(path):
+            # the test client detaches close_old_connections from the request
+            # signals; call it as a real request would, so CONN_MAX_AGE applies
+            close_old_connections()
+            try:
+                return client.get(path).status_code
+            finally:
+                close_old_connections()
+        return get
+
+    def http_client(self, base_url, user):
+        # a session saved straight into the session store stands in for logging in
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        jar = CookieJar()
+        host = urllib.parse.urlparse(base_url).hostname
+        jar.set_cookie(Cookie(0, settings.SESSION_COOKIE_NAME, session.session_key, None, False, host, False, False,
+                              "/", True, False, None, True, None, None, {}))
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+
+        def get(path):
+            try:
+                with opener.open(base_url.rstrip("/") + path, timeout=30) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+        return get
+
+    # -------------------------------
+    # Run
+    # -------------------------------
+    def worker(self, get, paths, duration, latencies, errors, start):
+        start.wait()
+        deadline = time.perf_counter() + duration
+        i = 0
+        try:
+            while time.perf_counter() < deadline:
+                path = paths[i % len(paths)]
+                i += 1
+                started = time.perf_counter()
+                status = get(path)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if status != 200:
+                    errors.append(f"{status} {path}")
+        finally:
+            connections.close_all()
+
+    def handle(self, *args, **options):
+        check_synthetic_allowed(options["force"])
+        missing = options["shipments"] - synthetic_shipments().count()
+        if missing > 0:
+            self.stderr.write(f"generating {missing} synthetic shipment(s)")
+            generate_synthetic_data(shipments=missing, log=lambda message: self.stderr.write(message))
+        user = User.objects.filter(is_superuser=True, is_active=True).first()
+        if user is None:
+            user = User.objects.create_superuser("loadtest", "loadtest@example.com", None)
+
+        if options["conn_max_age"] is not None:
+            if options["url"]:
+                raise CommandError("--conn-max-age only applies in process; set DATABASE_CONN_MAX_AGE on the server")
+            value = options["conn_max_age"]
+            # every thread's connection reads the same settings dict when it connects
+            connections.settings["default"]["CONN_MAX_AGE"] = None if value.lower() == "none" else int(value)
+        connections.close_all()
+
+        opened = []
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+        connection_created.connect(count_connection)
+
+        paths = self.paths()
+        clients = [
+            self.http_client(options["url"], user) if options["url"] else self.in_process_client(user)
+            for _ in range(options["users"])
+        ]
+        for get in clients:
+            get(paths[0])  # warm-up: sessions, caches, template loading
+        opened.clear()
+
+        latencies, errors = [], []
+        start = threading.Event()
+        threads = [
+            threading.Thread(target=self.worker, args=(get, paths, options["duration"], latencies, errors, start))
+            for get in clients
+        ]
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        start.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        connection_created.disconnect(count_connection)
+
+        if not latencies:
+            raise CommandError("no request completed")
+        latencies.sort()
+        result = {
+            "target": options["url"] or "in process",
+            "database": connections["default"].vendor,
+            "conn_max_age": connections.settings["default"].get("CONN_MAX_AGE"),
+            "users": options["users"],
+            "seconds": round(elapsed, 2),
+            "requests": len(latencies),
+            "requests_per_sec": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(statistics.median(latencies), 1),
+            "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 1),
+            "max_ms": round(latencies[-1], 1),
+            "errors": len(errors),
+            # in process only; a remote server opens its own
+            "connections_opened": None if options["url"] else len(opened),
+        }
+        for name, value in result.items():
+            self.stdout.write(f"{name:<20} {value}")
+        for error in sorted(set(errors))[:10]:
+            self.stderr.write(f"error: {error}")
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(result, f, indent=2)
@@ -0,0 +1,86 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from account.models import Customer, User
+from shipment_module.api import API_DEFAULT_FIELDS, API_FIELDS, encode_cursor, list_filter_fields, render_page, shipment_page
+from shipment_module.models import PodList, PolList, RefCounter, Shipment
+from shipment_module.synthetic import check_synthetic_allowed
+
+
+class Command(BaseCommand):
+    help = "Compare keyset-cursor and OFFSET page latency of the shipment API at growing depths."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Table size to grow to")
+        parser.add_argument("--depths", default="0,1000,10000,100000,500000,990000", help="Comma-separated row offsets")
+        parser.add_argument("--limit", type=int, default=100, help="Rows per page")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+        parser.add_argument("--keep", action="store_true", help="Keep the synthetic shipments")
+        parser.add_argument("--force", action="store_true",
+                            help="Run with DEBUG off; synthetic data is written to this database")
+
+    def grow(self, target):
+        sp, _ = User.objects.get_or_create(username="bench-sp")
+        pol, _ = PolList.objects.get_or_create(data="BENCH-POL")
+        pod, _ = PodList.objects.get_or_create(data="BENCH-POD")
+        clients = [Customer.objects.get_or_create(name=f"bench client {i}")[0] for i in range(50)]
+        created = []
+        # one synthetic day per 10000 refs, starting far in the past
+        while len(created) < target:
+            day = date(2000, 1, 3) + timedelta(days=len(created) // 10000)
+            refs = RefCounter.objects.allocate(min(10000, target - len(created)), day=day)
+            Shipment.objects.bulk_create(
+                [Shipment(ref=ref, client=clients[i % len(clients)], sp=sp, pol=pol, pod=pod)
+                 for i, ref in enumerate(refs)],
+                batch_size=2000,
+            )
+            created.extend(refs)
+            self.stderr.write(f"\rgrowing: {len(created)}/{target}", ending="")
+        self.stderr.write("")
+        return created
+
+    def measure(self, func):
+        samples = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples) * 1000
+
+    def handle(self, *args, **options):
+        check_synthetic_allowed(options["force"])
+        self.repeat = options["repeat"]
+        limit = options["limit"]
+        filter_fields = list_filter_fields(admin.site._registry[Shipment].list_filter)
+        paths = [API_FIELDS[name] for name in API_DEFAULT_FIELDS]
+
+        missing = max(options["rows"] - Shipment.objects.count(), 0)
+        created = self.grow(missing) if missing else []
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE" if connection.vendor == "sqlite" else f"ANALYZE TABLE {Shipment._meta.db_table}")
+        try:
+            total = Shipment.objects.count()
+            self.stdout.write(f"rows={total} limit={limit} ({connection.vendor})")
+            ordered = Shipment.objects.order_by("-created_at", "-pk")
+            for depth in (int(d) for d in options["depths"].split(",")):
+                if depth >= total:
+                    continue
+                params = {"limit": str(limit)}
+                if depth:
+                    # key of the row just before the page, i.e. what the previous page's cursor holds
+                    key = ordered.values_list("created_at", "pk")[depth - 1]
+                    params["cursor"] = encode_cursor(*key)
+
+                keyset = self.measure(lambda: render_page(shipment_page(params, filter_fields)))
+                offset = self.measure(lambda: list(ordered.values(*paths)[depth:depth + limit]))
+                self.stdout.write(f"depth={depth:>9} keyset={keyset:8.1f}ms offset={offset:8.1f}ms")
+        finally:
+            if created and not options["keep"]:
+                for start in range(0, len(created), 5000):
+                    Shipment.objects.filter(ref__in=created[start:start + 5000]).delete()
+                RefCounter.objects.filter(prefix__in={ref[:6] for ref in created}).delete()
@@ -0,0 +1,77 @@
+import time
+import tracemalloc
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from account.models import Customer, Shipper, User
+from shipment_module.exports import iter_rows, stream_csv, stream_xlsx
+from shipment_module.models import PodList, PolList, RefCounter, Shipment
+from shipment_module.resources import ShipmentModelResource
+
+
+class Command(BaseCommand):
+    help = "Measure rows/sec and peak memory of the streaming shipment export."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+        parser.add_argument("--day", default="2000-01-02", help="Day the synthetic refs are issued for")
+        parser.add_argument("--compare", action="store_true", help="Also run the in-memory tablib export")
+        parser.add_argument("--keep", action="store_true", help="Keep the synthetic shipments")
+
+    def create_shipments(self, rows, day):
+        client, _ = Customer.objects.get_or_create(name="bench-client")
+        sp, _ = User.objects.get_or_create(username="bench-sp")
+        pol, _ = PolList.objects.get_or_create(data="BENCH-POL")
+        pod, _ = PodList.objects.get_or_create(data="BENCH-POD")
+        shipper, _ = Shipper.objects.get_or_create(name="bench-shipper")
+        for start in range(0, rows, 5000):
+            refs = RefCounter.objects.allocate(min(5000, rows - start), day=day)
+            Shipment.objects.bulk_create(
+                [Shipment(ref=ref, client=client, sp=sp, pol=pol, pod=pod, shipper=shipper,
+                          mawb=f"MAWB-{ref}", gw="120") for ref in refs],
+                batch_size=1000,
+            )
+
+    def measure(self, label, consume):
+        started = time.perf_counter()
+        count = consume()
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        consume()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(f"{label}: rows={count} elapsed={elapsed:.2f}s rows/s={count / elapsed:.0f} "
+                          f"peak_python_memory={peak / 1024 / 1024:.1f}MiB")
+
+    def handle(self, *args, **options):
+        day = date.fromisoformat(options["day"])
+        prefix = day.strftime("%y%m%d")
+        queryset = Shipment.objects.filter(ref__startswith=prefix)
+        existing = queryset.count()
+        if existing < options["rows"]:
+            self.create_shipments(options["rows"] - existing, day)
+
+        stream = stream_xlsx if options["format"] == "xlsx" else stream_csv
+
+        def streaming():
+            rows = -1  # header
+            for _ in stream(iter_rows(queryset)):
+                rows += options["format"] == "csv"
+            return rows if options["format"] == "csv" else queryset.count()
+
+        self.measure(f"streaming {options['format']}", streaming)
+
+        if options["compare"]:
+            def in_memory():
+                dataset = ShipmentModelResource().export(queryset)
+                getattr(dataset, options["format"])
+                return len(dataset)
+
+            self.measure(f"tablib {options['format']}", in_memory)
+
+        if not options["keep"]:
+            queryset.delete()
+            RefCounter.objects.filter(prefix=prefix).delete()
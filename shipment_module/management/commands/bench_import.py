@@ -0,0 +1,106 @@
+import random
+import time
+from datetime import date
+
+import tablib
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from account.models import Carrier, Consignee, Customer, Shipper, User
+from shipment_module.models import PodList, PolList, RefCounter, Shipment, TermList
+from shipment_module.resources import ShipmentBulkImportResource, ShipmentModelResource
+from shipment_module.synthetic import check_synthetic_allowed
+from shipment_module.utils import QueryCounter
+
+# lookups the benchmark names "bench-..."; the ones it creates are removed afterwards
+BENCH_LOOKUPS = (
+    (Customer, "name"), (User, "username"), (PolList, "data"), (PodList, "data"), (TermList, "data"),
+    (Carrier, "name"), (Shipper, "name"), (Consignee, "name"),
+)
+
+
+class Command(BaseCommand):
+    help = "Import a synthetic spreadsheet through ShipmentModelResource and report time and query count."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20000)
+        parser.add_argument("--distinct", type=int, default=30, help="Distinct values per lookup column")
+        parser.add_argument("--commit", action="store_true",
+                            help="Commit the import instead of rolling it back; refs are taken from --day")
+        parser.add_argument("--day", type=date.fromisoformat, default=date(2000, 1, 2),
+                            help="Past day whose ref counter a committed import uses (YYYY-MM-DD)")
+        parser.add_argument("--with-diff", action="store_true", help="Use the admin resource (per-row diffs)")
+        parser.add_argument("--compare-cache", action="store_true",
+                            help="Also run a dry run without the lookup cache and report the queries saved")
+        parser.add_argument("--keep", action="store_true", help="Keep the imported shipments and lookups")
+        parser.add_argument("--force", action="store_true",
+                            help="Run with DEBUG off; synthetic data is written to this database")
+
+    def build_dataset(self, rows, distinct, refs):
+        clients = [
+            Customer.objects.get_or_create(name=f"bench-client-{i}")[0].pk for i in range(distinct)
+        ]
+        operators = [
+            User.objects.get_or_create(username=f"bench-op-{i}")[0].username for i in range(5)
+        ]
+        headers = ["ref", "client", "pol", "pod", "term", "carrier", "mawb_shipper", "mawb_cnee",
+                   "hawb_shipper", "hawb_cnee", "operators", "etdw", "eta", "confirmed", "mawb", "gw"]
+        dataset = tablib.Dataset(headers=headers)
+        rng = random.Random(0)
+        for i in range(rows):
+            pick = lambda prefix: f"bench-{prefix}-{rng.randrange(distinct)}"
+            dataset.append([
+                refs[i] if refs else "", rng.choice(clients), pick("pol"), pick("pod"), pick("term"), pick("carrier"),
+                pick("shipper"), pick("cnee"), pick("shipper"), pick("cnee"),
+                ",".join(rng.sample(operators, 2)), "2025-01-10", "2025-01-03",
+                rng.random() < 0.5, f"MAWB-{i}", str(rng.randint(1, 500)),
+            ])
+        return dataset
+
+    def run(self, resource, dataset, user, dry_run):
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            started = time.perf_counter()
+            result = resource.import_data(dataset, dry_run=dry_run, use_transactions=True, user=user)
+            elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"{type(resource).__name__} cache={resource.lookup_cache.enabled} rows={len(dataset)} "
+                          f"elapsed={elapsed:.2f}s rows/s={len(dataset) / elapsed:.0f} queries={queries.count} "
+                          f"errors={result.has_errors()} invalid={result.has_validation_errors()} "
+                          f"totals={dict(result.totals)}")
+        for error in result.base_errors[:5]:
+            self.stderr.write(str(error.error))
+        for line, errors in result.row_errors()[:5]:
+            self.stderr.write(f"row {line}: {errors[0].error}")
+        return queries.count, result
+
+    def bench_lookups(self):
+        return {
+            model: set(model.objects.filter(**{f"{field}__startswith": "bench-"}).values_list("pk", flat=True))
+            for model, field in BENCH_LOOKUPS
+        }
+
+    def handle(self, *args, **options):
+        check_synthetic_allowed(options["force"])
+        before = set(Shipment.objects.values_list("pk", flat=True))
+        lookups_before = self.bench_lookups()
+        # a committed import takes its refs from a past day, never today's counter
+        refs = RefCounter.objects.allocate(options["rows"], day=options["day"]) if options["commit"] else []
+        try:
+            user, _ = User.objects.get_or_create(username="bench-sp")
+            dataset = self.build_dataset(options["rows"], options["distinct"], refs)
+
+            resource_class = ShipmentModelResource if options["with_diff"] else ShipmentBulkImportResource
+            if options["compare_cache"]:
+                uncached, _ = self.run(resource_class(use_lookup_cache=False, create_missing=True), dataset, user, dry_run=True)
+            cached, result = self.run(resource_class(create_missing=True), dataset, user, dry_run=not options["commit"])
+            if options["compare_cache"]:
+                self.stdout.write(f"queries without cache={uncached} with cache={cached} saved={uncached - cached}")
+            self.stdout.write("lookup cache: " + ", ".join(f"{k}={v}" for k, v in result.lookup_cache_stats.items()))
+        finally:
+            if not options["keep"]:
+                Shipment.objects.exclude(pk__in=before).delete()
+                if refs:
+                    RefCounter.objects.filter(prefix=refs[0][:6]).delete()
+                for model, pks in self.bench_lookups().items():
+                    model.objects.filter(pk__in=pks - lookups_before[model]).delete()
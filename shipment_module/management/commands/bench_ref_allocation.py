@@ -0,0 +1,77 @@
+import threading
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from account.models import Customer, User
+from shipment_module.models import PodList, PolList, RefCounter, Shipment
+
+
+class Command(BaseCommand):
+    help = "Run N parallel shipment creators and check the ref allocator for duplicates and throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8, help="Parallel creators")
+        parser.add_argument("--per-worker", type=int, default=50, help="Shipments created by each worker")
+        parser.add_argument("--block", type=int, default=1, help="Refs reserved per allocation (block mode when > 1)")
+        parser.add_argument("--day", default="2000-01-01", help="Day the refs are issued for (YYYY-MM-DD)")
+        parser.add_argument("--keep", action="store_true", help="Keep the created rows")
+
+    def handle(self, *args, **options):
+        day = date.fromisoformat(options["day"])
+        prefix = day.strftime("%y%m%d")
+        if Shipment.objects.filter(ref__startswith=prefix).exists() and not options["keep"]:
+            self.stderr.write(f"Shipments with prefix {prefix} already exist; pick another --day.")
+            return
+
+        client, _ = Customer.objects.get_or_create(name="bench-client")
+        sp, _ = User.objects.get_or_create(username="bench-sp")
+        pol, _ = PolList.objects.get_or_create(data="BENCH-POL")
+        pod, _ = PodList.objects.get_or_create(data="BENCH-POD")
+
+        refs, errors = [], []
+        lock = threading.Lock()
+
+        def creator():
+            created = []
+            try:
+                remaining = options["per_worker"]
+                while remaining:
+                    block = RefCounter.objects.allocate(min(options["block"], remaining), day=day)
+                    for ref in block:
+                        Shipment.objects.create(ref=ref, client=client, sp=sp, pol=pol, pod=pod)
+                        created.append(ref)
+                    remaining -= len(block)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                with lock:
+                    refs.extend(created)
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=creator) for _ in range(options["workers"])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        duplicates = len(refs) - len(set(refs))
+        self.stdout.write(f"workers={options['workers']} block={options['block']} created={len(refs)} "
+                          f"errors={len(errors)} duplicates={duplicates}")
+        self.stdout.write(f"elapsed={elapsed:.3f}s throughput={len(refs) / elapsed if elapsed else 0:.1f} shipments/s")
+        for e in errors[:5]:
+            self.stderr.write(repr(e))
+
+        if not options["keep"]:
+            Shipment.objects.filter(ref__startswith=prefix).delete()
+            RefCounter.objects.filter(prefix=prefix).delete()
+
+        if duplicates or errors:
+            self.stderr.write(self.style.ERROR("FAILED"))
+        else:
+            self.stdout.write(self.style.SUCCESS("OK"))
@@ -0,0 +1,88 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from account.models import Consignee, Customer, Shipper, User
+from shipment_module.models import PodList, PolList, RefCounter, Shipment
+from shipment_module.search import refresh_index
+from shipment_module.synthetic import check_synthetic_allowed
+
+
+class Command(BaseCommand):
+    help = "Compare full-text and LIKE search latency on the shipment changelist at growing table sizes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated table sizes")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per search term")
+        parser.add_argument("--keep", action="store_true", help="Keep the synthetic shipments")
+        parser.add_argument("--force", action="store_true",
+                            help="Run with DEBUG off; synthetic data is written to this database")
+
+    def grow(self, target, created):
+        sp, _ = User.objects.get_or_create(username="bench-sp")
+        pol, _ = PolList.objects.get_or_create(data="BENCH-POL")
+        pod, _ = PodList.objects.get_or_create(data="BENCH-POD")
+        clients = [Customer.objects.get_or_create(name=f"bench client {i}")[0] for i in range(200)]
+        shippers = [Shipper.objects.get_or_create(name=f"bench shipper {i}")[0] for i in range(200)]
+        cnees = [Consignee.objects.get_or_create(name=f"bench cnee {i}", company="bench")[0] for i in range(200)]
+        rng = random.Random(len(created))
+        # one synthetic day per 5000 refs, starting far in the past
+        while len(created) < target:
+            day = date(2000, 1, 3) + timedelta(days=len(created) // 5000)
+            count = min(5000, target - len(created))
+            refs = RefCounter.objects.allocate(count, day=day)
+            Shipment.objects.bulk_create(
+                [Shipment(ref=ref, client=rng.choice(clients), sp=sp, pol=pol, pod=pod,
+                          shipper=rng.choice(shippers), cnee=rng.choice(cnees),
+                          mawb=f"{rng.randint(100, 999)}-{rng.randint(10**7, 10**8 - 1)}",
+                          hawb=f"H{rng.randint(10**5, 10**6 - 1)}") for ref in refs],
+                batch_size=1000,
+            )
+            refresh_index(Shipment.objects.filter(ref__in=refs))
+            created.extend(refs)
+
+    def time_search(self, model_admin, request, term, use_index):
+        queryset = Shipment.objects.all()
+        samples = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            if use_index:
+                results, _ = model_admin.get_search_results(request, queryset, term)
+            else:
+                results, _ = admin.ModelAdmin.get_search_results(model_admin, request, queryset, term)
+            results.count()
+            list(results[:50])
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples) * 1000
+
+    def handle(self, *args, **options):
+        check_synthetic_allowed(options["force"])
+        self.repeat = options["repeat"]
+        model_admin = admin.site._registry[Shipment]
+        request = RequestFactory().get("/")
+        request.user = User.objects.filter(is_superuser=True).first() or User(is_superuser=True)
+
+        created = []
+        try:
+            for size in sorted(int(s) for s in options["sizes"].split(",")):
+                self.grow(size, created)
+                sample = Shipment.objects.filter(ref__in=created[-1000:]).select_related("client").first()
+                terms = {
+                    "ref prefix": sample.ref[:8],
+                    "mawb prefix": sample.mawb[:7],
+                    "client name": sample.client.name,
+                }
+                for label, term in terms.items():
+                    fts = self.time_search(model_admin, request, term, use_index=True)
+                    like = self.time_search(model_admin, request, term, use_index=False)
+                    self.stdout.write(f"size={size} {label} ({term!r}): index={fts:.1f}ms like={like:.1f}ms")
+        finally:
+            if not options["keep"]:
+                for start in range(0, len(created), 5000):
+                    Shipment.objects.filter(ref__in=created[start:start + 5000]).delete()
+                RefCounter.objects.filter(prefix__in={ref[:6] for ref in created}).delete()
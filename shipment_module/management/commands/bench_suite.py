@@ -0,0 +1,193 @@
+import json
+import statistics
+import time
+from datetime import date, timedelta
+
+import django
+import tablib
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.utils import timezone
+
+from account.models import User
+from shipment_module.exports import export_queryset, iter_rows, stream_csv
+from shipment_module.invoices import invoice_cache_key, invoice_page, invoice_queryset
+from shipment_module.manifest import batch_manifest_response, manifest_queryset, manifest_response
+from shipment_module.models import RefCounter, Shipment
+from shipment_module.resources import ShipmentBulkImportResource, ShipmentModelResource
+from shipment_module.synthetic import check_synthetic_allowed, generate_synthetic_data, synthetic_shipments
+from shipment_module.utils import QueryCounter
+
+
+# bulk_update builds one CASE per column per batch, so updates are timed on fewer rows
+UPDATE_ROWS = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the hot paths (ref allocation, admin changelist per filter, search, import/export, "
+        "manifests, invoices) on the synthetic data set and write a JSON report; --compare diffs two runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shipments", type=int, default=10000,
+                            help="Generate synthetic shipments first if fewer exist")
+        parser.add_argument("--rows", type=int, default=10000, help="Rows exported / imported")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark (median is reported)")
+        parser.add_argument("--only", default="", help="Comma-separated benchmark name prefixes to run")
+        parser.add_argument("--output", default="bench_report.json", help="Where to write the JSON report")
+        parser.add_argument("--compare", default=None, metavar="REPORT", help="Earlier report to compare against")
+        parser.add_argument("--threshold", type=float, default=10.0,
+                            help="Flag benchmarks whose median grew by more than this percentage")
+        parser.add_argument("--force", action="store_true",
+                            help="Run with DEBUG off; synthetic data is written to this database")
+
+    # -------------------------------
+    # Benchmarks
+    # -------------------------------
+    def changelist(self, model_admin, params):
+        def run():
+            request = self.factory.get("/admin/shipment_module/shipment/", params)
+            request.user = self.user
+            model_admin.changelist_view(request).render()
+        return run
+
+    def benchmarks(self, rows):
+        model_admin = admin.site._registry[Shipment]
+        sample = synthetic_shipments().select_related("client", "carrier").order_by("-pk").first()
+        console_id = synthetic_shipments().exclude(console=None).values_list("console_id", flat=True).first()
+        today = timezone.localdate()
+
+        yield "ref_allocation", self.allocate_refs
+        yield "changelist:default", self.changelist(model_admin, {})
+        for label, params in (
+            ("confirmed", {"confirmed__exact": "1"}),
+            ("confirmed+eta", {"confirmed__exact": "0", "eta__gte": str(today - timedelta(days=7)),
+                               "eta__lt": str(today + timedelta(days=1))}),
+            ("priority", {"priority__exact": "red"}),
+            ("mode", {"mode__exact": "sea_fcl"}),
+            ("client", {"client__id__exact": sample.client_id}),
+            ("carrier", {"carrier__id__exact": sample.carrier_id}),
+            ("console", {"console__id__exact": console_id}),
+            ("sp", {"sp__id__exact": sample.sp_id}),
+        ):
+            yield f"changelist:{label}", self.changelist(model_admin, params)
+        for label, term in (("ref", sample.ref[:8]), ("mawb", sample.mawb[:7]), ("client", sample.client.name)):
+            yield f"search:{label}", self.changelist(model_admin, {"q": term})
+
+        # the newest `rows` shipments, as a filter: the export walks its own keyset chunks
+        newest = synthetic_shipments().order_by("-pk").values_list("pk", flat=True)
+        export_rows = synthetic_shipments().filter(pk__gte=newest[min(rows, newest.count()) - 1])
+        yield f"export:csv_{rows}", lambda: sum(len(line) for line in stream_csv(iter_rows(export_rows)))
+        # round trips of the admin export: with the refs cleared every row is new, as
+        # in a fresh spreadsheet; with them kept, rows update the existing shipments
+        dataset = ShipmentModelResource().export(queryset=export_queryset(export_rows))
+        ref = dataset.headers.index("ref")
+        new_rows = tablib.Dataset(*[row[:ref] + ("",) + row[ref + 1:] for row in dataset], headers=dataset.headers)
+        updates = tablib.Dataset(*dataset[:UPDATE_ROWS], headers=dataset.headers)
+        for label, data in ((f"new_{len(new_rows)}", new_rows), (f"update_{len(updates)}", updates)):
+            yield f"import:{label}", lambda data=data: ShipmentBulkImportResource().import_data(
+                data, dry_run=True, use_transactions=True, user=self.user
+            )
+
+        yield "manifest:single", lambda: manifest_response(manifest_queryset(Shipment.objects).get(pk=sample.pk))
+        # the ZIP streams; consume it so the entries are actually built
+        yield "manifest:batch_zip", lambda: b"".join(batch_manifest_response(
+            synthetic_shipments().filter(console_id=console_id), as_zip=True
+        ).streaming_content)
+        invoices = invoice_queryset(synthetic_shipments()).order_by("-pk")[:50]
+        yield "invoice:batch_50_cold", lambda: (
+            cache.delete_many([invoice_cache_key(pk) for pk in invoices.values_list("pk", flat=True)]),
+            invoice_page(invoices),
+        )
+        yield "invoice:batch_50_warm", lambda: invoice_page(invoices)
+
+    def allocate_refs(self):
+        # a day no real shipment uses; the counter row is dropped afterwards
+        day = date(1990, 1, 1)
+        try:
+            for _ in range(100):
+                RefCounter.objects.allocate(day=day)
+        finally:
+            RefCounter.objects.filter(prefix=day.strftime("%y%m%d")).delete()
+
+    def measure(self, func, repeat):
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            func()  # warm-up; also the query count of one run
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return {
+            "median_ms": round(statistics.median(samples), 2),
+            "min_ms": round(min(samples), 2),
+            "max_ms": round(max(samples), 2),
+            "queries": queries.count,
+        }
+
+    # -------------------------------
+    # Report
+    # -------------------------------
+    def compare(self, report, path, threshold):
+        try:
+            with open(path) as f:
+                baseline = json.load(f)["benchmarks"]
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"cannot read {path}: {e}")
+        regressions = 0
+        self.stdout.write(f"\n{'benchmark':<28} {'before':>10} {'after':>10} {'change':>8} queries")
+        for name, result in report["benchmarks"].items():
+            before = baseline.get(name)
+            if before is None:
+                self.stdout.write(f"{name:<28} {'-':>10} {result['median_ms']:>10.1f}        new")
+                continue
+            change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] * 100 if before["median_ms"] else 0
+            line = (f"{name:<28} {before['median_ms']:>10.1f} {result['median_ms']:>10.1f} {change:>+7.1f}% "
+                    f"{before['queries']}->{result['queries']}")
+            if change > threshold or result["queries"] > before["queries"]:
+                regressions += 1
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        if regressions:
+            self.stderr.write(self.style.ERROR(f"{regressions} benchmark(s) regressed"))
+
+    def handle(self, *args, **options):
+        check_synthetic_allowed(options["force"])
+        self.factory = RequestFactory()
+        self.user = User.objects.filter(is_superuser=True).first() or User(username="bench", is_superuser=True, is_staff=True)
+
+        missing = options["shipments"] - synthetic_shipments().count()
+        if missing > 0:
+            self.stderr.write(f"generating {missing} synthetic shipment(s)")
+            generate_synthetic_data(shipments=missing, log=lambda message: self.stderr.write(message))
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE" if connection.vendor == "sqlite" else f"ANALYZE TABLE {Shipment._meta.db_table}")
+
+        only = [prefix for prefix in options["only"].split(",") if prefix]
+        report = {
+            "meta": {
+                "created_at": timezone.now().isoformat(),
+                "database": connection.vendor,
+                "django": django.get_version(),
+                "shipments": Shipment.objects.count(),
+                "repeat": options["repeat"],
+            },
+            "benchmarks": {},
+        }
+        for name, func in self.benchmarks(options["rows"]):
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            result = report["benchmarks"][name] = self.measure(func, options["repeat"])
+            self.stdout.write(f"{name:<28} median={result['median_ms']:9.1f}ms min={result['min_ms']:9.1f}ms "
+                              f"queries={result['queries']}")
+
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"report written to {options['output']}")
+        if options["compare"]:
+            self.compare(report, options["compare"], options["threshold"])
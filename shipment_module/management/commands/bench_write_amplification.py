@@ -0,0 +1,84 @@
+import re
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from account.models import Customer
+from account.tracking import full_saves
+from shipment_module.models import Charge, Shipment
+from shipment_module.synthetic import check_synthetic_allowed, generate_synthetic_data, synthetic_shipments
+
+
+SET_COLUMN = re.compile(r'"?(\w+)"?\s*=\s*(?:%s|NULL)')
+
+
+class UpdateRecorder:
+    """Columns and bytes of the UPDATE statements run on one table; use with connection.execute_wrapper()."""
+
+    def __init__(self, table):
+        self.prefix = f'UPDATE "{table}"' if connection.vendor != "mysql" else f"UPDATE `{table}`"
+        self.columns = []
+        self.bytes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.startswith(self.prefix):
+            set_clause = sql.split(" SET ", 1)[1].split(" WHERE ", 1)[0]
+            self.columns.append(len(SET_COLUMN.findall(set_clause)))
+            self.bytes += len(sql.encode()) + sum(len(str(p).encode()) for p in params or ())
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = "Columns and bytes written per save() with and without dirty-field tracking (write amplification)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200, help="Rows edited per scenario")
+        parser.add_argument("--force", action="store_true",
+                            help="Run with DEBUG off; synthetic data is written to this database")
+
+    def scenarios(self, rows):
+        shipments = synthetic_shipments().order_by("pk")
+        yield "shipment: toggle confirmed", Shipment, shipments[:rows], \
+            lambda s: setattr(s, "confirmed", not s.confirmed)
+        yield "shipment: change priority", Shipment, shipments[:rows], \
+            lambda s: setattr(s, "priority", "red" if s.priority != "red" else "green")
+        yield "shipment: change G.W", Shipment, shipments[:rows], \
+            lambda s: setattr(s, "gw", f"{int(s.gw_kg or 0) + 1} kg")
+        yield "charge: change amount", Charge, Charge.objects.filter(shipment__in=shipments[:rows]).order_by("pk")[:rows], \
+            lambda c: setattr(c, "amount", c.amount + 1)
+        yield "customer: change phone", Customer, Customer.objects.filter(name__startswith="SYN ").order_by("pk")[:rows], \
+            lambda c: setattr(c, "phone", "+98 21 5555 0000" if c.phone != "+98 21 5555 0000" else "+98 21 5555 0001")
+
+    def run(self, model, queryset, edit):
+        recorder = UpdateRecorder(model._meta.db_table)
+        samples = []
+        # each row is loaded, edited and saved like a change form / list_editable row
+        with transaction.atomic(), connection.execute_wrapper(recorder):
+            for obj in list(queryset):
+                edit(obj)
+                started = time.perf_counter()
+                obj.save()
+                samples.append(time.perf_counter() - started)
+        return {
+            "columns": statistics.mean(recorder.columns) if recorder.columns else 0,
+            "bytes": recorder.bytes / max(len(samples), 1),
+            "ms": statistics.median(samples) * 1000 if samples else 0,
+        }
+
+    def handle(self, *args, **options):
+        check_synthetic_allowed(options["force"])
+        if synthetic_shipments().count() < options["rows"]:
+            generate_synthetic_data(shipments=options["rows"], log=lambda message: self.stderr.write(message))
+
+        self.stdout.write(f"{'scenario':<28} {'columns/UPDATE':>22} {'bytes/save':>20} {'ms/save':>16}")
+        for label, model, queryset, edit in self.scenarios(options["rows"]):
+            with full_saves():
+                before = self.run(model, queryset, edit)
+            after = self.run(model, queryset, edit)
+            self.stdout.write(
+                f"{label:<28} {before['columns']:>9.1f} -> {after['columns']:<9.1f}"
+                f" {before['bytes']:>8.0f} -> {after['bytes']:<8.0f}"
+                f" {before['ms']:>6.2f} -> {after['ms']:<6.2f}"
+            )
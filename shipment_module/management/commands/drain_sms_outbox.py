@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shipment_module.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued SMS from the outbox; runs as a worker unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the due messages and exit")
+        parser.add_argument("--batch-size", type=int, default=None, help="Messages per gateway call (SMS_BATCH_SIZE)")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds to sleep when the outbox is empty")
+
+    def handle(self, *args, **options):
+        while True:
+            totals = drain_outbox(batch_size=options["batch_size"])
+            if any(totals.values()):
+                self.stdout.write(
+                    f"sent={totals['sent']} retried={totals['retried']} failed={totals['failed']}"
+                )
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
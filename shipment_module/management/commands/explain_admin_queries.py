@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import RequestFactory
+from django.utils import timezone
+
+from account.models import User
+from shipment_module.models import Shipment
+
+
+class Command(BaseCommand):
+    help = "Print the query plan of the hot ShipmentAdmin changelist queries (one per filter shape)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias to explain against")
+        parser.add_argument("--sql", action="store_true", help="Also print the SQL of each query")
+
+    def sample_pk(self, field):
+        value = Shipment.objects.exclude(**{f"{field}__isnull": True}).values_list(f"{field}_id", flat=True).first()
+        return value or 1
+
+    def shapes(self):
+        today = timezone.now().date()
+        eta_range = f"eta__gte={today - timedelta(days=7)}&eta__lt={today + timedelta(days=1)}"
+        return {
+            "default ordering": "",
+            "confirmed": "confirmed__exact=1",
+            "confirmed + eta range": f"confirmed__exact=0&{eta_range}",
+            "priority": "priority__exact=red",
+            "client": f"client__id__exact={self.sample_pk('client')}",
+            "carrier": f"carrier__id__exact={self.sample_pk('carrier')}",
+            "console": f"console__id__exact={self.sample_pk('console')}",
+            "sp": f"sp__id__exact={self.sample_pk('sp')}",
+        }
+
+    def explain(self, label, queryset, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        if options["sql"]:
+            self.stdout.write(str(queryset.query))
+        self.stdout.write(queryset.explain())
+        self.stdout.write("")
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        model_admin = admin.site._registry[Shipment]
+        user = User.objects.using(using).filter(is_superuser=True).first() or User(is_superuser=True)
+        factory = RequestFactory()
+
+        self.stdout.write(f"Backend: {connections[using].vendor}\n")
+        for label, params in self.shapes().items():
+            request = factory.get("/", data=None, QUERY_STRING=params)
+            request.user = user
+            changelist = model_admin.get_changelist_instance(request)
+            queryset = changelist.queryset.using(using)
+            self.explain(f"{label} ({params or 'no filter'})", queryset[:changelist.list_per_page], options)
+
+        # the daily ref allocation seed seeks the unique ref index by range
+        prefix = timezone.now().strftime("%y%m%d")
+        refs = Shipment.objects.using(using).filter(
+            ref__gte=prefix, ref__lt=f"{prefix}:"
+        ).order_by().values_list("ref", flat=True)
+        self.explain(f"ref prefix ({prefix})", refs, options)
@@ -0,0 +1,55 @@
+import os
+import sys
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from shipment_module.changefeed import iter_changes, ndjson_line
+from shipment_module.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = "Write the shipment change feed since a cursor as NDJSON (same format as /api/changes/)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cursor", default="", help="Cursor to resume from (default: everything)")
+        parser.add_argument("--cursor-file", help="Read the cursor from this file and store the new one there on success")
+        parser.add_argument("--output", help="File to write (default: stdout)")
+        parser.add_argument("--limit", type=int, default=None, help="Rows per stream")
+        parser.add_argument("--prune-tombstones", type=int, metavar="DAYS", help="Delete tombstones older than DAYS first")
+
+    def handle(self, *args, **options):
+        if options["prune_tombstones"] is not None:
+            cutoff = timezone.now() - timedelta(days=options["prune_tombstones"])
+            pruned, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+            self.stderr.write(f"pruned {pruned} tombstone(s)")
+
+        cursor = options["cursor"]
+        cursor_file = options["cursor_file"]
+        if cursor_file and os.path.exists(cursor_file):
+            with open(cursor_file) as f:
+                cursor = f.read().strip()
+
+        output = open(options["output"], "w") if options["output"] else sys.stdout
+        rows = 0
+        try:
+            for change in iter_changes(cursor, limit=options["limit"]):
+                if change["type"] == "cursor":
+                    cursor = change["cursor"]
+                else:
+                    rows += 1
+                output.write(ndjson_line(change))
+        except ValidationError as exc:
+            raise CommandError(exc.messages[0])
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        if cursor_file:
+            # replace atomically so a crash never leaves a truncated cursor
+            with open(f"{cursor_file}.tmp", "w") as f:
+                f.write(cursor)
+            os.replace(f"{cursor_file}.tmp", cursor_file)
+        self.stderr.write(f"{rows} change(s); cursor {cursor}")
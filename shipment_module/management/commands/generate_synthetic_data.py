@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shipment_module.synthetic import check_synthetic_allowed, generate_synthetic_data, purge_synthetic_data, synthetic_shipments
+
+
+class Command(BaseCommand):
+    help = "Fill the database with realistic synthetic parties, lanes, consoles and shipments (with charges and comments)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shipments", type=int, default=10000)
+        parser.add_argument("--customers", type=int, default=200)
+        parser.add_argument("--parties", type=int, default=300, help="Shippers and consignees each")
+        parser.add_argument("--consoles", type=int, default=100)
+        parser.add_argument("--months", type=int, default=12, help="Spread shipments over this many past months")
+        parser.add_argument("--charges", type=int, default=3, help="Up to this many charges per shipment")
+        parser.add_argument("--comments", type=int, default=1, help="Up to this many comments per shipment")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--purge", action="store_true", help="Delete the synthetic data instead")
+        parser.add_argument("--force", action="store_true",
+                            help="Run with DEBUG off; synthetic data is written to this database")
+
+    def handle(self, *args, **options):
+        check_synthetic_allowed(options["force"])
+        started = time.perf_counter()
+        if options["purge"]:
+            deleted = purge_synthetic_data()
+            self.stdout.write(f"Deleted {deleted} synthetic shipment(s) in {time.perf_counter() - started:.1f}s")
+            return
+        created = generate_synthetic_data(
+            shipments=options["shipments"], customers=options["customers"], parties=options["parties"],
+            consoles=options["consoles"], months=options["months"], charges=options["charges"],
+            comments=options["comments"], seed=options["seed"],
+            log=lambda message: self.stderr.write(message),
+        )
+        self.stdout.write(
+            f"Created {created} shipment(s) in {time.perf_counter() - started:.1f}s "
+            f"({synthetic_shipments().count()} synthetic in total)"
+        )
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import tablib
+from django.core.management.base import BaseCommand, CommandError
+
+from account.models import User
+from shipment_module.resources import ShipmentBulkImportResource
+
+
+class Command(BaseCommand):
+    help = "Bulk-import a shipment spreadsheet (csv/xlsx/xls/json) with batched lookups and bulk writes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--user", help="Username recorded as S/P on new shipments")
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--create-missing", action="store_true",
+                            help="Create ports, terms, carriers and parties the file names but the database lacks")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+        fmt = path.suffix.lstrip(".").lower()
+        mode = "r" if fmt in ("csv", "json", "tsv") else "rb"
+        with open(path, mode) as f:
+            dataset = tablib.Dataset().load(f.read(), format=fmt)
+
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"Unknown user {options['user']}")
+
+        result = ShipmentBulkImportResource(create_missing=options["create_missing"]).import_data(
+            dataset, dry_run=options["dry_run"], use_transactions=True, user=user
+        )
+        for error in result.base_errors:
+            self.stderr.write(str(error.error))
+        for line, errors in result.row_errors():
+            self.stderr.write(f"row {line}: {errors[0].error}")
+        for invalid in result.invalid_rows:
+            self.stderr.write(f"row {invalid.number}: {invalid.error_dict}")
+        self.stdout.write(", ".join(f"{k}={v}" for k, v in result.totals.items()))
+        self.stdout.write("lookup cache: " + ", ".join(f"{k}={v}" for k, v in result.lookup_cache_stats.items()))
@@ -0,0 +1,41 @@
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+
+from shipment_module.caching import form_metric_names, get_metrics, reset_metrics
+from shipment_module.models import Shipment
+
+
+class Command(BaseCommand):
+    help = "Hit rate of the cached autocomplete results (in-process / shared) and average queries per Shipment admin form."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing them")
+
+    def handle(self, *args, **options):
+        model_admin = admin.site._registry[Shipment]
+        names = []
+
+        seen = set()
+        for field_name in model_admin.autocomplete_fields:
+            label = Shipment._meta.get_field(field_name).related_model._meta.label_lower
+            if label in seen:
+                continue
+            seen.add(label)
+            keys = [f"autocomplete:{label}:{kind}" for kind in ("local_hits", "shared_hits", "misses")]
+            names.extend(keys)
+            local_hits, shared_hits, misses = get_metrics(keys).values()
+            total = local_hits + shared_hits + misses
+            rate = f"{(local_hits + shared_hits) / total:.1%}" if total else "-"
+            self.stdout.write(
+                f"{label:<28} local hits={local_hits} shared hits={shared_hits} misses={misses} hit rate={rate}"
+            )
+
+        for method in ("GET", "POST"):
+            keys = form_metric_names(Shipment, method)
+            names.extend(keys)
+            renders, queries = get_metrics(keys).values()
+            average = f"{queries / renders:.1f}" if renders else "-"
+            self.stdout.write(f"shipment form {method:<4} renders={renders} queries/form={average}")
+
+        if options["reset"]:
+            reset_metrics(names)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from shipment_module.models import Shipment
+from shipment_module.reports import MEASURE_REPORT_GROUPS, measure_totals
+
+
+class Command(BaseCommand):
+    help = "Pieces, weight and volume totals per mode, lane or carrier."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--by", choices=sorted(MEASURE_REPORT_GROUPS), default="mode")
+        parser.add_argument("--etd-from", type=parse_date, help="YYYY-MM-DD, inclusive")
+        parser.add_argument("--etd-to", type=parse_date, help="YYYY-MM-DD, inclusive")
+        parser.add_argument("--confirmed", action="store_true", help="Confirmed shipments only")
+
+    def handle(self, *args, **options):
+        queryset = Shipment.objects.all()
+        if options["etd_from"]:
+            queryset = queryset.filter(etd__gte=options["etd_from"])
+        if options["etd_to"]:
+            queryset = queryset.filter(etd__lte=options["etd_to"])
+        if options["confirmed"]:
+            queryset = queryset.filter(confirmed=True)
+
+        labels = [column for column in MEASURE_REPORT_GROUPS[options["by"]] if not column.endswith("_id")]
+        for row in measure_totals(queryset, options["by"]):
+            group = " → ".join(str(row[column] or "-") for column in labels)
+            self.stdout.write(
+                f"{group:<40} shipments={row['shipments']} pcs={row['total_pcs'] or 0} "
+                f"gw={row['total_gw_kg'] or 0}kg cw={row['total_cw_kg'] or 0}kg vol={row['total_vol_cbm'] or 0}cbm "
+                f"unparsed_gw={row['unparsed_gw']}"
+            )
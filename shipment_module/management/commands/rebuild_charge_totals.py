@@ -0,0 +1,14 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shipment_module.totals import rebuild_charge_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute Shipment.charge_totals / charges_total_usd from all Charge rows with one GROUP BY."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        updated = rebuild_charge_totals()
+        self.stdout.write(f"Rebuilt charge totals of {updated} shipment(s) in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from shipment_module.models import Shipment, ShipmentSearchIndex
+from shipment_module.search import refresh_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the shipment full-text search index (chunked)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--missing-only", action="store_true", help="Only index shipments without an entry")
+
+    def handle(self, *args, **options):
+        queryset = Shipment.objects.all()
+        if options["missing_only"]:
+            queryset = queryset.filter(search_index__isnull=True)
+        else:
+            ShipmentSearchIndex.objects.all().delete()
+        refresh_index(queryset)
+        self.stdout.write(f"indexed={ShipmentSearchIndex.objects.count()}")
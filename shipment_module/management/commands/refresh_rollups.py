@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shipment_module.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Refresh the lane/carrier monthly rollups behind the analytics dashboard; schedule it (cron) or run with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rebuild every month instead of the changed ones")
+        parser.add_argument("--loop", type=float, default=None, metavar="SECONDS",
+                            help="Keep refreshing, sleeping this long between runs")
+
+    def handle(self, *args, **options):
+        full = options["full"]
+        while True:
+            started = time.perf_counter()
+            months = refresh_rollups(full=full)
+            self.stdout.write(
+                f"Refreshed {len(months)} month(s) in {time.perf_counter() - started:.2f}s"
+                + (f": {', '.join(month.strftime('%Y-%m') for month in months)}" if months and len(months) <= 12 else "")
+            )
+            if options["loop"] is None:
+                return
+            full = False
+            time.sleep(options["loop"])
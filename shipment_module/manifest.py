@@ -0,0 +1,222 @@
+import zipfile
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from .routing import pin_reads
+
+# everything the manifest lines read from related tables
+MANIFEST_RELATED = ("cnee", "carrier", "pol", "shipper")
+
+
+def manifest_queryset(queryset):
+    return queryset.select_related(*MANIFEST_RELATED)
+
+
+def _value(obj, attr):
+    # related parties are optional; a missing one renders as an empty cell
+    if obj is None:
+        return ""
+    return getattr(obj, attr) or ""
+
+
+class ManifestSerializer:
+    """Builds the VOY/BOL/CTR/CON lines of a shipment manifest."""
+
+    def lines(self, shipment):
+        return [
+            self.build_voy_line(shipment),
+            self.build_bol_line(shipment),
+            self.build_ctr_line(shipment),
+            self.build_con_line(shipment),
+        ]
+
+    def serialize(self, shipment):
+        # exact CSV-style output with quotes
+        return "\n".join(
+            ['"' + '","'.join(str(v or "") for v in line) + '"' for line in self.lines(shipment)]
+        )
+
+    def filename(self, shipment):
+        return f"Manifest_{shipment.ref or shipment.pk}.txt"
+
+    # =========================
+    # VOY
+    # =========================
+    def build_voy_line(self, shipment):
+        flight_1, flight_2 = self.get_flights(shipment)
+
+        return [
+            "VOY",
+            _value(shipment.cnee, "national_id"),
+            _value(shipment.carrier, "national_id"),
+            flight_1, #1?
+            flight_2, #1?
+            #2?
+            self.format_date(shipment.eta) or "",
+            "",
+            "MFI",
+            "1",
+            shipment.manifest_no or "",
+        ]
+
+    # =========================
+    # BOL
+    # =========================
+    def build_bol_line(self, shipment):
+        pol = shipment.pol
+
+        return [
+            "BOL",
+            shipment.hawb or "",
+            "10102122004", "10102122004",
+            pol.airport_abbr or "",
+            pol.airport_abbr or "",
+            #2?
+            self.format_date(shipment.eta) or "",
+            "",
+            "I",
+            "S",
+            "", "",
+            "G",
+            "N","Y","FCL/FCL",
+            pol.country_abbr or "",
+            "","","","",
+            shipment.mawb or "",
+            "", "",
+            _value(shipment.shipper, "name"),
+            pol.country_name or "",
+            "",
+            _value(shipment.cnee, "national_id"),
+            shipment.cnee or "",
+            "","","","","","","","","","NM",
+            shipment.hscode or "",
+            shipment.commodity or "",
+            shipment.pcs or "",
+            "CTN",
+            "CTN",
+            "BULK1234567", #12?
+            "1","1","0","1",
+            shipment.gw or "",
+            shipment.gw or "",
+            "0","0","0","0","Y","",""
+        ]
+
+    # =========================
+    # CTR
+    # =========================
+    def build_ctr_line(self, shipment):
+        return [
+            "CTR",
+            "BULK1234567", #12?
+            "1",
+            "1",
+            "1",
+        ]
+
+    # =========================
+    # CON
+    # =========================
+    def build_con_line(self, shipment):
+        return [
+            "CON",
+            shipment.manifest_no or "",
+            "NM",
+            shipment.commodity or "",
+            "N",
+            shipment.hscode or "",
+            shipment.pcs or "",
+            "CTN",
+            "CTN",
+            shipment.pcs or "",
+            shipment.gw or "",
+            shipment.vol or "",
+            "N",
+            "",
+            "",
+            "0",
+            "C",
+            "D",
+            "N",
+            "0",
+            "0",
+            "C",
+        ]
+
+    # =========================
+    # Helpers
+    # =========================
+    def get_flights(self, shipment):
+        """
+        Flights are derived, not stored.
+        Adjust logic later if needed.
+        """
+        if shipment.mode and shipment.mode.startswith("air"):
+            return ("EK9873", "EK9873")
+        return ("", "")
+
+    def format_date(self, date_obj):
+        if not date_obj:
+            return ""
+        return date_obj.strftime("%d%b%Y").upper()
+
+
+def manifest_response(shipment, serializer=None):
+    serializer = serializer or ManifestSerializer()
+    response = HttpResponse(serializer.serialize(shipment), content_type="text/plain; charset=utf-8")
+    response["Content-Disposition"] = content_disposition_header(True, serializer.filename(shipment))
+    return response
+
+
+class ZipStream:
+    """Write-only file for zipfile; the response drains what was written after each entry."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def batch_manifest_response(queryset, as_zip=False, filename="Manifests", serializer=None):
+    """
+    One download for many shipments, streamed as it is built: a combined .txt
+    (manifests separated by a blank line) or a ZIP with one file per shipment.
+    Only the current entry is held in memory either way (the ZIP has no
+    tell()/seek(), so zipfile writes data descriptors after each entry).
+    All related parties come from a single select_related query.
+    """
+    serializer = serializer or ManifestSerializer()
+    # the body streams after the view returns; read from the alias chosen now
+    shipments = pin_reads(manifest_queryset(queryset)).order_by("ref", "pk").iterator(chunk_size=500)
+
+    if as_zip:
+        def content():
+            stream = ZipStream()
+            with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+                for shipment in shipments:
+                    archive.writestr(serializer.filename(shipment), serializer.serialize(shipment))
+                    yield stream.drain()
+            # central directory
+            yield stream.drain()
+
+        response = StreamingHttpResponse(content(), content_type="application/zip")
+        response["Content-Disposition"] = content_disposition_header(True, f"{filename}.zip")
+        return response
+
+    def content():
+        for i, shipment in enumerate(shipments):
+            yield ("\n\n" if i else "") + serializer.serialize(shipment)
+
+    response = StreamingHttpResponse(content(), content_type="text/plain; charset=utf-8")
+    response["Content-Disposition"] = content_disposition_header(True, f"{filename}.txt")
+    return response
@@ -0,0 +1,119 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.backends.base.operations import BaseDatabaseOperations
+
+
+# source CharField -> (numeric shadow field, unit kind)
+MEASURE_FIELDS = {
+    "pcs": ("pcs_num", "count"),
+    "gw": ("gw_kg", "weight"),
+    "first_gw": ("first_gw_kg", "weight"),
+    "vol": ("vol_cbm", "volume"),
+    "cw": ("cw_kg", "weight"),
+    "first_cw": ("first_cw_kg", "weight"),
+}
+
+# unit suffix -> factor to kg / cbm / pieces
+UNITS = {
+    "weight": {"": 1, "kg": 1, "kgs": 1, "k": 1, "t": 1000, "ton": 1000, "tons": 1000,
+               "lb": Decimal("0.45359237"), "lbs": Decimal("0.45359237")},
+    "volume": {"": 1, "cbm": 1, "m3": 1, "m³": 1},
+    "count": {"": 1, "pcs": 1, "pc": 1, "pkg": 1, "pkgs": 1, "ctn": 1, "ctns": 1, "plt": 1, "plts": 1,
+              "pallet": 1, "pallets": 1},
+}
+BLANK_VALUES = {"", "-", "--", "n/a", "na", "n.a", "n.a.", "nil", "none", "tbc", "tba", "?"}
+QUANTUM = Decimal("0.001")
+
+# Persian and Arabic-Indic digits and separators, as typed on local keyboards
+DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩٫٬", "01234567890123456789.,")
+NUMBER = re.compile(r"^([0-9][0-9.,' ]*)\s*([^\d\s]*)$")
+
+
+class MeasureParseError(ValueError):
+    pass
+
+
+def parse_number(text):
+    """
+    "1,234.5" / "1.234,5" / "1 234" / "12,5" -> Decimal.  A lone separator
+    followed by exactly three digits is a thousands separator.
+    """
+    text = text.replace(" ", "").replace("'", "")
+    if "," in text and "." in text:
+        # the separator that comes last is the decimal one
+        if text.rfind(",") > text.rfind("."):
+            text = text.replace(".", "").replace(",", ".")
+        else:
+            text = text.replace(",", "")
+    elif "," in text or "." in text:
+        separator = "," if "," in text else "."
+        head, _, tail = text.rpartition(separator)
+        if text.count(separator) > 1 or (len(tail) == 3 and head and head != "0"):
+            text = text.replace(separator, "")
+        else:
+            text = text.replace(",", ".")
+    return Decimal(text)
+
+
+def parse_measure(value, kind):
+    """
+    Legacy free-text weight/volume/piece strings -> Decimal in kg, cbm or pieces.
+    Returns None for blank placeholders; raises MeasureParseError otherwise.
+    """
+    if value is None:
+        return None
+    text = str(value).translate(DIGITS).strip().lower()
+    if text in BLANK_VALUES:
+        return None
+    match = NUMBER.match(text)
+    if not match:
+        raise MeasureParseError(f"not a single number: {value!r}")
+    number, unit = match.groups()
+    unit = unit.rstrip(".")
+    if unit not in UNITS[kind]:
+        raise MeasureParseError(f"unknown {kind} unit {unit!r} in {value!r}")
+    try:
+        result = parse_number(number.strip()) * UNITS[kind][unit]
+        if kind == "count" and result != result.to_integral_value():
+            raise MeasureParseError(f"fractional piece count: {value!r}")
+        # more digits than the decimal context holds also fails here
+        return result.quantize(QUANTUM)
+    except InvalidOperation:
+        raise MeasureParseError(f"not a number: {value!r}")
+
+
+def check_range(field, value):
+    """Raise MeasureParseError unless `value` fits the shadow column (max_digits, integer range)."""
+    if isinstance(field, models.IntegerField):
+        # the portable range: SQLite would store more than MySQL/PostgreSQL accept
+        low, high = BaseDatabaseOperations.integer_field_ranges[field.get_internal_type()]
+        if not low <= value <= high:
+            raise MeasureParseError(f"out of range for {field.name}: {value} (max {high})")
+        return
+    try:
+        field.run_validators(value)
+    except ValidationError as exc:
+        raise MeasureParseError(f"out of range for {field.name}: {value} ({' '.join(exc.messages)})")
+
+
+def measure_values(instance):
+    """
+    Parse the measure CharFields of a shipment: ({shadow field: value}, {source field: error}).
+    Unparseable values, and values the shadow column cannot hold, become None.
+    """
+    values, errors = {}, {}
+    for source, (target, kind) in MEASURE_FIELDS.items():
+        try:
+            value = parse_measure(getattr(instance, source), kind)
+            if value is not None:
+                if kind == "count":
+                    value = int(value)
+                check_range(instance._meta.get_field(target), value)
+            values[target] = value
+        except MeasureParseError as exc:
+            values[target] = None
+            errors[source] = str(exc)
+    return values, errors
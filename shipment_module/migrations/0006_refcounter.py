@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipment_module', '0005_shipment_invoice_deadline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=6, unique=True, verbose_name='Date Prefix')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Last Value')),
+            ],
+            options={
+                'verbose_name': 'Ref Counter',
+                'verbose_name_plural': 'Ref Counters',
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:49
+
+import django.db.models.deletion
+from django.db import OperationalError, migrations, models, transaction
+
+from shipment_module.search import FTS_TABLE, INDEX_TABLE, SEARCH_CHUNK_SIZE, SEARCH_RELATED, build_document
+
+SQLITE_FTS = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(document, content='{INDEX_TABLE}', content_rowid='shipment_id')",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {INDEX_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.shipment_id, new.document);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {INDEX_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.shipment_id, old.document);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {INDEX_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.shipment_id, old.document);
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.shipment_id, new.document);
+    END""",
+]
+
+
+def create_fulltext(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite":
+        try:
+            with transaction.atomic(using=connection.alias):
+                for sql in SQLITE_FTS:
+                    schema_editor.execute(sql)
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to LIKE
+            pass
+    elif connection.vendor == "mysql":
+        schema_editor.execute(f"ALTER TABLE {INDEX_TABLE} ADD FULLTEXT INDEX shipment_search_document_ft (document)")
+
+
+def drop_fulltext(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite":
+        for suffix in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif connection.vendor == "mysql":
+        schema_editor.execute(f"ALTER TABLE {INDEX_TABLE} DROP INDEX shipment_search_document_ft")
+
+
+def backfill(apps, schema_editor):
+    Shipment = apps.get_model("shipment_module", "Shipment")
+    ShipmentSearchIndex = apps.get_model("shipment_module", "ShipmentSearchIndex")
+    queryset = Shipment.objects.using(schema_editor.connection.alias).select_related(*SEARCH_RELATED).order_by("pk")
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:SEARCH_CHUNK_SIZE])
+        if not chunk:
+            return
+        ShipmentSearchIndex.objects.using(schema_editor.connection.alias).bulk_create(
+            [ShipmentSearchIndex(shipment_id=s.pk, document=build_document(s)) for s in chunk]
+        )
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipment_module', '0006_refcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShipmentSearchIndex',
+            fields=[
+                ('shipment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_index', serialize=False, to='shipment_module.shipment')),
+                ('document', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Shipment Search Index',
+                'verbose_name_plural': 'Shipment Search Index',
+            },
+        ),
+        migrations.RunPython(create_fulltext, drop_fulltext),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
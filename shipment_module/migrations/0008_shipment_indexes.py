@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_consignee_postal_code'),
+        ('shipment_module', '0007_shipmentsearchindex'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['-created_at', '-id'], name='shipment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['confirmed', 'eta'], name='shipment_confirmed_eta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['priority', '-created_at', '-id'], name='shipment_priority_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['client', '-created_at', '-id'], name='shipment_client_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['carrier', '-created_at', '-id'], name='shipment_carrier_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['console', '-created_at', '-id'], name='shipment_console_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['sp', '-created_at', '-id'], name='shipment_sp_created_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+from shipment_module.totals import rebuild_charge_totals
+
+
+def backfill(apps, schema_editor):
+    rebuild_charge_totals(apps.get_model("shipment_module", "Shipment"), apps.get_model("shipment_module", "Charge"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipment_module', '0009_outboundmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipment',
+            name='charge_totals',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Charge Totals'),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='charges_total_usd',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True, verbose_name='Charges Total (USD)'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipment_module', '0010_shipment_charge_totals'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='console',
+            name='code',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='podlist',
+            name='airport_abbr',
+            field=models.CharField(blank=True, db_index=True, max_length=5, null=True, verbose_name='Airport Abbr'),
+        ),
+        migrations.AlterField(
+            model_name='podlist',
+            name='data',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True, verbose_name='Pod'),
+        ),
+        migrations.AlterField(
+            model_name='pollist',
+            name='airport_abbr',
+            field=models.CharField(blank=True, db_index=True, max_length=5, null=True, verbose_name='Airport Abbr'),
+        ),
+        migrations.AlterField(
+            model_name='pollist',
+            name='data',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True, verbose_name='Pol'),
+        ),
+        migrations.AlterField(
+            model_name='termlist',
+            name='data',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True, verbose_name='Term'),
+        ),
+    ]
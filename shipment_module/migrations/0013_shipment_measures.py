@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipment_module', '0012_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shipment',
+            name='cw_kg',
+            field=models.DecimalField(blank=True, decimal_places=3, editable=False, max_digits=14, null=True, verbose_name='C.W (kg)'),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='first_cw_kg',
+            field=models.DecimalField(blank=True, decimal_places=3, editable=False, max_digits=14, null=True, verbose_name='First C.W (kg)'),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='first_gw_kg',
+            field=models.DecimalField(blank=True, decimal_places=3, editable=False, max_digits=14, null=True, verbose_name='First G.W (kg)'),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='gw_kg',
+            field=models.DecimalField(blank=True, decimal_places=3, editable=False, max_digits=14, null=True, verbose_name='G.W (kg)'),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='pcs_num',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='PCS (number)'),
+        ),
+        migrations.AddField(
+            model_name='shipment',
+            name='vol_cbm',
+            field=models.DecimalField(blank=True, decimal_places=3, editable=False, max_digits=14, null=True, verbose_name='VOL (cbm)'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0003_prefix_search_indexes'),
+        ('shipment_module', '0013_shipment_measures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupDirtyMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('refreshed_until', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LaneMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(max_length=100, unique=True)),
+                ('month', models.DateField(db_index=True)),
+                ('mode', models.CharField(blank=True, max_length=20, null=True)),
+                ('shipments', models.PositiveIntegerField(default=0)),
+                ('confirmed', models.PositiveIntegerField(default=0)),
+                ('transit_days', models.IntegerField(default=0)),
+                ('transit_count', models.PositiveIntegerField(default=0)),
+                ('revenue_usd', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('carrier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='account.carrier')),
+                ('pod', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shipment_module.podlist')),
+                ('pol', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shipment_module.pollist')),
+            ],
+            options={
+                'verbose_name': 'Lane Analytics',
+                'verbose_name_plural': 'Lane Analytics',
+            },
+        ),
+    ]
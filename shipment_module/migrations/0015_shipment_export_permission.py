@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:01
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipment_module', '0014_lane_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='shipment',
+            options={'ordering': ['-created_at'], 'permissions': [('export_shipment', 'Can export shipments')], 'verbose_name': 'Shipment', 'verbose_name_plural': '1. Shipments'},
+        ),
+    ]
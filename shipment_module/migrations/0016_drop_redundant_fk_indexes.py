@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0003_prefix_search_indexes'),
+        ('shipment_module', '0015_shipment_export_permission'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shipment',
+            name='carrier',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='account.carrier', verbose_name='Carrier'),
+        ),
+        migrations.AlterField(
+            model_name='shipment',
+            name='client',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='shipment_client', to='account.customer', verbose_name='Client'),
+        ),
+        migrations.AlterField(
+            model_name='shipment',
+            name='console',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='shipment_module.console', verbose_name='Console'),
+        ),
+        migrations.AlterField(
+            model_name='shipment',
+            name='sp',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='shipment_sp', to=settings.AUTH_USER_MODEL, verbose_name='S/P'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:34
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shipment_module', '0016_drop_redundant_fk_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='console',
+            name='code',
+            field=models.CharField(max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='podlist',
+            name='airport_abbr',
+            field=models.CharField(blank=True, max_length=5, null=True, verbose_name='Airport Abbr'),
+        ),
+        migrations.AlterField(
+            model_name='pollist',
+            name='airport_abbr',
+            field=models.CharField(blank=True, max_length=5, null=True, verbose_name='Airport Abbr'),
+        ),
+        migrations.AddIndex(
+            model_name='console',
+            index=models.Index(django.db.models.functions.text.Lower('code'), name='console_code_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='podlist',
+            index=models.Index(django.db.models.functions.text.Lower('data'), name='podlist_data_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='podlist',
+            index=models.Index(django.db.models.functions.text.Lower('airport_abbr'), name='podlist_airport_abbr_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pollist',
+            index=models.Index(django.db.models.functions.text.Lower('data'), name='pollist_data_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pollist',
+            index=models.Index(django.db.models.functions.text.Lower('airport_abbr'), name='pollist_airport_abbr_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='termlist',
+            index=models.Index(django.db.models.functions.text.Lower('data'), name='termlist_data_lower_idx'),
+        ),
+    ]
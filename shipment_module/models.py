@@ -1,12 +1,90 @@
-from django.db import models, transaction
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import F
+from django.db.models.functions import Lower
 from django.urls import reverse
 from account.models import User, Customer, Shipper, Consignee, Carrier, Agent
+from account.tracking import DirtyFieldsMixin
 from django.utils import timezone
 from django.utils.html import format_html
 
+from .measures import MEASURE_FIELDS, measure_values
+
 
 # Create your models here.
-class Shipment(models.Model):
+def format_ref(date_prefix, counter):
+    # Format counter as 2 digits (00-99), then 3 digits (100+)
+    if counter <= 99:
+        return f"{date_prefix}{counter:02d}"  # "01", ..., "99"
+    return f"{date_prefix}{counter:03d}"  # "100", "101", etc.
+
+
+class RefCounterManager(models.Manager):
+    def allocate(self, count=1, day=None, using=None):
+        """
+        Reserve `count` consecutive refs for `day` (today by default).
+
+        A single-row atomic increment on the day's counter replaces the old
+        select_for_update scan over Shipment.  The row lock is released when
+        the outermost transaction commits, so a caller already inside one
+        (the admin change form, a transactional import) holds it until then;
+        reserve up front where that transaction is long.  Pass count > 1 to
+        reserve a whole block (bulk imports).
+        """
+        if count < 1:
+            raise ValueError("count must be a positive integer")
+        day = day or timezone.now().date()
+        date_prefix = day.strftime("%y%m%d")  # e.g., "251129" (6 digits)
+        # always the primary, even while reads are routed to a replica
+        using = using or self._db or router.db_for_write(self.model)
+        qs = self.db_manager(using).filter(prefix=date_prefix)
+
+        with transaction.atomic(using=using):
+            # UPDATE first so the write lock is taken up front
+            if not qs.update(last_value=F("last_value") + count):
+                try:
+                    with transaction.atomic(using=using):
+                        self.db_manager(using).create(
+                            prefix=date_prefix,
+                            last_value=self._seed_value(date_prefix, using) + count,
+                        )
+                except IntegrityError:
+                    # another creator opened the day first
+                    qs.update(last_value=F("last_value") + count)
+            last = qs.values_list("last_value", flat=True).get()
+
+        return [format_ref(date_prefix, n) for n in range(last - count + 1, last + 1)]
+
+    def _seed_value(self, date_prefix, using):
+        # Continue after refs issued before the counter row existed
+        last_counter = 0
+        # range on the unique ref index ("YYMMDD" <= ref < "YYMMDD:"), which every
+        # backend can seek; LIKE 'YYMMDD%' cannot use it on SQLite
+        refs = Shipment.objects.using(using).filter(
+            ref__gte=date_prefix, ref__lt=f"{date_prefix}:"
+        ).order_by().values_list("ref", flat=True)
+        for ref in refs:
+            try:
+                last_counter = max(last_counter, int(ref[6:]))  # everything after "YYMMDD"
+            except ValueError:
+                continue
+        return last_counter
+
+
+class RefCounter(models.Model):
+    prefix = models.CharField(max_length=6, unique=True, verbose_name="Date Prefix")
+    last_value = models.PositiveIntegerField(default=0, verbose_name="Last Value")
+
+    objects = RefCounterManager()
+
+    class Meta:
+        verbose_name = "Ref Counter"
+        verbose_name_plural = "Ref Counters"
+
+    def __str__(self):
+        return f"{self.prefix}: {self.last_value}"
+
+
+class Shipment(DirtyFieldsMixin, models.Model):
     # 1. Basic Details
     ref = models.CharField(max_length=20, verbose_name="Ref.No.", blank=True, null=True, unique=True)
 
@@ -17,6 +95,7 @@ class Shipment(models.Model):
         verbose_name="Client",
         blank=False,
         null=False,
+        db_index=False,  # shipment_client_created_idx leads with client
     )
     sp = models.ForeignKey(
         to=User,
@@ -24,7 +103,8 @@ class Shipment(models.Model):
         on_delete=models.PROTECT,
         verbose_name="S/P",
         blank=False,
-        null=False
+        null=False,
+        db_index=False,  # shipment_sp_created_idx leads with sp
     )
     pol = models.ForeignKey(
         to='PolList',
@@ -59,7 +139,8 @@ class Shipment(models.Model):
         on_delete=models.SET_NULL,
         blank=True,
         null=True,
-        verbose_name="Carrier"
+        verbose_name="Carrier",
+        db_index=False,  # shipment_carrier_created_idx leads with carrier
     )
 
     # 3. Console & Agent
@@ -69,7 +150,8 @@ class Shipment(models.Model):
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        verbose_name="Console"
+        verbose_name="Console",
+        db_index=False,  # shipment_console_created_idx leads with console
     )
 
     # Agent relation
@@ -120,6 +202,15 @@ class Shipment(models.Model):
     currency = models.CharField(max_length=255, null=True, blank=True, verbose_name="Currency")
     commodity = models.CharField(max_length=255, null=True, blank=True, verbose_name="Commodity")
 
+    # 7b. Parsed copies of the measures above, in pieces / kg / cbm; kept in
+    # sync by apply_derived_fields (see measures.py), None when unparseable
+    pcs_num = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="PCS (number)")
+    gw_kg = models.DecimalField(max_digits=14, decimal_places=3, null=True, blank=True, editable=False, verbose_name="G.W (kg)")
+    first_gw_kg = models.DecimalField(max_digits=14, decimal_places=3, null=True, blank=True, editable=False, verbose_name="First G.W (kg)")
+    vol_cbm = models.DecimalField(max_digits=14, decimal_places=3, null=True, blank=True, editable=False, verbose_name="VOL (cbm)")
+    cw_kg = models.DecimalField(max_digits=14, decimal_places=3, null=True, blank=True, editable=False, verbose_name="C.W (kg)")
+    first_cw_kg = models.DecimalField(max_digits=14, decimal_places=3, null=True, blank=True, editable=False, verbose_name="First C.W (kg)")
+
     # 8. Parties
     shipper = models.ForeignKey(
         to=Shipper,
@@ -173,6 +264,9 @@ class Shipment(models.Model):
     other_charges = models.DecimalField("Other Charges (S/AWB, AAI, AMS, AWB/PCA)", max_digits=12, decimal_places=2, null=True, blank=True)
     total_usd = models.DecimalField("Total (USD)", max_digits=12, decimal_places=2, null=True, blank=True)
     grand_total_usd = models.DecimalField("Grand Total (USD)", max_digits=12, decimal_places=2, null=True, blank=True)
+    # maintained from Charge rows, see totals.py
+    charge_totals = models.JSONField("Charge Totals", default=dict, blank=True, editable=False)
+    charges_total_usd = models.DecimalField("Charges Total (USD)", max_digits=14, decimal_places=2, null=True, blank=True, editable=False)
 
     # 10. Added priority field (visual)
     PRIORITY_CHOICES = [
@@ -187,6 +281,27 @@ class Shipment(models.Model):
         verbose_name = 'Shipment'
         verbose_name_plural = '1. Shipments'
         ordering = ["-created_at"]
+        # the admin CSV/XLSX exports (IMPORT_EXPORT_EXPORT_PERMISSION_CODE = "export")
+        permissions = [("export_shipment", "Can export shipments")]
+        # Index plan (check with `manage.py explain_admin_queries`):
+        # The changelist orders by (-created_at, -pk), so the date indexes carry -id too.
+        # - default ordering / unfiltered changelist pages: (-created_at, -id)
+        # - ref prefix lookups use the unique ref index through a range (see RefCounterManager)
+        # - "confirmed" filter with the eta date filter: (confirmed, eta)
+        # - priority filter, newest first: (priority, -created_at, -id)
+        # - the busiest FK filters, newest first: (fk, -created_at, -id); these also
+        #   serve the FK lookups (PROTECT / SET_NULL checks), so the FKs have no own index
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="shipment_created_idx"),
+            models.Index(fields=["confirmed", "eta"], name="shipment_confirmed_eta_idx"),
+            models.Index(fields=["priority", "-created_at", "-id"], name="shipment_priority_created_idx"),
+            models.Index(fields=["client", "-created_at", "-id"], name="shipment_client_created_idx"),
+            models.Index(fields=["carrier", "-created_at", "-id"], name="shipment_carrier_created_idx"),
+            models.Index(fields=["console", "-created_at", "-id"], name="shipment_console_created_idx"),
+            models.Index(fields=["sp", "-created_at", "-id"], name="shipment_sp_created_idx"),
+            # change feed watermark (see changefeed.py)
+            models.Index(fields=["updated_at", "id"], name="shipment_updated_idx"),
+        ]
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -207,35 +322,16 @@ class Shipment(models.Model):
         return format_html('<span style="padding:3px 8px;border-radius:6px;background:{};">{}</span>', color, self.get_priority_display())
     colored_priority_badge.short_description = "Priority"
 
-    def save(self, *args, **kwargs):
-        if not self.ref:
-            today = timezone.now().date()
-            date_prefix = today.strftime("%y%m%d")  # e.g., "251129" (6 digits)
-
-            with transaction.atomic():
-                last = Shipment.objects.filter(ref__startswith=date_prefix) \
-                                    .select_for_update() \
-                                    .order_by('-ref') \
-                                    .first()
-                if last:
-                    # Extract counter from last ref (everything after the 6-digit date prefix)
-                    counter_str = last.ref[6:]  # Get everything after "YYMMDD"
-                    try:
-                        last_counter = int(counter_str)
-                    except ValueError:
-                        last_counter = 0
-                    counter = last_counter + 1
-                else:
-                    counter = 1
-
-                # Format counter as 2 digits (00-99), then 3 digits (100+)
-                if counter <= 99:
-                    counter_formatted = f"{counter:02d}"  # "00", "01", ..., "99"
-                else:
-                    counter_formatted = f"{counter:03d}"  # "100", "101", etc.
-
-                self.ref = f"{date_prefix}{counter_formatted}"
+    # what apply_derived_fields() writes, by the field it is computed from
+    derived_fields = {
+        "confirmed": ("confirm_date",),
+        "etdw": ("transit_time",),
+        "eta": ("transit_time",),
+        **{source: (target,) for source, (target, kind) in MEASURE_FIELDS.items()},
+    }
 
+    def apply_derived_fields(self):
+        """Fill the fields save() derives from the others (also used by bulk imports)."""
         if not getattr(self, "sp_id", None) and hasattr(self, "_current_user"):
             self.sp = self._current_user
 
@@ -252,11 +348,22 @@ class Shipment(models.Model):
         else:
             self.transit_time = None
 
+        # numeric copies of the free-text measures
+        values, _ = measure_values(self)
+        for field, value in values.items():
+            setattr(self, field, value)
+
+    def save(self, *args, **kwargs):
+        if not self.ref:
+            self.ref = RefCounter.objects.allocate()[0]
+
+        self.apply_derived_fields()
+
         super().save(*args, **kwargs)
 
 
 class PolList(models.Model):
-    data = models.CharField(max_length=255, verbose_name="Pol", blank=True, null=True)
+    data = models.CharField(max_length=255, verbose_name="Pol", blank=True, null=True, db_index=True)
     country_name = models.CharField(max_length=100, blank=True, null=True, verbose_name="Country Name")
     country_abbr = models.CharField(max_length=5, blank=True, null=True, verbose_name="Country Abbr")
     airport_abbr = models.CharField(max_length=5, blank=True, null=True, verbose_name="Airport Abbr")
@@ -264,13 +371,18 @@ class PolList(models.Model):
     class Meta:
         verbose_name = "Pol"
         verbose_name_plural = "2. Pols"
+        # Lower() indexes serve the autocomplete prefix search (autocomplete.py)
+        indexes = [
+            models.Index(Lower("data"), name="pollist_data_lower_idx"),
+            models.Index(Lower("airport_abbr"), name="pollist_airport_abbr_lower_idx"),
+        ]
 
     def __str__(self):
         return str(self.data or "")
 
 
 class PodList(models.Model):
-    data = models.CharField(max_length=255, verbose_name="Pod", blank=True, null=True)
+    data = models.CharField(max_length=255, verbose_name="Pod", blank=True, null=True, db_index=True)
     country_name = models.CharField(max_length=100, blank=True, null=True, verbose_name="Country Name")
     country_abbr = models.CharField(max_length=5, blank=True, null=True, verbose_name="Country Abbr")
     airport_abbr = models.CharField(max_length=5, blank=True, null=True, verbose_name="Airport Abbr")
@@ -278,17 +390,23 @@ class PodList(models.Model):
     class Meta:
         verbose_name = "Pod"
         verbose_name_plural = "3. Pods"
+        # Lower() indexes serve the autocomplete prefix search (autocomplete.py)
+        indexes = [
+            models.Index(Lower("data"), name="podlist_data_lower_idx"),
+            models.Index(Lower("airport_abbr"), name="podlist_airport_abbr_lower_idx"),
+        ]
 
     def __str__(self):
         return str(self.data or "")
 
 
 class TermList(models.Model):
-    data = models.CharField(max_length=255, verbose_name="Term", blank=True, null=True)
+    data = models.CharField(max_length=255, verbose_name="Term", blank=True, null=True, db_index=True)
 
     class Meta:
         verbose_name = "Term"
         verbose_name_plural = "4. Terms"
+        indexes = [models.Index(Lower("data"), name="termlist_data_lower_idx")]
 
     def __str__(self):
         return str(self.data or "")
@@ -304,22 +422,28 @@ class Console(models.Model):
         verbose_name = "Console"
         verbose_name_plural = "5. Consoles"
         ordering = ("-created_at",)
+        indexes = [models.Index(Lower("code"), name="console_code_lower_idx")]
 
     def __str__(self):
         return str(self.code or "")
 
 
-class Charge(models.Model):
+class Charge(DirtyFieldsMixin, models.Model):
     shipment = models.ForeignKey("Shipment", related_name="charges", on_delete=models.CASCADE)
     description = models.CharField(max_length=250)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     currency = models.CharField(max_length=10, default="USD")
     payer = models.CharField(max_length=100, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Charge"
         verbose_name_plural = "6. Charges"
+        indexes = [
+            # change feed watermark (see changefeed.py)
+            models.Index(fields=["updated_at", "id"], name="charge_updated_idx"),
+        ]
 
     def __str__(self):
         ref = getattr(self.shipment, "ref", None) or "NoRef"
@@ -344,6 +468,12 @@ class ShipmentComment(models.Model):
     )
     text = models.TextField(verbose_name="Comment")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="comment_updated_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         # Auto-fill author_name if we have the current user attached from admin
@@ -357,4 +487,144 @@ class ShipmentComment(models.Model):
     def __str__(self):
         author = self.author_name or "Unknown"
         ref = getattr(self.shipment, "ref", None) or "NoRef"
-        return f"{author} → {ref}"
\ No newline at end of file
+        return f"{author} → {ref}"
+
+
+class ShipmentSearchIndex(models.Model):
+    """
+    Denormalized search text of a shipment (ref, MAWB, HAWB and party names).
+    Backed by an FTS5 table on SQLite and a FULLTEXT index on MySQL; see search.py.
+    """
+    shipment = models.OneToOneField(
+        "Shipment",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_index",
+    )
+    document = models.TextField(blank=True, default="")
+
+    class Meta:
+        verbose_name = "Shipment Search Index"
+        verbose_name_plural = "Shipment Search Index"
+
+    def __str__(self):
+        return self.document
+
+
+class OutboundMessageManager(models.Manager):
+    def enqueue(self, recipient, body, using=None):
+        """
+        Queue an SMS for the outbox worker (`manage.py drain_sms_outbox`).
+        The row is written in the caller's transaction, so nothing is sent
+        for a request that rolls back and the request never waits on the gateway.
+        """
+        return self.db_manager(using).create(recipient=recipient, body=body, next_attempt_at=timezone.now())
+
+    def due(self, now=None):
+        return self.filter(status=OutboundMessage.PENDING, next_attempt_at__lte=now or timezone.now())
+
+
+class OutboundMessage(models.Model):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    ]
+
+    recipient = models.CharField(max_length=20, verbose_name="Recipient")
+    body = models.TextField(verbose_name="Message")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name="Status")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Attempts")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Next attempt")
+    last_error = models.TextField(blank=True, default="", verbose_name="Last error")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True, verbose_name="Sent at")
+
+    objects = OutboundMessageManager()
+
+    class Meta:
+        verbose_name = "Outbound SMS"
+        verbose_name_plural = "Outbound SMS"
+        ordering = ["-created_at"]
+        indexes = [
+            # the worker polls pending messages that are due
+            models.Index(fields=["status", "next_attempt_at"], name="outbound_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} ({self.get_status_display()})"
+
+
+class Tombstone(models.Model):
+    """
+    Deleted shipments, charges and comments, for change-feed consumers.
+    Children deleted together with their shipment get no tombstone of their own.
+    """
+    SHIPMENT = "shipment"
+    CHARGE = "charge"
+    COMMENT = "comment"
+    MODEL_CHOICES = [
+        (SHIPMENT, "Shipment"),
+        (CHARGE, "Charge"),
+        (COMMENT, "Comment"),
+    ]
+
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES, verbose_name="Model")
+    object_id = models.BigIntegerField(verbose_name="Object ID")
+    shipment_id = models.BigIntegerField(blank=True, null=True, verbose_name="Shipment ID")
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name="Deleted at")
+
+    class Meta:
+        verbose_name = "Tombstone"
+        verbose_name_plural = "Tombstones"
+        indexes = [
+            models.Index(fields=["deleted_at", "id"], name="tombstone_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+
+class LaneMonthlyRollup(models.Model):
+    """
+    Shipment figures per (pol, pod, mode, carrier, month of creation), kept
+    by rollups.py for the analytics dashboard.  Averages and rates are
+    derived from the stored sums when read.
+    """
+    # "<pol>:<pod>:<mode>:<carrier>:<YYYY-MM>"; unique even where dimensions are NULL
+    bucket = models.CharField(max_length=100, unique=True)
+    month = models.DateField(db_index=True)
+    pol = models.ForeignKey("PolList", on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    pod = models.ForeignKey("PodList", on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    mode = models.CharField(max_length=20, null=True, blank=True)
+    carrier = models.ForeignKey(Carrier, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+
+    shipments = models.PositiveIntegerField(default=0)
+    confirmed = models.PositiveIntegerField(default=0)
+    transit_days = models.IntegerField(default=0)  # sum over shipments with a transit time
+    transit_count = models.PositiveIntegerField(default=0)
+    revenue_usd = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Lane Analytics"
+        verbose_name_plural = "Lane Analytics"
+
+
+class RollupState(models.Model):
+    """How far (in Shipment.updated_at) a rollup has been refreshed."""
+    name = models.CharField(max_length=50, unique=True)
+    refreshed_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.refreshed_until}"
+
+
+class RollupDirtyMonth(models.Model):
+    """Months to recompute because shipments were deleted (deletes leave no updated_at)."""
+    month = models.DateField(unique=True)
+
+    def __str__(self):
+        return self.month.strftime("%Y-%m")
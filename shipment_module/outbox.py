@@ -0,0 +1,109 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundMessage
+from .utils import get_sms_gateway
+
+
+def outbox_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def retry_delay(attempts):
+    """Exponential backoff: SMS_RETRY_BACKOFF seconds, doubled per failed attempt."""
+    base = outbox_setting("SMS_RETRY_BACKOFF", 30)
+    cap = outbox_setting("SMS_RETRY_BACKOFF_MAX", 3600)
+    return timedelta(seconds=min(cap, base * 2 ** max(attempts - 1, 0)))
+
+
+class RateLimiter:
+    """Spaces sends to at most `rate` messages per second (0 disables it)."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+        self.next_slot = clock()
+
+    def wait(self, count):
+        if not self.rate:
+            return
+        delay = self.next_slot - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+        self.next_slot = max(self.next_slot, self.clock()) + count / self.rate
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to `batch_size` due messages.  Claimed rows get their
+    next_attempt_at pushed past the claim timeout, so other workers skip them
+    and a crashed worker's batch becomes due again on its own.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=outbox_setting("SMS_CLAIM_TIMEOUT", 300))
+    with transaction.atomic():
+        messages = list(
+            OutboundMessage.objects.due(now)
+            .select_for_update(skip_locked=True)
+            .order_by("next_attempt_at", "pk")[:batch_size]
+        )
+        if messages:
+            OutboundMessage.objects.filter(pk__in=[m.pk for m in messages]).update(next_attempt_at=lease_until)
+    return messages
+
+
+def record_results(messages, errors):
+    now = timezone.now()
+    max_attempts = outbox_setting("SMS_MAX_ATTEMPTS", 5)
+    sent_ids = [m.pk for m, error in zip(messages, errors) if error is None]
+    OutboundMessage.objects.filter(pk__in=sent_ids).update(
+        status=OutboundMessage.SENT, sent_at=now, attempts=F("attempts") + 1, last_error=""
+    )
+
+    failed = []
+    for message, error in zip(messages, errors):
+        if error is None:
+            continue
+        message.attempts += 1
+        message.last_error = str(error) or error.__class__.__name__
+        if message.attempts >= max_attempts:
+            message.status = OutboundMessage.FAILED
+        else:
+            message.next_attempt_at = now + retry_delay(message.attempts)
+        failed.append(message)
+    OutboundMessage.objects.bulk_update(failed, ["attempts", "last_error", "status", "next_attempt_at"])
+
+    return {
+        "sent": len(sent_ids),
+        "retried": sum(m.status == OutboundMessage.PENDING for m in failed),
+        "failed": sum(m.status == OutboundMessage.FAILED for m in failed),
+    }
+
+
+def drain_outbox(batch_size=None, gateway=None, limiter=None):
+    """
+    Send every due message in batches; returns sent/retried/failed counts.
+    """
+    batch_size = batch_size or outbox_setting("SMS_BATCH_SIZE", 50)
+    gateway = gateway or get_sms_gateway()
+    limiter = limiter or RateLimiter(outbox_setting("SMS_RATE_LIMIT", 10))
+    totals = {"sent": 0, "retried": 0, "failed": 0}
+
+    while True:
+        messages = claim_batch(batch_size)
+        if not messages:
+            return totals
+        limiter.wait(len(messages))
+        try:
+            errors = gateway.send_batch([(m.recipient, m.body) for m in messages])
+        except Exception as exc:
+            # the whole request failed (gateway down); retry the batch
+            errors = [exc] * len(messages)
+        for key, value in record_results(messages, errors).items():
+            totals[key] += value
@@ -0,0 +1,108 @@
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+from .caching import autocomplete_cache, get_version
+from .routing import is_primary
+
+
+def estimated_count(model, using):
+    """Row estimate from the database statistics, or None where there is none (SQLite)."""
+    connection = connections[using]
+    if connection.vendor != "mysql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Changelist paginator that avoids a COUNT(*) on every page view.
+
+    Unfiltered tables above `estimate_threshold` rows use the database's row
+    estimate.  Every other count is cached per query, keyed by the SQL and the
+    table's version stamp, so writes to the table invalidate it.  Counts read
+    from a replica are served but not stored (see routing.is_primary).
+    """
+    cache_timeout = 300
+    estimate_threshold = 100_000
+    version_name = "shipment"
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+
+        return self.cached(self.cache_key("count"), queryset.count)
+
+    def cached(self, key, compute):
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            if is_primary(self.object_list.db):
+                cache.set(key, value, self.cache_timeout)
+        return value
+
+    def cache_key(self, kind):
+        # the query's SQL plus the table's version stamp; only primary reads are
+        # stored, so replica reads can share their entries
+        queryset = self.object_list
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(f"{sql}:{params}".encode()).hexdigest()
+        return f"changelist-{kind}:{self.version_name}:{get_version(self.version_name)}:{digest}"
+
+
+class CachedOption:
+    """An autocomplete result rebuilt from its cached (value, label) pair."""
+
+    def __init__(self, to_field, value, label):
+        setattr(self, to_field, value)
+        self.label = label
+
+    def __str__(self):
+        return self.label
+
+
+class CachedPagePaginator(CachedCountPaginator):
+    """
+    Caches the rows of each page as well as the count; for autocomplete
+    results, where the same prefixes are typed over and over.  Both go
+    through caching.autocomplete_cache (an in-process LRU over the shared
+    cache), versioned by the queried model (see signals.LOOKUP_MODELS).
+    A page is cached as (to_field value, str(obj)) pairs, all the
+    autocomplete response needs, never as model instances.
+    """
+
+    def __init__(self, object_list, per_page, to_field="pk", **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.version_name = object_list.model._meta.label_lower
+        self.to_field = to_field
+
+    def cached(self, key, compute):
+        return autocomplete_cache.get_or_set(
+            key, compute, f"autocomplete:{self.version_name}", store=is_primary(self.object_list.db)
+        )
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = self.cached(self.cache_key(f"page{number}:{self.to_field}"), lambda: [
+            (getattr(obj, self.to_field), str(obj)) for obj in self.object_list[bottom:bottom + self.per_page]
+        ])
+        return self._get_page([CachedOption(self.to_field, value, label) for value, label in rows], number, self)
@@ -0,0 +1,30 @@
+from django.db.models import Count, Q, Sum
+
+
+# report grouping -> values() columns (ids keep same-named rows apart)
+MEASURE_REPORT_GROUPS = {
+    "mode": ("mode",),
+    "lane": ("pol_id", "pol__data", "pod_id", "pod__data"),
+    "carrier": ("carrier_id", "carrier__name"),
+}
+
+
+def measure_totals(queryset, by):
+    """
+    Shipment count, pieces, weights and volume per mode / lane / carrier,
+    summed in the database from the numeric measure columns.  `unparsed_gw`
+    counts shipments whose G.W text could not be parsed (see backfill_measures).
+    """
+    return (
+        queryset.order_by()
+        .values(*MEASURE_REPORT_GROUPS[by])
+        .annotate(
+            shipments=Count("pk"),
+            total_pcs=Sum("pcs_num"),
+            total_gw_kg=Sum("gw_kg"),
+            total_cw_kg=Sum("cw_kg"),
+            total_vol_cbm=Sum("vol_cbm"),
+            unparsed_gw=Count("pk", filter=Q(gw_kg__isnull=True) & Q(gw__isnull=False) & ~Q(gw="")),
+        )
+        .order_by("-total_gw_kg")
+    )
@@ -1,8 +1,11 @@
 from import_export import fields, resources
+from import_export.instance_loaders import CachedInstanceLoader
 from import_export.widgets import ForeignKeyWidget, ManyToManyWidget
 from django.contrib.auth import get_user_model
-from account.models import User, Customer, Shipper, Consignee as Cnee, Carrier
-from shipment_module.models import Shipment, PolList, PodList, TermList
+from django.utils import timezone
+from account.models import User, Customer, Shipper, Consignee as Cnee, Carrier, Agent
+from shipment_module.models import Shipment, PolList, PodList, TermList, Console, RefCounter
+from shipment_module.search import refresh_index
 from import_export.widgets import Widget
 from datetime import datetime
 
@@ -30,100 +33,266 @@ class MultiFormatDateWidget(Widget):
         return value.strftime(self.formats[0])
 
 
-class GetOrCreateUserWidget(ForeignKeyWidget):
-    def clean(self, value, row=None, *args, **kwargs):
-        if not value:
-            return None
-        user, created = User.objects.get_or_create(username=value.lower(), is_agent=True)
-        return user
+class LookupCache:
+    """
+    Import-scoped get-or-create cache shared by the lookup widgets.
+
+    Entries are keyed by (model, normalized value).  warm() loads what the
+    whole dataset needs with one query per model and inserts the missing
+    entities with one bulk_create; clean() calls are then served from memory
+    and counted as hits / misses for the import result.  Values warm() looked
+    up and did not find are remembered, so they fail without another query.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.entries = {}
+        self.absent = set()
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.created = 0
+        self.queries = 0
+
+    def get(self, model, key):
+        obj = self.entries.get((model, key))
+        if obj is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return obj
 
+    def add(self, model, key, obj):
+        if self.enabled:
+            self.entries[(model, key)] = obj
+
+    def is_absent(self, model, key):
+        return (model, key) in self.absent
+
+    def warm(self, model, field, keys, create_kwargs=None, create_keys=()):
+        """
+        Load `keys` and `create_keys` of `model` by `field` in one query, then
+        insert the `create_keys` that do not exist yet using create_kwargs(key).
+        """
+        if not self.enabled:
+            return
+        keys = {key for key in set(keys) | set(create_keys) if (model, key) not in self.entries}
+        if not keys:
+            return
+        self._load(model, field, keys)
+        missing = [key for key in set(create_keys) if (model, key) not in self.entries]
+        if missing and create_kwargs:
+            objs = model.objects.bulk_create([model(**create_kwargs(key)) for key in missing])
+            self.queries += 1
+            self.created += len(objs)
+            if all(obj.pk for obj in objs):
+                for key, obj in zip(missing, objs):
+                    self.entries[(model, key)] = obj
+            else:
+                # no RETURNING on MySQL: re-read to get the pks
+                self._load(model, field, missing)
+        self.absent |= {(model, key) for key in keys if (model, key) not in self.entries}
+
+    def _load(self, model, field, keys):
+        self.queries += 1
+        for obj in model.objects.filter(**{f"{field}__in": keys}):
+            key = (model, str(getattr(obj, field)).strip())
+            if key not in self.entries:
+                self.entries[key] = obj
+                self.prefetched += 1
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "prefetched": self.prefetched,
+            "created": self.created,
+            "queries": self.queries,
+        }
+
+
+class BatchForeignKeyWidget(ForeignKeyWidget):
+    """
+    ForeignKeyWidget backed by a LookupCache.
+
+    The resource warms the cache with every value of the column before the
+    rows are imported, so clean() reads from memory instead of running one
+    query per cell.  Unknown values fail the row, or are created when
+    create_missing is set.
+    """
+    create_missing = False
+
+    def __init__(self, model, field="pk", cache=None, **kwargs):
+        super().__init__(model, field, **kwargs)
+        self.cache = cache or LookupCache()
+
+    def normalize(self, value):
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value).strip()
+
+    def get_create_kwargs(self, key):
+        return {self.field: key}
+
+    def lookup_keys(self, values):
+        return {self.normalize(v) for v in values if v not in (None, "")} - {""}
 
-class GetOrCreateCustomerWidget(ForeignKeyWidget):
     def clean(self, value, row=None, *args, **kwargs):
-        if not value:
+        if value in (None, "") or self.normalize(value) == "":
             return None
-        customer, created = Customer.objects.get_or_create(name=value.strip())
-        return customer
+        key = self.normalize(value)
+        obj = self.cache.get(self.model, key)
+        if obj is None:
+            if self.create_missing:
+                obj, created = self.model.objects.get_or_create(**self.get_create_kwargs(key))
+            else:
+                obj = None if self.cache.is_absent(self.model, key) else (
+                    self.get_queryset(value, row, *args, **kwargs).filter(**{self.field: key}).first()
+                )
+                if obj is None:
+                    raise ValueError(f"{self.model._meta.verbose_name} {key!r} does not exist")
+            self.cache.add(self.model, key, obj)
+        return obj.pk if self.key_is_id else obj
+
+
+class GetOrCreateUserWidget(BatchForeignKeyWidget):
+    create_missing = True
+
+    def __init__(self, model=None, field="username", **kwargs):
+        super().__init__(model or User, field, **kwargs)
+
+    def normalize(self, value):
+        return super().normalize(value).lower()
+
+    def get_create_kwargs(self, key):
+        return {"username": key, "is_agent": True}
+
+
+class GetOrCreateCustomerWidget(BatchForeignKeyWidget):
+    create_missing = True
 
+    def __init__(self, model=None, field="name", **kwargs):
+        super().__init__(model or Customer, field, **kwargs)
 
-class GetOrCreatePartyWidget(ForeignKeyWidget):
+
+class GetOrCreatePartyWidget(BatchForeignKeyWidget):
     """
     ویجت برای مدل های Shipper, Consignee و Customer.
     مقدار خالی را به None تبدیل می کند و بر اساس فیلد 'name' نمونه را پیدا/ایجاد می کند.
     """
+    create_missing = True
 
-    def clean(self, value, row=None, *args, **kwargs):
-        if not value or str(value).strip() == '':
-            return None
+    def __init__(self, model, field="name", **kwargs):
+        super().__init__(model, field, **kwargs)
 
-        model = self.model
-        cleaned_value = str(value).strip()
-        instance, created = model.objects.get_or_create(**{'name': cleaned_value})
 
-        return instance
+class GetOrCreateListWidget(BatchForeignKeyWidget):
+    create_missing = True
 
+    def __init__(self, model, field="data", **kwargs):
+        super().__init__(model, field, **kwargs)
 
-class GetOrCreateListWidget(ForeignKeyWidget):
-    def clean(self, value, row=None, *args, **kwargs):
-        if not value:
-            return None
 
-        model = self.model
+class BatchManyToManyWidget(ManyToManyWidget):
+    """ManyToManyWidget backed by a LookupCache (lookup only, nothing is created)."""
+    create_missing = False
 
-        cleaned_value = str(value).strip()
+    def __init__(self, model, separator=None, field=None, cache=None, **kwargs):
+        super().__init__(model, separator, field, **kwargs)
+        self.cache = cache or LookupCache()
 
-        instance, created = model.objects.get_or_create(**{'data': cleaned_value})
+    def split(self, value):
+        if isinstance(value, (float, int)):
+            return [str(int(value))]
+        return [i.strip() for i in str(value).split(self.separator) if i.strip()]
+
+    def lookup_keys(self, values):
+        return {key for value in values if value for key in self.split(value)}
+
+    def clean(self, value, row=None, **kwargs):
+        if not value:
+            return []
+        objs = []
+        for key in self.split(value):
+            obj = self.cache.get(self.model, key)
+            if obj is None:
+                obj = self.model.objects.filter(**{self.field: key}).first()
+                if obj is None:
+                    continue
+                self.cache.add(self.model, key, obj)
+            objs.append(obj)
+        return objs
 
-        return instance
 
 User = get_user_model()
 
 class ShipmentModelResource(resources.ModelResource):
     # Explicit widgets for ForeignKey & ManyToMany relationships
+    client = fields.Field(
+        column_name='client',
+        attribute='client',
+        widget=BatchForeignKeyWidget(Customer)
+    )
+    console = fields.Field(
+        column_name='console',
+        attribute='console',
+        widget=BatchForeignKeyWidget(Console)
+    )
+    agent = fields.Field(
+        column_name='agent',
+        attribute='agent',
+        widget=BatchForeignKeyWidget(Agent)
+    )
     pol = fields.Field(
         column_name='pol',
         attribute='pol',
-        widget=ForeignKeyWidget(PolList, 'name')
+        widget=GetOrCreateListWidget(PolList)
     )
     pod = fields.Field(
         column_name='pod',
         attribute='pod',
-        widget=ForeignKeyWidget(PodList, 'name')
+        widget=GetOrCreateListWidget(PodList)
     )
     term = fields.Field(
         column_name='term',
         attribute='term',
-        widget=ForeignKeyWidget(TermList, 'name')
+        widget=GetOrCreateListWidget(TermList)
     )
     shipper = fields.Field(
         column_name='mawb_shipper',
         attribute='shipper',
-        widget=ForeignKeyWidget(Shipper, 'name')
+        widget=GetOrCreatePartyWidget(Shipper)
     )
     cnee = fields.Field(
         column_name='mawb_cnee',
         attribute='cnee',
-        widget=ForeignKeyWidget(Cnee, 'name')
+        widget=GetOrCreatePartyWidget(Cnee)
     )
     hawb_shipper = fields.Field(
         column_name='hawb_shipper',
         attribute='hawb_shipper',
-        widget=ForeignKeyWidget(Shipper, 'name')
+        widget=GetOrCreatePartyWidget(Shipper)
     )
     hawb_cnee = fields.Field(
         column_name='hawb_cnee',
         attribute='hawb_cnee',
-        widget=ForeignKeyWidget(Cnee, 'name')
+        widget=GetOrCreatePartyWidget(Cnee)
     )
     carrier = fields.Field(
         column_name='carrier',
         attribute='carrier',
-        widget=ForeignKeyWidget(Carrier, 'name')
+        widget=GetOrCreatePartyWidget(Carrier)
     )
     operators = fields.Field(
         column_name='operators',
         attribute='operators',
-        widget=ManyToManyWidget(User, separator=',', field='username')
+        widget=BatchManyToManyWidget(User, separator=',', field='username')
+    )
+
+    # fields save() derives; written by bulk_update alongside the imported ones
+    derived_fields = (
+        'sp', 'confirm_date', 'transit_time', 'updated_at',
+        'pcs_num', 'gw_kg', 'first_gw_kg', 'vol_cbm', 'cw_kg', 'first_cw_kg',
     )
 
     class Meta:
@@ -135,7 +304,147 @@ class ShipmentModelResource(resources.ModelResource):
             'sp',  # set automatically from logged-in user
             'transit_time',  # computed
             'confirm_date',  # auto when confirmation checked
+            # kept by the Charge signals / rebuild_charge_totals
+            'charge_totals',
+            'charges_total_usd',
+            # parsed from pcs / gw / vol / cw by apply_derived_fields
+            'pcs_num', 'gw_kg', 'first_gw_kg', 'vol_cbm', 'cw_kg', 'first_cw_kg',
         )
         import_id_fields = ('ref',)
         skip_unchanged = True
-        report_skipped = True
\ No newline at end of file
+        report_skipped = True
+        # rows are written with bulk_create / bulk_update in chunks
+        use_bulk = True
+        batch_size = 1000
+        # existing shipments are loaded with one ref__in query
+        instance_loader_class = CachedInstanceLoader
+
+    def __init__(self, use_lookup_cache=True, create_missing=False, **kwargs):
+        super().__init__(**kwargs)
+        self.pending_operators = {}
+        # one cache per import, shared by every lookup widget of this resource
+        self.lookup_cache = LookupCache(enabled=use_lookup_cache)
+        for field in self.fields.values():
+            if hasattr(field.widget, "cache"):
+                field.widget.cache = self.lookup_cache
+            # the GetOrCreate widgets only add master data when asked to;
+            # by default an unknown name fails its row
+            if getattr(field.widget, "create_missing", False):
+                field.widget.create_missing = create_missing
+
+    def before_import(self, dataset, **kwargs):
+        # warm the lookup cache up front: one query per model instead of one per cell
+        wanted = {}
+        for field in self.get_import_fields():
+            widget = field.widget
+            if not hasattr(widget, "lookup_keys") or field.column_name not in dataset.headers:
+                continue
+            keys, create_keys, create_kwargs = wanted.setdefault(
+                (widget.model, widget.field), (set(), set(), {})
+            )
+            column_keys = widget.lookup_keys(dataset[field.column_name])
+            if widget.create_missing:
+                create_keys |= column_keys
+                create_kwargs["fn"] = widget.get_create_kwargs
+            else:
+                keys |= column_keys
+        for (model, field_name), (keys, create_keys, create_kwargs) in wanted.items():
+            self.lookup_cache.warm(model, field_name, keys, create_kwargs.get("fn"), create_keys)
+
+    def after_import(self, dataset, result, **kwargs):
+        super().after_import(dataset, result, **kwargs)
+        result.lookup_cache_stats = self.lookup_cache.stats()
+
+    def before_save_instance(self, instance, row, **kwargs):
+        user = kwargs.get("user")
+        if user is not None and user.is_authenticated:
+            instance._current_user = user
+        instance.apply_derived_fields()
+        if instance.pk:
+            # bulk_update skips auto_now
+            instance.updated_at = timezone.now()
+
+    def save_m2m(self, instance, row, **kwargs):
+        if not self._meta.use_bulk:
+            return super().save_m2m(instance, row, **kwargs)
+        if not self._is_using_transactions(kwargs) and self._is_dry_run(kwargs):
+            return
+        field = self.fields["operators"]
+        if field.column_name in row:
+            self.pending_operators[id(instance)] = (instance, field.clean(row))
+
+    def get_bulk_update_fields(self):
+        names = [
+            field.attribute for name, field in self.fields.items()
+            if name not in self._meta.import_id_fields
+            and name not in ('operators', 'created_at')
+            and field.attribute
+        ]
+        return names + list(self.derived_fields)
+
+    def import_data(self, dataset, dry_run=False, *args, **kwargs):
+        # Reserve the refs of new rows before import-export opens its transaction,
+        # so the counter row stays locked for one UPDATE rather than the whole
+        # import.  Rows that then fail leave gaps in the day's sequence.
+        self.reserved_refs = []
+        if not dry_run and "ref" in dataset.headers:
+            count = sum(1 for ref in dataset["ref"] if not str(ref or "").strip())
+            if count:
+                self.reserved_refs = RefCounter.objects.allocate(count)
+        return super().import_data(dataset, dry_run, *args, **kwargs)
+
+    def bulk_create(self, using_transactions, dry_run, raise_errors, batch_size=None, result=None):
+        instances = list(self.create_instances)
+        without_ref = [instance for instance in instances if not instance.ref]
+        if without_ref and dry_run:
+            # rolled back anyway; don't lock the counter for a preview
+            for instance in without_ref:
+                instance.ref = None
+        elif without_ref:
+            # same refs as Shipment.save(), taken from the block reserved in import_data
+            reserved = getattr(self, "reserved_refs", [])
+            if len(reserved) < len(without_ref):
+                reserved += RefCounter.objects.allocate(len(without_ref) - len(reserved))
+            for instance, ref in zip(without_ref, reserved):
+                instance.ref = ref
+            del reserved[:len(without_ref)]
+        super().bulk_create(using_transactions, dry_run, raise_errors, batch_size=batch_size, result=result)
+        self.save_pending_operators(instances)
+        self.refresh_search_index(instances, using_transactions, dry_run)
+
+    def bulk_update(self, using_transactions, dry_run, raise_errors, batch_size=None, result=None):
+        instances = list(self.update_instances)
+        super().bulk_update(using_transactions, dry_run, raise_errors, batch_size=batch_size, result=result)
+        self.save_pending_operators(instances)
+        self.refresh_search_index(instances, using_transactions, dry_run)
+
+    def refresh_search_index(self, instances, using_transactions, dry_run):
+        # bulk writes skip post_save, which keeps the index current for single saves
+        if instances and (using_transactions or not dry_run):
+            refresh_index(Shipment.objects.filter(ref__in=[instance.ref for instance in instances]))
+
+    def save_pending_operators(self, instances):
+        pending = [self.pending_operators.pop(id(i)) for i in instances if id(i) in self.pending_operators]
+        if not pending:
+            return
+        # bulk_create does not set pks on MySQL; look them up by ref
+        missing_pk = [instance.ref for instance, users in pending if instance.pk is None]
+        pks = dict(Shipment.objects.filter(ref__in=missing_pk).values_list("ref", "pk")) if missing_pk else {}
+        through = Shipment.operators.through
+        rows = []
+        for instance, users in pending:
+            shipment_id = instance.pk or pks.get(instance.ref)
+            if shipment_id:
+                rows.extend(through(shipment_id=shipment_id, user_id=user.pk) for user in users)
+        shipment_ids = {row.shipment_id for row in rows} | {
+            instance.pk or pks.get(instance.ref) for instance, users in pending
+        }
+        through.objects.filter(shipment_id__in=shipment_ids).delete()
+        through.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class ShipmentBulkImportResource(ShipmentModelResource):
+    """Large-file variant: no per-row diff, so nothing is deep-copied or rendered per row."""
+
+    class Meta(ShipmentModelResource.Meta):
+        skip_diff = True
@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import LaneMonthlyRollup, RollupDirtyMonth, RollupState, Shipment
+
+
+ROLLUP_NAME = "lanes"
+
+# LaneMonthlyRollup dimensions, in bucket order
+ROLLUP_DIMENSIONS = ("pol_id", "pod_id", "mode", "carrier_id")
+
+
+# -------------------------------
+# Months
+# -------------------------------
+# Shipments belong to the month of their created_at in the local timezone,
+# the same month the admin date hierarchy shows them under.
+def month_of(value):
+    return timezone.localtime(value).date().replace(day=1)
+
+
+def month_bounds(month):
+    start = timezone.make_aware(datetime(month.year, month.month, 1))
+    following = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, timezone.make_aware(datetime(following.year, following.month, 1))
+
+
+def bucket_key(row, month):
+    parts = ["-" if row[name] is None else str(row[name]) for name in ROLLUP_DIMENSIONS]
+    return ":".join([*parts, month.strftime("%Y-%m")])
+
+
+# -------------------------------
+# Aggregation
+# -------------------------------
+def rollup_rows(queryset):
+    """One GROUP BY over `queryset`: LaneMonthlyRollup objects per month and lane/mode/carrier."""
+    rows = (
+        queryset.order_by()
+        .annotate(rollup_month=TruncMonth("created_at", output_field=DateField()))
+        .values("rollup_month", *ROLLUP_DIMENSIONS)
+        .annotate(
+            shipment_count=Count("pk"),
+            confirmed_count=Count("pk", filter=Q(confirmed=True)),
+            transit_sum=Sum("transit_time"),
+            transit_n=Count("transit_time"),
+            revenue=Sum("charges_total_usd"),
+        )
+    )
+    return [
+        LaneMonthlyRollup(
+            bucket=bucket_key(row, row["rollup_month"]),
+            month=row["rollup_month"],
+            **{name: row[name] for name in ROLLUP_DIMENSIONS},
+            shipments=row["shipment_count"],
+            confirmed=row["confirmed_count"],
+            transit_days=row["transit_sum"] or 0,
+            transit_count=row["transit_n"],
+            revenue_usd=row["revenue"] or 0,
+        )
+        for row in rows
+    ]
+
+
+def rebuild_months(months):
+    """Replace the rollups of `months` with freshly aggregated ones."""
+    if not months:
+        return 0
+    created = Q()
+    for month in months:
+        start, end = month_bounds(month)
+        created |= Q(created_at__gte=start, created_at__lt=end)
+    rollups = rollup_rows(Shipment.objects.filter(created))
+    LaneMonthlyRollup.objects.filter(month__in=months).delete()
+    LaneMonthlyRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+# -------------------------------
+# Refresh
+# -------------------------------
+def refresh_rollups(full=False):
+    """
+    Bring LaneMonthlyRollup up to date and return the months recomputed.
+
+    Incrementally, only months holding a shipment updated since the last
+    refresh (or marked dirty by a deletion) are recomputed.  As with the
+    change feed, shipments updated in the last CHANGE_FEED_LAG seconds are
+    left for the next run, so an open transaction cannot commit behind the
+    watermark.  Writes that skip updated_at (queryset.update() without it)
+    are only picked up by a full rebuild.
+    """
+    until = timezone.now() - timedelta(seconds=getattr(settings, "CHANGE_FEED_LAG", 5))
+    with transaction.atomic():
+        state, _ = RollupState.objects.select_for_update().get_or_create(name=ROLLUP_NAME)
+        dirty = list(RollupDirtyMonth.objects.values_list("pk", "month"))
+
+        if full or state.refreshed_until is None:
+            rollups = rollup_rows(Shipment.objects.all())
+            LaneMonthlyRollup.objects.all().delete()
+            LaneMonthlyRollup.objects.bulk_create(rollups, batch_size=1000)
+            months = {rollup.month for rollup in rollups}
+        else:
+            changed = Shipment.objects.filter(updated_at__gt=state.refreshed_until, updated_at__lte=until)
+            months = {month_of(value) for value in changed.datetimes("created_at", "month")}
+            months.update(month for _, month in dirty)
+            rebuild_months(sorted(months))
+
+        RollupDirtyMonth.objects.filter(pk__in=[pk for pk, _ in dirty]).delete()
+        state.refreshed_until = until
+        state.save(update_fields=["refreshed_until"])
+    return sorted(months)
+
+
+def mark_month_dirty(created_at):
+    if created_at is not None:
+        RollupDirtyMonth.objects.get_or_create(month=month_of(created_at))
+
+
+# -------------------------------
+# Dashboard
+# -------------------------------
+# dashboard grouping -> values() columns of LaneMonthlyRollup
+ROLLUP_GROUPS = {
+    "lane": ("pol_id", "pol__data", "pod_id", "pod__data"),
+    "carrier": ("carrier_id", "carrier__name"),
+    "mode": ("mode",),
+    "month": ("month",),
+}
+
+
+def rollup_summary(by, start=None, end=None, limit=200):
+    """
+    Shipments, confirmation rate, average transit and revenue per lane /
+    carrier / mode / month between the `start` and `end` months (inclusive),
+    summed from the rollup table in one query.
+    """
+    queryset = LaneMonthlyRollup.objects.all()
+    if start:
+        queryset = queryset.filter(month__gte=start)
+    if end:
+        queryset = queryset.filter(month__lte=end)
+    rows = list(
+        queryset.order_by()
+        .values(*ROLLUP_GROUPS[by])
+        .annotate(
+            total_shipments=Sum("shipments"),
+            total_confirmed=Sum("confirmed"),
+            total_transit_days=Sum("transit_days"),
+            total_transit_count=Sum("transit_count"),
+            total_revenue_usd=Sum("revenue_usd"),
+        )
+        .order_by("month" if by == "month" else "-total_shipments")[:limit]
+    )
+    for row in rows:
+        row["confirmation_rate"] = row["total_confirmed"] / row["total_shipments"] if row["total_shipments"] else None
+        row["avg_transit_days"] = (
+            row["total_transit_days"] / row["total_transit_count"] if row["total_transit_count"] else None
+        )
+    return rows
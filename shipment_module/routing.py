@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fnmatch import fnmatch
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import Resolver404, resolve
+
+
+_replica_reads = ContextVar("replica_reads", default=False)
+_primary_pinned = ContextVar("primary_pinned", default=False)
+# set per request by the middleware; db_for_write() records that the request wrote
+_primary_writes = ContextVar("primary_writes", default=None)
+
+
+@contextmanager
+def replica_reads():
+    """Within the block, reads go to REPLICA_DATABASE (when one is configured)."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Within the block, reads stay on the primary even inside replica_reads()."""
+    token = _primary_pinned.set(True)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(token)
+
+
+def is_primary(alias):
+    """
+    Whether rows read from `alias` are current.  Shared caches store only
+    those: a lagging replica would put stale rows under a fresh version stamp.
+    """
+    return alias == DEFAULT_DB_ALIAS
+
+
+def pin_reads(queryset):
+    """
+    Fix the alias `queryset` reads from now; for responses that stream their
+    rows after the view (and the routing context) has returned.
+    """
+    return queryset.using(queryset.db)
+
+
+# -------------------------------
+# Router
+# -------------------------------
+class ReplicaRouter:
+    """
+    Reads go to the replica only inside replica_reads() (read-only views,
+    exports, analytics), never while the request is pinned to the primary
+    or inside a transaction on it.  Writes, select_for_update and the ref
+    allocator always use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = settings.REPLICA_DATABASE
+        if (
+            replica
+            and _replica_reads.get()
+            and not _primary_pinned.get()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        writes = _primary_writes.get()
+        if writes is not None:
+            writes.add(model._meta.label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same rows as the primary
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE}:
+            return True
+        return None
+
+
+# -------------------------------
+# Middleware
+# -------------------------------
+class ReplicaRoutingMiddleware:
+    """
+    Serve GET/HEAD requests to the views in REPLICA_VIEWS from the replica.
+    A request that writes to the primary sets a cookie that keeps that
+    browser on the primary for REPLICA_STICKY_SECONDS, so staff always see
+    their own saves while the replica catches up.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def replica_view(self, request):
+        if request.method not in ("GET", "HEAD"):
+            return False
+        try:
+            view = resolve(request.path_info).view_name
+        except Resolver404:
+            return False
+        return any(fnmatch(view, pattern) for pattern in settings.REPLICA_VIEWS)
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASE:
+            return self.get_response(request)
+
+        writes = set()
+        tokens = [
+            (_primary_writes, _primary_writes.set(writes)),
+            (_primary_pinned, _primary_pinned.set(settings.REPLICA_STICKY_COOKIE in request.COOKIES)),
+            (_replica_reads, _replica_reads.set(self.replica_view(request))),
+        ]
+        try:
+            response = self.get_response(request)
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        finally:
+            for var, token in reversed(tokens):
+                var.reset(token)
+
+        if writes:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, "1", max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite="Lax",
+            )
+        return response
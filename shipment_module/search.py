@@ -0,0 +1,103 @@
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+# shipment columns and related names the index covers (same as ShipmentAdmin.search_fields)
+SEARCH_RELATED = ("client", "sp", "shipper", "cnee", "hawb_shipper", "hawb_cnee", "carrier")
+SEARCH_CHUNK_SIZE = 2000
+
+FTS_TABLE = "shipment_module_shipmentsearchindex_fts"
+INDEX_TABLE = "shipment_module_shipmentsearchindex"
+
+# MySQL boolean-mode operators; stripped from user input
+MYSQL_OPERATORS = re.compile(r'[+\-><()~*"@]+')
+
+
+def build_document(shipment):
+    parties = [
+        shipment.client.name if shipment.client_id else "",
+        shipment.sp.username if shipment.sp_id else "",
+        shipment.shipper.name if shipment.shipper_id else "",
+        shipment.cnee.name if shipment.cnee_id else "",
+        shipment.hawb_shipper.name if shipment.hawb_shipper_id else "",
+        shipment.hawb_cnee.name if shipment.hawb_cnee_id else "",
+        shipment.carrier.name if shipment.carrier_id else "",
+    ]
+    values = [shipment.ref, shipment.mawb, shipment.hawb] + parties
+    return " ".join(str(v) for v in values if v)
+
+
+def refresh_index(queryset):
+    """Rebuild the index rows of the given shipments (chunked, upsert by shipment id)."""
+    from .models import ShipmentSearchIndex
+
+    queryset = queryset.select_related(*SEARCH_RELATED).order_by("pk")
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:SEARCH_CHUNK_SIZE])
+        if not chunk:
+            return
+        documents = {s.pk: build_document(s) for s in chunk}
+        existing = set(
+            ShipmentSearchIndex.objects.filter(shipment_id__in=documents).values_list("shipment_id", flat=True)
+        )
+        ShipmentSearchIndex.objects.bulk_update(
+            [ShipmentSearchIndex(shipment_id=pk, document=doc) for pk, doc in documents.items() if pk in existing],
+            ["document"],
+        )
+        ShipmentSearchIndex.objects.bulk_create(
+            [ShipmentSearchIndex(shipment_id=pk, document=doc) for pk, doc in documents.items() if pk not in existing]
+        )
+        last_pk = chunk[-1].pk
+
+
+def fts_query(connection, search_term):
+    """
+    Turn admin search input into a full-text query where every word must
+    match as a prefix ("2510" finds ref 25101801, "176-123" finds MAWB 176-12345675).
+    Returns None when the term has nothing indexable.
+    """
+    words = search_term.split()
+    if connection.vendor == "sqlite":
+        terms = ['"{}"*'.format(word.replace('"', '""')) for word in words]
+    else:
+        terms = []
+        for word in words:
+            # MySQL splits on punctuation; require each piece, prefix-match the last
+            pieces = [p for p in re.split(r"\W+", MYSQL_OPERATORS.sub(" ", word)) if p]
+            terms += [f"+{p}" for p in pieces[:-1]] + [f"+{p}*" for p in pieces[-1:]]
+    return " ".join(terms) or None
+
+
+def search_backend_available(connection):
+    if connection.vendor == "sqlite":
+        key = (connection.alias, str(connection.settings_dict["NAME"]))
+        if key not in _fts_tables:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+                _fts_tables[key] = cursor.fetchone() is not None
+        return _fts_tables[key]
+    return connection.vendor == "mysql"
+
+
+# (alias, database name) -> whether the FTS5 table exists; it only changes with migrations
+_fts_tables = {}
+
+
+def search_shipments(queryset, search_term):
+    """
+    Filter `queryset` through the full-text index.  Returns None when the
+    database has no full-text backend, so callers can fall back to LIKE.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor not in ("sqlite", "mysql") or not search_backend_available(connection):
+        return None
+    query = fts_query(connection, search_term)
+    if query is None:
+        return queryset.none()
+    if connection.vendor == "sqlite":
+        sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+    else:
+        sql = f"SELECT shipment_id FROM {INDEX_TABLE} WHERE MATCH(document) AGAINST (%s IN BOOLEAN MODE)"
+    return queryset.filter(pk__in=RawSQL(sql, [query]))
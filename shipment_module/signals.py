@@ -1,18 +1,150 @@
 # shipment_module/signals.py
+import re
+
 from django.contrib.auth.signals import user_logged_in
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.conf import settings
-from .utils import send_sms
+from import_export.signals import post_import
+from .caching import bump_version
+from .changefeed import deleted_with_shipment
+from .invoices import evict_invoice, evict_invoices
+from .rollups import mark_month_dirty
+from .search import refresh_index
+from .totals import refresh_charge_totals
+from account.models import Agent, Carrier, Consignee, Customer, Shipper, User
+from .models import Charge, Console, OutboundMessage, PodList, PolList, Shipment, ShipmentComment, TermList, Tombstone
+
+# usernames are usually mobile numbers; anything else has nowhere to be sent
+PHONE_NUMBER = re.compile(r"^\+?\d{7,15}$")
+
 
 @receiver(user_logged_in)
 def send_login_sms(sender, request, user, **kwargs):
     login_time = timezone.localtime(timezone.now()).strftime("%Y-%m-%d %H:%M:%S")
     message = f"Admin login detected:\nUser: {user.username}\nTime: {login_time}"
 
-    if user.username:
-        send_sms(user.username, message)
+    # queued in the login transaction; drain_sms_outbox talks to the gateway
+    if PHONE_NUMBER.match(user.username or ""):
+        OutboundMessage.objects.enqueue(user.username, message)
 
     manager_phone = getattr(settings, "MANAGER_PHONE", None)
     if manager_phone:
-        send_sms(manager_phone, message)
\ No newline at end of file
+        OutboundMessage.objects.enqueue(manager_phone, message)
+
+
+@receiver(post_save, sender=Shipment)
+@receiver(post_delete, sender=Shipment)
+def bump_shipment_version(sender, **kwargs):
+    bump_version("shipment")
+
+
+@receiver(post_save, sender=Shipment)
+@receiver(post_delete, sender=Shipment)
+def evict_invoice_cache(sender, instance, **kwargs):
+    evict_invoice(instance.pk)
+
+
+@receiver(post_import)
+def bump_version_after_import(sender, model, **kwargs):
+    # bulk imports bypass post_save
+    if model is Shipment:
+        bump_version("shipment")
+
+
+# tables shown as admin facets / lookups; renames must invalidate cached labels
+LOOKUP_MODELS = (Customer, Shipper, Consignee, User, Carrier, Agent, Console, PolList, PodList, TermList)
+
+
+def bump_lookup_version(sender, **kwargs):
+    bump_version(sender._meta.label_lower)
+
+
+for model in LOOKUP_MODELS:
+    post_save.connect(bump_lookup_version, sender=model, dispatch_uid=f"lookup-version-save-{model._meta.label_lower}")
+    post_delete.connect(bump_lookup_version, sender=model, dispatch_uid=f"lookup-version-delete-{model._meta.label_lower}")
+
+
+@receiver(post_save, sender=Shipment)
+def refresh_shipment_search_index(sender, instance, **kwargs):
+    refresh_index(Shipment.objects.filter(pk=instance.pk))
+
+
+# party label -> shipment relations whose search documents (and invoices) contain it
+SEARCH_PARTY_FIELDS = {
+    Customer: ("name", ("client",)),
+    User: ("username", ("sp",)),
+    Shipper: ("name", ("shipper", "hawb_shipper")),
+    Consignee: ("name", ("cnee", "hawb_cnee")),
+    Carrier: ("name", ("carrier",)),
+}
+# labels printed on the cached invoices but not part of the search documents
+INVOICE_PARTY_FIELDS = {
+    PolList: ("data", ("pol",)),
+    PodList: ("data", ("pod",)),
+}
+PARTY_LABEL_FIELDS = {**SEARCH_PARTY_FIELDS, **INVOICE_PARTY_FIELDS}
+
+
+def remember_party_label(sender, instance, update_fields=None, **kwargs):
+    label_field, relations = PARTY_LABEL_FIELDS[sender]
+    instance._party_label_changed = False
+    if not instance.pk or (update_fields is not None and label_field not in update_fields):
+        return
+    old = sender.objects.filter(pk=instance.pk).values_list(label_field, flat=True).first()
+    instance._party_label_changed = old is not None and old != getattr(instance, label_field)
+
+
+def refresh_party_shipments(sender, instance, **kwargs):
+    if not getattr(instance, "_party_label_changed", False):
+        return
+    label_field, relations = PARTY_LABEL_FIELDS[sender]
+    query = Q()
+    for relation in relations:
+        query |= Q(**{relation: instance})
+    shipments = Shipment.objects.filter(query)
+    if sender in SEARCH_PARTY_FIELDS:
+        refresh_index(shipments)
+    # the cached bodies are keyed on the shipment's updated_at, which a rename leaves alone
+    evict_invoices(shipments.values_list("pk", flat=True))
+
+
+for model in PARTY_LABEL_FIELDS:
+    pre_save.connect(remember_party_label, sender=model, dispatch_uid=f"party-label-{model._meta.label_lower}")
+    post_save.connect(refresh_party_shipments, sender=model, dispatch_uid=f"party-refresh-{model._meta.label_lower}")
+
+
+@receiver(post_save, sender=Charge)
+@receiver(post_delete, sender=Charge)
+def update_charge_totals(sender, instance, origin=None, **kwargs):
+    # the shipment itself is being deleted; nothing left to total
+    if deleted_with_shipment(origin):
+        return
+    refresh_charge_totals(instance.shipment_id)
+    # a charge moved to another shipment: the dirty-field snapshot still holds
+    # the shipment it was loaded with until save() returns
+    previous = (getattr(instance, "_snapshot", None) or {}).get("shipment_id")
+    if previous is not None and previous != instance.shipment_id:
+        refresh_charge_totals(previous)
+
+
+@receiver(post_delete, sender=Shipment)
+@receiver(post_delete, sender=Charge)
+@receiver(post_delete, sender=ShipmentComment)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    # consumers drop a shipment's charges and comments along with it
+    if sender is not Shipment and deleted_with_shipment(origin):
+        return
+    Tombstone.objects.create(
+        model={Shipment: Tombstone.SHIPMENT, Charge: Tombstone.CHARGE, ShipmentComment: Tombstone.COMMENT}[sender],
+        object_id=instance.pk,
+        shipment_id=instance.pk if sender is Shipment else instance.shipment_id,
+    )
+
+
+@receiver(post_delete, sender=Shipment)
+def mark_rollup_month_dirty(sender, instance, **kwargs):
+    # a deleted row leaves no updated_at behind for refresh_rollups to find
+    mark_month_dirty(instance.created_at)
@@ -0,0 +1,208 @@
+import random
+from datetime import datetime, time as day_time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from account.models import Agent, Carrier, Consignee, Customer, Shipper, User
+from .models import Charge, Console, PodList, PolList, RefCounter, Shipment, ShipmentComment, TermList
+from .search import refresh_index
+from .totals import rebuild_charge_totals
+
+
+# Every synthetic row carries this marker (name / code / username prefix) so
+# purge_synthetic_data() removes exactly what generate_synthetic_data() made.
+SYNTHETIC_PREFIX = "SYN"
+
+PORTS = ("IKA", "THR", "MHD", "BND", "DXB", "IST", "FRA", "AMS", "LHR", "CDG", "PVG", "CAN", "HKG",
+         "SIN", "BOM", "JEA", "HAM", "RTM", "ANR", "GOA", "MXP", "DOH", "KWI", "ALA")
+TERMS = ("EXW", "FCA", "FOB", "CFR", "CIF", "CPT", "CIP", "DAP", "DDP")
+COMMODITIES = ("spare parts", "textiles", "medical devices", "pharmaceuticals", "electronics",
+               "machinery", "chemicals", "food stuff", "documents", "furniture")
+CHARGES = (("Airfreight", "USD"), ("Pickup", "USD"), ("Customs clearance", "EUR"),
+           ("D/O + clearance IKA", "IRR"), ("Handling", "AED"), ("Other charges", "USD"))
+COMMENTS = ("Docs received", "Waiting for booking", "Cargo ready at origin", "Customs hold",
+            "Delivered", "Client asked for an update", "Rate confirmed")
+# mode -> relative weight, roughly the office's mix
+MODES = {"air_single": 30, "air_console": 20, "sea_fcl": 15, "sea_lcl": 12, "sea_bb": 2,
+         "sea_bulk": 1, "land_ltl": 8, "land_ftl": 8, "land_rail": 4}
+# free-text weights in the shapes staff actually type (see measures.py)
+WEIGHT_FORMATS = ("{:.1f}", "{:.0f} kg", "{:,.1f} KGS", "{:.2f}", "{:.0f}kg", "n/a")
+CHUNK_SIZE = 1000
+
+
+def synthetic_prefix(model):
+    return f"{SYNTHETIC_PREFIX} {model._meta.model_name} "
+
+
+def synthetic_shipments():
+    return Shipment.objects.filter(client__name__startswith=synthetic_prefix(Customer))
+
+
+def check_synthetic_allowed(force=False):
+    """
+    Synthetic rows are written to the configured database and take refs from
+    the real RefCounter; outside DEBUG the commands that generate them need
+    an explicit --force.
+    """
+    if not (settings.DEBUG or force):
+        raise CommandError(
+            "DEBUG is off: refusing to write synthetic data to this database. "
+            "Pass --force if it is a disposable copy."
+        )
+
+
+def _lookups(model, field, count, build):
+    """Create `count` rows named "<prefix> <model> <n>" with one bulk INSERT; returns their pks."""
+    prefix = synthetic_prefix(model)
+    start = model.objects.filter(**{f"{field}__startswith": prefix}).count()
+    model.objects.bulk_create(
+        [build(f"{prefix}{start + i:05d}", start + i) for i in range(count)], batch_size=CHUNK_SIZE
+    )
+    return list(model.objects.filter(**{f"{field}__startswith": prefix}).values_list("pk", flat=True))
+
+
+def _shipment(rng, ref, day, lane, lookups):
+    pol, pod, mode, carrier = lane
+    weight = rng.lognormvariate(5, 1.3)
+    confirmed = rng.random() < 0.6
+    etdw = day + timedelta(days=rng.randrange(1, 10))
+    shipment = Shipment(
+        ref=ref,
+        client_id=rng.choice(lookups["customer"]),
+        sp_id=rng.choice(lookups["user"]),
+        pol_id=pol,
+        pod_id=pod,
+        mode=mode,
+        carrier_id=carrier,
+        term_id=rng.choice(lookups["term"]),
+        agent_id=rng.choice(lookups["agent"]) if rng.random() < 0.7 else None,
+        console_id=rng.choice(lookups["console"]) if mode in ("air_console", "sea_lcl") else None,
+        shipper_id=rng.choice(lookups["shipper"]),
+        cnee_id=rng.choice(lookups["consignee"]),
+        hawb_shipper_id=rng.choice(lookups["shipper"]) if rng.random() < 0.3 else None,
+        hawb_cnee_id=rng.choice(lookups["consignee"]) if rng.random() < 0.3 else None,
+        inq_replied=rng.random() < 0.8,
+        confirmed=confirmed,
+        priority=rng.choices(("green", "yellow", "red"), weights=(70, 20, 10))[0],
+        mawb=f"{rng.randrange(100, 999)}-{rng.randrange(10**7, 10**8)}",
+        hawb=f"H{rng.randrange(10**6, 10**7)}" if rng.random() < 0.5 else None,
+        etdw=etdw,
+        etd=etdw + timedelta(days=rng.randrange(0, 4)),
+        eta=day + timedelta(days=rng.randrange(0, 3)),
+        pcs=str(rng.randrange(1, 60)),
+        gw=rng.choice(WEIGHT_FORMATS).format(weight),
+        cw=f"{weight * rng.uniform(1, 1.6):.1f}",
+        vol=f"{weight / rng.uniform(150, 400):.2f} cbm",
+        commodity=rng.choice(COMMODITIES),
+    )
+    # bulk_create skips save(); fill what it would derive
+    shipment.apply_derived_fields()
+    if confirmed:
+        shipment.confirm_date = timezone.make_aware(datetime.combine(day, day_time(15)))
+    return shipment
+
+
+def _children(rng, charges, comments, log):
+    """Charges and comments for the synthetic shipments, in bulk."""
+    queryset = synthetic_shipments().order_by("pk").values_list("pk", "sp__username")
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:CHUNK_SIZE])
+        if not chunk:
+            return
+        charge_rows, comment_rows = [], []
+        for pk, username in chunk:
+            for description, currency in rng.sample(CHARGES, rng.randint(0, min(charges, len(CHARGES)))):
+                amount = Decimal(rng.randrange(2000, 500000)) / 100
+                if currency == "IRR":
+                    amount = Decimal(rng.randrange(10**6, 10**8))
+                charge_rows.append(Charge(shipment_id=pk, description=description, amount=amount, currency=currency))
+            for _ in range(rng.randint(0, comments)):
+                comment_rows.append(ShipmentComment(shipment_id=pk, author_name=username, text=rng.choice(COMMENTS)))
+        Charge.objects.bulk_create(charge_rows, batch_size=CHUNK_SIZE)
+        ShipmentComment.objects.bulk_create(comment_rows, batch_size=CHUNK_SIZE)
+        last_pk = chunk[-1][0]
+        log(f"charges/comments: up to shipment {last_pk}")
+
+
+def generate_synthetic_data(shipments=10000, customers=200, parties=300, ports=len(PORTS), consoles=100,
+                            users=20, months=12, charges=3, comments=1, seed=0, log=None):
+    """
+    Synthetic lookups, then `shipments` shipments spread over the `months`
+    months up to yesterday (today's ref counter is left to real shipments)
+    with up to `charges` charges and `comments` comments each.  Everything
+    is bulk inserted; the fields save() and the signals would maintain
+    (derived measures, charge totals, search index) are filled in for the
+    synthetic shipments afterwards.  Returns the number of shipments created.
+    """
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+
+    with transaction.atomic():
+        lookups = {
+            "customer": _lookups(Customer, "name", customers, lambda name, i: Customer(name=name, country="IR")),
+            "shipper": _lookups(Shipper, "name", parties, lambda name, i: Shipper(name=name)),
+            "consignee": _lookups(Consignee, "name", parties, lambda name, i: Consignee(name=name, company=name)),
+            "carrier": _lookups(Carrier, "name", max(parties // 10, 1),
+                                lambda name, i: Carrier(name=name, abbreviation=f"S{i:04d}")),
+            "agent": _lookups(Agent, "name", max(parties // 10, 1), lambda name, i: Agent(name=name, code=f"SA{i:04d}")),
+            "user": _lookups(User, "username", users, lambda name, i: User(username=name)),
+            "pol": _lookups(PolList, "data", ports, lambda name, i: PolList(data=f"{name} {PORTS[i % len(PORTS)]}")),
+            "pod": _lookups(PodList, "data", ports, lambda name, i: PodList(data=f"{name} {PORTS[-1 - i % len(PORTS)]}")),
+            "term": _lookups(TermList, "data", len(TERMS), lambda name, i: TermList(data=f"{name} {TERMS[i % len(TERMS)]}")),
+            "console": _lookups(Console, "code", consoles, lambda name, i: Console(code=name)),
+        }
+    log(f"lookups: {customers} customers, {parties} shippers/consignees, {ports} ports, {consoles} consoles")
+
+    # a lane is a fixed (pol, pod, mode, carrier); shipments pick among them
+    lanes = [
+        (rng.choice(lookups["pol"]), rng.choice(lookups["pod"]),
+         rng.choices(list(MODES), weights=list(MODES.values()))[0], rng.choice(lookups["carrier"]))
+        for _ in range(max(ports * 2, 1))
+    ]
+    days = max(months * 30, 1)
+    per_day = max(shipments // days, 1)
+    last_day = timezone.localdate() - timedelta(days=1)
+    first_day = last_day - timedelta(days=days - 1)
+
+    created = 0
+    day = first_day
+    while created < shipments:
+        count = min(rng.randint(1, per_day * 2), shipments - created)
+        refs = RefCounter.objects.allocate(count, day=day)
+        batch = [_shipment(rng, ref, day, rng.choice(lanes), lookups) for ref in refs]
+        with transaction.atomic():
+            Shipment.objects.bulk_create(batch, batch_size=CHUNK_SIZE)
+            # created_at is auto_now_add; back-date the day's shipments in one UPDATE
+            Shipment.objects.filter(ref__in=refs).update(
+                created_at=timezone.make_aware(datetime.combine(day, day_time(10)))
+            )
+        created += count
+        day = day + timedelta(days=1) if day < last_day else first_day
+        if created % (CHUNK_SIZE * 10) < count:
+            log(f"shipments: {created}/{shipments}")
+
+    _children(rng, charges, comments, log)
+    rebuild_charge_totals(shipments=synthetic_shipments())
+    refresh_index(synthetic_shipments())
+    log("charge totals and search index rebuilt")
+    return created
+
+
+def purge_synthetic_data():
+    """Delete the synthetic shipments (with their charges/comments) and lookups."""
+    deleted = 0
+    while True:
+        pks = list(synthetic_shipments().values_list("pk", flat=True)[:CHUNK_SIZE])
+        if not pks:
+            break
+        deleted += Shipment.objects.filter(pk__in=pks).delete()[1].get(Shipment._meta.label, 0)
+    for model, field in ((Customer, "name"), (Shipper, "name"), (Consignee, "name"), (Carrier, "name"),
+                         (Agent, "name"), (User, "username"), (PolList, "data"), (PodList, "data"),
+                         (TermList, "data"), (Console, "code")):
+        model.objects.filter(**{f"{field}__startswith": synthetic_prefix(model)}).delete()
+    return deleted
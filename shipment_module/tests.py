@@ -1,3 +1,1420 @@
-from django.test import TestCase
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+import json
+import os
+import tempfile
+import zipfile
+from unittest import mock, skipUnless
+
+import tablib
+from admin_interface.models import Theme
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.contrib.auth.models import Permission
+from django.contrib.sessions.models import Session
+from django.db import connection, connections, transaction
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+from account.models import Agent, Carrier, Customer, Shipper, User
+from .autocomplete import prefix_match
+from .caching import VersionedLRU, autocomplete_cache, get_metrics
+from .exports import EXPORT_CHUNK_SIZE, EXPORT_CONTENT_TYPES
+from .filters import FacetRelatedFieldListFilter
+from .instrumentation import QueryProfiler, fingerprint, profile_queries, record_request, view_report
+from .models import Charge, Console, LaneMonthlyRollup, OutboundMessage, PodList, PolList, RefCounter, Shipment, ShipmentComment, ShipmentSearchIndex, TermList, Tombstone, format_ref
+from .measures import MeasureParseError, measure_values, parse_measure
+from .outbox import drain_outbox
+from .reports import measure_totals
+from .resources import ShipmentModelResource
+from .rollups import refresh_rollups
+from .routing import ReplicaRouter, ReplicaRoutingMiddleware, pin_reads, primary_reads, replica_reads
+from .synthetic import generate_synthetic_data, purge_synthetic_data, synthetic_shipments
+from .totals import rebuild_charge_totals
+from .utils import LocmemSmsGateway
+
+
+def create_shipments(count, sp):
+    for i in range(count):
+        Shipment.objects.create(
+            client=Customer.objects.create(name=f"client {i}"),
+            sp=sp,
+            pol=PolList.objects.create(data=f"POL{i}"),
+            pod=PodList.objects.create(data=f"POD{i}"),
+            term=TermList.objects.create(data=f"TERM{i}"),
+            carrier=Carrier.objects.create(name=f"carrier {i}"),
+            agent=Agent.objects.create(name=f"agent {i}"),
+            console=Console.objects.create(code=f"C{i}"),
+        )
+
+
+class RefAllocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.sp = User.objects.create_user("sp")
+        cls.day = date(2025, 11, 29)
+        cls.prefix = "251129"
+
+    def test_first_ref_matches_the_baseline_format(self):
+        create_shipments(2, self.sp)
+        today = timezone.now().date().strftime("%y%m%d")
+        self.assertEqual(list(Shipment.objects.order_by("pk").values_list("ref", flat=True)),
+                         [f"{today}01", f"{today}02"])
+
+    def test_seeds_from_existing_refs_past_99(self):
+        # "25112999" sorts after "251129100" as text; the seed must compare numbers
+        client, pol, pod = Customer.objects.create(name="c"), PolList.objects.create(data="P"), PodList.objects.create(data="D")
+        for counter in (7, 99, 100):
+            Shipment.objects.create(ref=format_ref(self.prefix, counter), client=client, sp=self.sp, pol=pol, pod=pod)
+        self.assertEqual(format_ref(self.prefix, 7), "25112907")
+        self.assertEqual(RefCounter.objects.allocate(day=self.day), ["251129101"])
+        self.assertEqual(RefCounter.objects.allocate(day=self.day), ["251129102"])
+
+    def test_block_reservation_is_contiguous(self):
+        first = RefCounter.objects.allocate(3, day=self.day)
+        block = RefCounter.objects.allocate(97, day=self.day)
+        self.assertEqual(first, ["25112901", "25112902", "25112903"])
+        self.assertEqual(block[0], "25112904")
+        self.assertEqual(block[-2:], ["25112999", "251129100"])
+        self.assertEqual(len(set(first + block)), 100)
+        with self.assertRaises(ValueError):
+            RefCounter.objects.allocate(0, day=self.day)
+
+    def test_counter_row_created_concurrently(self):
+        # another creator opens the day between our UPDATE (no row yet) and our INSERT
+        RefCounter.objects.create(prefix=self.prefix, last_value=5)
+        update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", autospec=True, side_effect=racing_update):
+            refs = RefCounter.objects.allocate(2, day=self.day)
+        self.assertEqual(len(calls), 2)  # the losing INSERT fell back to the UPDATE
+        self.assertEqual(refs, ["25112906", "25112907"])
+        self.assertEqual(RefCounter.objects.get(prefix=self.prefix).last_value, 7)
+
+
+class ShipmentBulkImportTests(TestCase):
+    HEADERS = ["ref", "client", "pol", "pod", "operators", "etdw", "eta", "confirmed", "pcs", "gw", "cw", "vol"]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sp = User.objects.create_user("sp")
+        cls.ops = [User.objects.create_user(f"op{i}") for i in range(2)]
+        cls.client_obj = Customer.objects.create(name="client")
+        PolList.objects.create(data="IKA")
+        PodList.objects.create(data="DXB")
+
+    def row(self, ref="", operators="op0", etdw="2025-01-10", confirmed=True, gw="1,234.5 kg"):
+        return [ref, self.client_obj.pk, "IKA", "DXB", operators, etdw, "2025-01-03", confirmed, "3", gw, "1300", "2 cbm"]
+
+    def import_rows(self, *rows):
+        resource = ShipmentModelResource()
+        self.assertTrue(resource._meta.use_bulk)
+        return resource.import_data(tablib.Dataset(*rows, headers=self.HEADERS), dry_run=False,
+                                    use_transactions=True, user=self.sp)
+
+    def test_bulk_rows_match_save(self):
+        result = self.import_rows(self.row(), self.row())
+        self.assertFalse(result.has_errors())
+        imported = list(Shipment.objects.order_by("ref"))
+
+        saved = Shipment.objects.create(
+            client=self.client_obj, sp=self.sp, pol=imported[0].pol, pod=imported[0].pod, etdw=date(2025, 1, 10),
+            eta=date(2025, 1, 3), confirmed=True, pcs="3", gw="1,234.5 kg", cw="1300", vol="2 cbm",
+        )
+        prefix = timezone.now().date().strftime("%y%m%d")
+        # one block from the same counter: the next save() continues after it
+        self.assertEqual([s.ref for s in imported] + [saved.ref], [f"{prefix}01", f"{prefix}02", f"{prefix}03"])
+        for shipment in imported:
+            self.assertEqual(shipment.sp, self.sp)
+            self.assertIsNotNone(shipment.confirm_date)
+            for field in ("transit_time", "pcs_num", "gw_kg", "cw_kg", "vol_cbm"):
+                self.assertEqual(getattr(shipment, field), getattr(saved, field), field)
+        self.assertEqual(imported[0].transit_time, 7)
+        self.assertEqual(set(imported[0].operators.all()), {self.ops[0]})
+
+    def test_update_replaces_operators(self):
+        self.import_rows(self.row(operators="op0,op1"))
+        ref = Shipment.objects.get().ref
+        result = self.import_rows(self.row(ref=ref, operators="op1", confirmed=False))
+        self.assertEqual(result.totals["update"], 1)
+        self.assertEqual(list(Shipment.objects.get().operators.all()), [self.ops[1]])
+
+    def test_bad_row_reported_by_number(self):
+        result = self.import_rows(self.row(), self.row(etdw="not a date"), self.row())
+        self.assertEqual([row.number for row in result.invalid_rows], [2])
+        self.assertIn("etdw", result.invalid_rows[0].error_dict)
+        self.assertEqual(Shipment.objects.count(), 2)
+
+    def test_refs_are_reserved_before_the_import_transaction(self):
+        allocate = RefCounter.objects.allocate
+        depths = []
+
+        def record(*args, **kwargs):
+            depths.append(len(connection.atomic_blocks))
+            return allocate(*args, **kwargs)
+
+        outer = len(connection.atomic_blocks)
+        with mock.patch.object(RefCounter.objects, "allocate", side_effect=record):
+            ShipmentModelResource().import_data(tablib.Dataset(self.row(), self.row(), headers=self.HEADERS),
+                                                dry_run=True, use_transactions=True, user=self.sp)
+            self.assertEqual(depths, [])  # a preview never locks the counter
+            result = self.import_rows(self.row(), self.row(etdw="not a date"), self.row())
+        self.assertEqual(depths, [outer])  # one block, taken outside the import's atomic
+        prefix = timezone.now().date().strftime("%y%m%d")
+        # the failed row's ref is left unused
+        self.assertEqual(sorted(Shipment.objects.values_list("ref", flat=True)), [f"{prefix}01", f"{prefix}02"])
+        self.assertEqual(RefCounter.objects.get(prefix=prefix).last_value, 3)
+        self.assertEqual(result.totals["new"], 2)
+
+
+class ImportLookupCacheTests(TestCase):
+    HEADERS = ["ref", "client", "pol", "pod", "carrier", "mawb_shipper", "mawb_cnee", "hawb_shipper"]
+    LOOKUP_COLUMNS = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sp = User.objects.create_user("sp")
+        cls.customers = [Customer.objects.create(name=f"client {i}") for i in range(3)]
+        RefCounter.objects.allocate()  # today's counter row exists, as after the first shipment of the day
+
+    def dataset(self, rows, tag):
+        dataset = tablib.Dataset(headers=self.HEADERS)
+        for i in range(rows):
+            client = self.customers[i % 3].pk
+            dataset.append([
+                # spreadsheets hand back ids as floats and names with stray spaces
+                "", float(client) if i % 2 else client, f"{tag} pol {i % 2}", f"{tag} pod", f" {tag} carrier ",
+                f"{tag} acme" if i % 2 else f"  {tag} acme ", f"{tag} beta", f"{tag} acme",
+            ])
+        return dataset
+
+    def import_dataset(self, dataset, create_missing=True):
+        return ShipmentModelResource(create_missing=create_missing).import_data(
+            dataset, dry_run=False, use_transactions=True, user=self.sp
+        )
+
+    def test_lookups_are_warmed_once_and_created_in_batches(self):
+        result = self.import_dataset(self.dataset(10, "a"))
+        self.assertFalse(result.has_errors())
+        self.assertEqual(result.lookup_cache_stats, {
+            "hits": 10 * self.LOOKUP_COLUMNS,
+            "misses": 0,
+            "prefetched": 3,  # the customers
+            # 2 pols, pod, carrier, shipper (shared by both shipper columns), consignee
+            "created": 6,
+            # one SELECT per model, one bulk INSERT per model with new values
+            "queries": 6 + 5,
+        })
+        acme = Shipper.objects.get(name="a acme")
+        self.assertEqual(Shipment.objects.filter(shipper=acme, hawb_shipper=acme).count(), 10)
+        self.assertEqual(Carrier.objects.filter(name="a carrier").count(), 1)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def lookup_and_bookkeeping(queries):
+            # the shipment INSERTs themselves are split by the backend's parameter limit
+            return [q for q in queries if not q["sql"].startswith('INSERT INTO "shipment_module_shipment"')]
+
+        with CaptureQueriesContext(connection) as few:
+            self.import_dataset(self.dataset(10, "a"))
+        with CaptureQueriesContext(connection) as many:
+            result = self.import_dataset(self.dataset(40, "b"))
+        self.assertEqual(result.totals["new"], 40)
+        self.assertEqual(len(lookup_and_bookkeeping(many)), len(lookup_and_bookkeeping(few)))
+        self.assertLessEqual(len(lookup_and_bookkeeping(many)), 30)
+
+    def test_unknown_names_fail_their_rows_unless_asked_to_create(self):
+        self.import_dataset(self.dataset(2, "a"))
+        dataset = self.dataset(4, "a")
+        dataset[3] = dataset[3][:4] + ("a stranger",) + dataset[3][5:]
+        with CaptureQueriesContext(connection) as queries:
+            result = self.import_dataset(dataset, create_missing=False)
+        self.assertEqual([row.number for row in result.invalid_rows], [4])
+        self.assertIn("Carrier 'a stranger' does not exist", str(result.invalid_rows[0].error_dict["carrier"]))
+        self.assertFalse(Carrier.objects.filter(name="a stranger").exists())
+        # the names resolve with one IN query per model; the unknown one is not looked up again
+        carrier_selects = [q for q in queries if 'FROM "account_carrier"' in q["sql"]]
+        self.assertEqual(len(carrier_selects), 1)
+
+
+class StreamingExportTests(TestCase):
+    ROWS = EXPORT_CHUNK_SIZE + 1
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        client = Customer.objects.create(name="client")
+        pol, pod = PolList.objects.create(data="POL"), PodList.objects.create(data="POD")
+        Shipment.objects.bulk_create(
+            Shipment(ref=f"R{i:05d}", client=client, pol=pol, pod=pod, sp=cls.admin, confirmed=i % 2 == 0)
+            for i in range(cls.ROWS)
+        )
+        cls.url = reverse("admin:shipment_module_shipment_export_stream")
+
+    def staff(self, *codenames):
+        user = User.objects.create_user(f"staff{len(codenames)}", is_staff=True)
+        user.user_permissions.set(Permission.objects.filter(content_type__app_label="shipment_module", codename__in=codenames))
+        self.client.force_login(user)
+
+    def lines(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], EXPORT_CONTENT_TYPES["csv"])
+        return b"".join(response.streaming_content).decode().splitlines()
+
+    def test_header_and_rows_across_chunks(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            lines = self.lines(response)
+        self.assertEqual(lines[0], ",".join(ShipmentModelResource().get_export_headers()))
+        self.assertEqual(len(lines) - 1, self.ROWS)
+        # shipments + prefetched operators per chunk, then the empty chunk that ends the walk
+        self.assertEqual(len(queries), 2 * 2 + 1, "\n".join(q["sql"] for q in queries))
+
+    def test_changelist_filters_apply_and_get_is_untouched(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url, {"confirmed__exact": "1", "file_format": "csv"})
+        self.assertEqual(len(self.lines(response)) - 1, (self.ROWS + 1) // 2)
+        self.assertEqual(response.wsgi_request.GET["file_format"], "csv")
+
+    def test_export_needs_the_export_permission(self):
+        self.staff("view_shipment")
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        changelist = reverse("admin:shipment_module_shipment_changelist")
+        response = self.client.post(changelist, {"action": "export_selected_csv", "index": 0, "_selected_action": [Shipment.objects.first().pk]})
+        self.assertNotEqual(response.get("Content-Type"), EXPORT_CONTENT_TYPES["csv"])
+
+        self.staff("view_shipment", "export_shipment")
+        self.assertEqual(len(self.lines(self.client.get(self.url))) - 1, self.ROWS)
+
+
+class ShipmentChangelistQueryBudgetTests(TestCase):
+    # session, user, page count, page rows, one GROUP BY per related facet
+    # (client, carrier, agent, console, pol, pod, term, sp)
+    QUERY_BUDGET = 12
+    # count and facets cached: session, user, page rows
+    CACHED_QUERY_BUDGET = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.url = reverse("admin:shipment_module_shipment_changelist")
+        # the admin theme is loaded once and cached; keep it out of the budget
+        self.client.get(reverse("admin:index"))
+
+    def assertPageQueries(self, expected):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), expected, "\n".join(q["sql"] for q in queries))
+        return response
+
+    def test_query_budget_does_not_grow_with_rows(self):
+        create_shipments(3, self.admin)
+        self.assertPageQueries(self.QUERY_BUDGET)
+
+        create_shipments(20, self.admin)
+        response = self.assertPageQueries(self.QUERY_BUDGET)
+        self.assertEqual(len(response.context["cl"].result_list), 23)
+
+    def test_count_is_cached_until_shipments_change(self):
+        create_shipments(2, self.admin)
+        self.assertPageQueries(self.QUERY_BUDGET)
+        self.assertPageQueries(self.CACHED_QUERY_BUDGET)
+
+        create_shipments(1, self.admin)
+        response = self.assertPageQueries(self.QUERY_BUDGET)
+        self.assertEqual(response.context["cl"].result_count, 3)
+
+    def test_manifest_link_matches_reverse(self):
+        create_shipments(1, self.admin)
+        shipment = Shipment.objects.get()
+        response = self.client.get(self.url)
+        self.assertContains(response, reverse("shipment:manifest-detail", args=[shipment.pk]))
+
+    def test_facets_list_only_values_in_the_result_set(self):
+        create_shipments(2, self.admin)
+        unused = Customer.objects.create(name="never shipped")
+        shipment = Shipment.objects.first()
+        Shipment.objects.create(client=shipment.client, sp=self.admin, pol=shipment.pol, pod=shipment.pod)
+
+        response = self.client.get(self.url)
+        client_filter = next(spec for spec in response.context["cl"].filter_specs if spec.field_path == "client")
+        displays = [choice["display"] for choice in client_filter.choices(response.context["cl"])]
+        self.assertIn(f"{shipment.client.name} (2)", displays)
+        self.assertNotIn(f"{unused.name} (0)", displays)
+
+        # a rename invalidates the cached label
+        shipment.client.name = "renamed"
+        shipment.client.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, "renamed (2)")
+
+    @mock.patch.object(FacetRelatedFieldListFilter, "autocomplete_threshold", 1)
+    def test_high_cardinality_facet_switches_to_search(self):
+        create_shipments(3, self.admin)
+        response = self.client.get(self.url + "?client_starts=client%201")
+        self.assertContains(response, 'name="client_starts"')
+        self.assertEqual(response.context["cl"].result_count, 1)
+
+
+@skipUnless(connection.vendor == "sqlite", "reads SQLite EXPLAIN QUERY PLAN output")
+class ShipmentIndexTests(TestCase):
+    FK_FILTERS = ("client", "carrier", "console", "sp")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        create_shipments(3, cls.admin)
+
+    def plans(self):
+        out = io.StringIO()
+        call_command("explain_admin_queries", stdout=out)
+        # one block per filter shape: a "<label> (<params>)" heading, then its plan
+        return {block.split(" (", 1)[0]: block for block in out.getvalue().split("\n\n")}
+
+    def test_fk_filters_use_the_composite_indexes(self):
+        plans = self.plans()
+        for field in self.FK_FILTERS:
+            self.assertIn(f"USING INDEX shipment_{field}_created_idx ({field}_id=?)", plans[field])
+
+    def test_no_single_column_index_on_those_fks(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Shipment._meta.db_table)
+        indexed = [c["columns"] for c in constraints.values() if c["index"] and not c["unique"]]
+        for field in self.FK_FILTERS:
+            self.assertNotIn([f"{field}_id"], indexed)
+            self.assertIn([f"{field}_id", "created_at", "id"], indexed)
+
+
+class ShipmentSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        create_shipments(2, cls.admin)
+        cls.shipment = Shipment.objects.order_by("pk").first()
+        cls.shipment.mawb = "176-12345675"
+        cls.shipment.save()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = reverse("admin:shipment_module_shipment_changelist")
+
+    def search(self, term):
+        response = self.client.get(self.url, {"q": term})
+        self.assertEqual(response.status_code, 200)
+        return list(response.context["cl"].result_list)
+
+    def test_prefix_matches_ref_and_mawb(self):
+        self.assertEqual(self.search(self.shipment.ref[:7]), list(Shipment.objects.filter(ref__startswith=self.shipment.ref[:7])))
+        self.assertEqual(self.search("176-1234"), [self.shipment])
+
+    def test_party_rename_refreshes_index(self):
+        self.assertEqual(self.search("client 0"), [self.shipment])
+        customer = self.shipment.client
+        customer.name = "Acme Trading"
+        customer.save()
+        self.assertEqual(self.search("acme"), [self.shipment])
+        self.assertEqual(self.search("client 0"), [])
+
+
+@override_settings(
+    SMS_GATEWAY="shipment_module.utils.LocmemSmsGateway",
+    SMS_RATE_LIMIT=0,
+    SMS_MAX_ATTEMPTS=2,
+    MANAGER_PHONE="09120000000",
+)
+class SmsOutboxTests(TestCase):
+    def setUp(self):
+        LocmemSmsGateway.outbox = []
+        LocmemSmsGateway.failing = set()
+        self.user = User.objects.create_superuser("09121111111", "admin@example.com", "pass")
+
+    def test_login_queues_without_sending(self):
+        self.client.force_login(self.user)
+        self.assertEqual(
+            sorted(OutboundMessage.objects.values_list("recipient", flat=True)),
+            ["09120000000", "09121111111"],
+        )
+        self.assertEqual(LocmemSmsGateway.outbox, [])
+
+        self.assertEqual(drain_outbox(), {"sent": 2, "retried": 0, "failed": 0})
+        self.assertEqual(len(LocmemSmsGateway.outbox), 2)
+        self.assertFalse(OutboundMessage.objects.due().exists())
+
+    def test_login_with_a_non_phone_username_only_alerts_the_manager(self):
+        user = User.objects.create_superuser("operations." + "x" * 100, "ops@example.com", "pass")
+        self.client.force_login(user)
+        self.assertEqual(list(OutboundMessage.objects.values_list("recipient", flat=True)), ["09120000000"])
+
+    def test_failed_send_backs_off_then_gives_up(self):
+        LocmemSmsGateway.failing = {"09121111111"}
+        OutboundMessage.objects.enqueue("09121111111", "hello")
+
+        self.assertEqual(drain_outbox(), {"sent": 0, "retried": 1, "failed": 0})
+        message = OutboundMessage.objects.get()
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt_at, message.created_at)
+        # not due again until the backoff passes
+        self.assertEqual(drain_outbox(), {"sent": 0, "retried": 0, "failed": 0})
+
+        OutboundMessage.objects.update(next_attempt_at=message.created_at)
+        self.assertEqual(drain_outbox(), {"sent": 0, "retried": 0, "failed": 1})
+        self.assertEqual(OutboundMessage.objects.get().status, OutboundMessage.FAILED)
+
+
+@override_settings(CHARGE_USD_RATES={"USD": 1, "EUR": "1.10"})
+class ChargeTotalsTests(TestCase):
+    def setUp(self):
+        create_shipments(1, User.objects.create_user("sp"))
+        self.shipment = Shipment.objects.get()
+
+    def test_totals_follow_charge_changes(self):
+        Charge.objects.create(shipment=self.shipment, description="freight", amount="100.00", currency="usd")
+        eur = Charge.objects.create(shipment=self.shipment, description="handling", amount="10.00", currency="EUR")
+        self.shipment.refresh_from_db()
+        self.assertEqual(self.shipment.charge_totals, {"EUR": "10.00", "USD": "100.00"})
+        self.assertEqual(str(self.shipment.charges_total_usd), "111.00")
+
+        eur.delete()
+        self.shipment.refresh_from_db()
+        self.assertEqual(self.shipment.charge_totals, {"USD": "100.00"})
+        self.assertEqual(str(self.shipment.charges_total_usd), "100.00")
+
+    def test_moving_a_charge_refreshes_both_shipments(self):
+        Charge.objects.create(shipment=self.shipment, description="freight", amount="100.00", currency="USD")
+        create_shipments(1, self.shipment.sp)
+        other = Shipment.objects.exclude(pk=self.shipment.pk).get()
+
+        charge = Charge.objects.get()
+        charge.shipment = other
+        charge.save()
+        self.shipment.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.shipment.charge_totals, {})
+        self.assertEqual(str(self.shipment.charges_total_usd), "0.00")
+        self.assertEqual(other.charge_totals, {"USD": "100.00"})
+
+        # the snapshot was retaken; a later save only refreshes the new shipment
+        with mock.patch("shipment_module.signals.refresh_charge_totals") as refresh:
+            charge.description = "freight (2)"
+            charge.save()
+        refresh.assert_called_once_with(other.pk)
+
+    def test_import_does_not_write_the_totals(self):
+        Charge.objects.create(shipment=self.shipment, description="freight", amount="100.00", currency="USD")
+        self.shipment.refresh_from_db()
+        self.assertNotIn("charges_total_usd", ShipmentModelResource().get_bulk_update_fields())
+        dataset = tablib.Dataset(
+            [self.shipment.ref, self.shipment.client_id, self.shipment.pol.data, self.shipment.pod.data, "{}", "1"],
+            headers=["ref", "client", "pol", "pod", "charge_totals", "charges_total_usd"],
+        )
+        result = ShipmentModelResource().import_data(dataset, dry_run=False, use_transactions=True)
+        self.assertFalse(result.has_errors())
+        self.shipment.refresh_from_db()
+        self.assertEqual(self.shipment.charge_totals, {"USD": "100.00"})
+        self.assertEqual(str(self.shipment.charges_total_usd), "100.00")
+
+    def test_unknown_currency_leaves_usd_total_empty(self):
+        Charge.objects.create(shipment=self.shipment, description="d/o", amount="5000000", currency="IRR")
+        self.shipment.refresh_from_db()
+        self.assertEqual(self.shipment.charge_totals, {"IRR": "5000000.00"})
+        self.assertIsNone(self.shipment.charges_total_usd)
+
+    def test_rebuild_matches_incremental_totals(self):
+        Charge.objects.create(shipment=self.shipment, description="freight", amount="7.50", currency="USD")
+        Charge.objects.create(shipment=self.shipment, description="pickup", amount="2.50", currency="USD")
+        Shipment.objects.update(charge_totals={}, charges_total_usd=None)
+
+        with self.assertNumQueries(3):  # reset shipments without charges, GROUP BY, bulk update
+            self.assertEqual(rebuild_charge_totals(), 1)
+        self.shipment.refresh_from_db()
+        self.assertEqual(self.shipment.charge_totals, {"USD": "10.00"})
+        self.assertEqual(str(self.shipment.charges_total_usd), "10.00")
+
+
+class InvoiceRenderingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        create_shipments(3, cls.admin)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.shipment = Shipment.objects.order_by("pk").first()
+        self.url = reverse("shipment:invoice-detail", args=[self.shipment.pk])
+
+    def test_invoice_is_one_query_then_cached_until_save(self):
+        with self.assertNumQueries(3):  # session, user, shipment with its parties
+            response = self.client.get(self.url)
+        self.assertContains(response, self.shipment.client.name)
+
+        with mock.patch("shipment_module.invoices.render_to_string", wraps=render_to_string) as render:
+            self.client.get(self.url)
+            self.assertEqual(
+                [call.args[0] for call in render.call_args_list], ["shipment/invoice_detail.html"]
+            )
+
+            self.shipment.mawb = "999-12345678"
+            self.shipment.save()
+            self.assertContains(self.client.get(self.url), "999-12345678")
+
+    def test_party_renames_evict_the_cached_invoice(self):
+        self.assertContains(self.client.get(self.url), self.shipment.client.name)
+        client, pol = self.shipment.client, self.shipment.pol
+        client.name = "Renamed Trading"
+        client.save()
+        pol.data = "Renamed Port"
+        pol.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, "Renamed Trading")
+        self.assertContains(response, "Renamed Port")
+
+    def test_batch_prints_every_shipment(self):
+        shipments = Shipment.objects.order_by("pk")
+        ids = ",".join(str(pk) for pk in shipments.values_list("pk", flat=True))
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("shipment:invoice-batch"), {"ids": ids})
+        self.assertEqual(response.content.decode().count('<section class="invoice">'), 3)
+        for shipment in shipments:
+            self.assertContains(response, shipment.ref)
+
+
+class ManifestBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        create_shipments(3, cls.admin)
+        cls.url = reverse("shipment:manifest-batch")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.shipments = list(Shipment.objects.order_by("ref", "pk"))
+        self.ids = ",".join(str(s.pk) for s in self.shipments)
+
+    def download(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"ids": self.ids, **params})
+            content = b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        # session, user, shipments with their parties
+        self.assertEqual(len(queries), 3, "\n".join(q["sql"] for q in queries))
+        return response, content
+
+    def single(self, shipment):
+        return self.client.get(reverse("shipment:manifest-detail", args=[shipment.pk]))
+
+    def test_batch_text_matches_the_single_downloads(self):
+        response, content = self.download()
+        self.assertEqual(content, b"\n\n".join(self.single(s).content for s in self.shipments))
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="Manifests.txt"')
+
+    def test_batch_zip_matches_the_single_downloads(self):
+        response, content = self.download(format="zip")
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            for shipment, name in zip(self.shipments, archive.namelist(), strict=True):
+                single = self.single(shipment)
+                self.assertIn(f'filename="{name}"', single["Content-Disposition"])
+                self.assertEqual(archive.read(name), single.content)
+
+    def test_console_code_is_escaped_in_the_filename(self):
+        console = Console.objects.create(code='C"1\r\nX-Injected: 1')
+        Shipment.objects.filter(pk=self.shipments[0].pk).update(console=console)
+        response = self.client.get(self.url, {"console": console.pk})
+        self.assertEqual(
+            response["Content-Disposition"], content_disposition_header(True, f"Manifests_{console.code}.txt")
+        )
+        self.assertFalse(response.has_header("X-Injected"))
+
+    def test_batch_views_need_view_permission(self):
+        staff = User.objects.create_user("staff", is_staff=True)
+        self.client.force_login(staff)
+        for name in ("shipment:manifest-batch", "shipment:invoice-batch"):
+            self.assertEqual(self.client.get(reverse(name), {"ids": self.ids}).status_code, 403)
+
+        staff.user_permissions.add(Permission.objects.get(codename="view_shipment"))
+        self.assertEqual(self.client.get(reverse("shipment:invoice-batch"), {"ids": self.ids}).status_code, 200)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url, {"ids": self.ids}).status_code, 302)
+
+
+class ShipmentAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        create_shipments(5, cls.admin)
+
+    def setUp(self):
+        autocomplete_cache.flush()
+        cache.clear()
+        autocomplete_cache.clear()
+        self.client.force_login(self.admin)
+        # warm the admin theme
+        self.client.get(reverse("admin:index"))
+
+    def autocomplete(self, field, term):
+        return self.client.get(reverse("admin:autocomplete"), {
+            "app_label": "shipment_module", "model_name": "shipment", "field_name": field, "term": term,
+        })
+
+    def add_form(self):
+        key = "form:shipment_module.shipment:GET:queries"
+        before = get_metrics([key])[key]
+        response = self.client.get(reverse("admin:shipment_module_shipment_add"))
+        return get_metrics([key])[key] - before, len(response.content)
+
+    def test_add_form_does_not_grow_with_lookup_tables(self):
+        self.add_form()
+        queries, size = self.add_form()
+        create_shipments(20, self.admin)
+        self.assertEqual(self.add_form(), (queries, size))
+
+    def test_prefix_search_is_cached_per_term(self):
+        response = self.autocomplete("pol", "POL1")
+        self.assertEqual(sorted(r["text"] for r in response.json()["results"]), ["POL1"])
+        self.assertEqual(self.autocomplete("client", "lient").json()["results"], [])
+
+        with self.assertNumQueries(2):  # session, user
+            self.autocomplete("pol", "POL1")
+
+        PolList.objects.create(data="POL10")
+        texts = sorted(r["text"] for r in self.autocomplete("pol", "pol1").json()["results"])
+        self.assertEqual(texts, ["POL1", "POL10"])
+
+    def test_pages_are_served_from_the_local_lru_until_a_write(self):
+        metrics = [f"autocomplete:shipment_module.pollist:{kind}" for kind in ("local_hits", "shared_hits", "misses")]
+        self.autocomplete("pol", "POL2")  # page and count: two misses
+        self.autocomplete("pol", "POL2")
+        # counted in-process until the next flush
+        self.assertEqual(list(get_metrics(metrics).values()), [0, 0, 0])
+        autocomplete_cache.flush()
+        self.assertEqual(list(get_metrics(metrics).values()), [2, 0, 2])
+
+        # another worker: its LRU is empty, the shared cache has the entries
+        autocomplete_cache.clear()
+        self.autocomplete("pol", "POL2")
+        autocomplete_cache.flush()
+        self.assertEqual(list(get_metrics(metrics).values()), [2, 2, 2])
+
+        # a rename bumps the table's version stamp; every worker misses the old keys
+        pol = PolList.objects.get(data="POL2")
+        pol.data = "POL2 renamed"
+        pol.save()
+        texts = [r["text"] for r in self.autocomplete("pol", "POL2").json()["results"]]
+        self.assertEqual(texts, ["POL2 renamed"])
+        autocomplete_cache.flush()
+        self.assertEqual(list(get_metrics(metrics).values()), [2, 2, 4])
+
+        out = io.StringIO()
+        call_command("lookup_cache_stats", stdout=out)
+        self.assertRegex(out.getvalue(), r"shipment_module.pollist +local hits=2 shared hits=2 misses=4 hit rate=50.0%")
+
+    @skipUnless(connection.vendor == "sqlite", "reads SQLite EXPLAIN QUERY PLAN output")
+    def test_prefix_search_uses_the_lower_indexes(self):
+        for model, model_admin in admin.site._registry.items():
+            for field in getattr(model_admin, "autocomplete_prefix_fields", ()):
+                plan = model.objects.filter(prefix_match(field, "Ab")).explain()
+                self.assertIn(f"USING INDEX {model._meta.model_name}_{field}_lower_idx", plan)
+
+    def test_local_hits_stay_off_the_shared_cache(self):
+        with mock.patch.object(cache, "set", wraps=cache.set) as shared_set:
+            response = self.autocomplete("operators", "adm").json()
+        self.assertEqual(response["results"], [{"id": str(self.admin.pk), "text": "admin"}])
+        # only (id, label) pairs are shared between workers, no User rows or password hashes
+        self.assertIn([(self.admin.pk, "admin")], [call.args[1] for call in shared_set.call_args_list])
+
+        with mock.patch("shipment_module.caching.incr_metric") as incr_metric:
+            self.assertEqual(self.autocomplete("operators", "adm").json(), response)
+        incr_metric.assert_not_called()
+
+    def test_lru_keeps_the_most_recent_entries(self):
+        lru = VersionedLRU(maxsize=2)
+        for key in ("a", "b", "a", "c"):
+            lru.get_or_set(f"test-lru:{key}", lambda: key, "test-lru")
+        cache.clear()
+        self.assertEqual(lru.get_or_set("test-lru:a", lambda: "recomputed", "test-lru"), "a")
+        self.assertEqual(lru.get_or_set("test-lru:b", lambda: "recomputed", "test-lru"), "recomputed")
+
+
+class ShipmentListAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        create_shipments(7, cls.admin)
+        Shipment.objects.filter(pk__in=Shipment.objects.order_by("pk").values("pk")[:3]).update(confirmed=True)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = reverse("shipment:api-shipment-list")
+
+    def test_cursor_walks_every_row_once_in_order(self):
+        refs, cursor = [], ""
+        while True:
+            with self.assertNumQueries(3):  # session, user, page
+                page = self.client.get(self.url, {"fields": "ref", "limit": 3, "cursor": cursor}).json()
+            refs += [row["ref"] for row in page["results"]]
+            cursor = page["next"]
+            if not cursor:
+                break
+        expected = list(Shipment.objects.order_by("-created_at", "-pk").values_list("ref", flat=True))
+        self.assertEqual(refs, expected)
+
+    def test_projection_and_list_filters(self):
+        shipment = Shipment.objects.filter(confirmed=True).select_related("client").first()
+        page = self.client.get(self.url, {"fields": "ref,client", "confirmed": "1", "client": shipment.client_id}).json()
+        self.assertEqual(page["results"], [{"ref": shipment.ref, "client": shipment.client.name}])
+        self.assertEqual(len(self.client.get(self.url, {"confirmed": "0"}).json()["results"]), 4)
+        self.assertEqual(self.client.get(self.url, {"fields": "nope"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"priority": "blue"}).status_code, 400)
+
+    def test_etag_answers_not_modified_until_data_changes(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Shipment.objects.filter(pk=response.json()["results"][0]["id"]).update(priority="red")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(CHANGE_FEED_LAG=0)
+class ChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        create_shipments(2, cls.admin)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = reverse("shipment:api-change-feed")
+
+    def pull(self, cursor=""):
+        response = self.client.get(self.url, {"cursor": cursor})
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        changes = [(line["type"], line["data"]["id"]) for line in lines if line["type"] != "cursor"]
+        return changes, lines[-1]["cursor"]
+
+    def test_resuming_returns_only_new_changes(self):
+        first, second = Shipment.objects.order_by("pk")
+        changes, cursor = self.pull()
+        self.assertEqual(changes, [("shipment", first.pk), ("shipment", second.pk)])
+        self.assertEqual(self.pull(cursor)[0], [])
+
+        charge = Charge.objects.create(shipment=first, description="freight", amount="10.00")
+        comment = ShipmentComment.objects.create(shipment=second, text="late", author_name="ops")
+        changes, cursor = self.pull(cursor)
+        # the charge refreshed the shipment's totals, so the shipment changed too
+        self.assertEqual(changes, [("shipment", first.pk), ("charge", charge.pk), ("comment", comment.pk)])
+        self.assertEqual(self.pull(cursor)[0], [])
+
+    def test_deletions_leave_tombstones(self):
+        first, second = Shipment.objects.order_by("pk")
+        charge = Charge.objects.create(shipment=first, description="freight", amount="10.00")
+        cursor = self.pull()[1]
+        charge_pk, second_pk = charge.pk, second.pk
+
+        charge.delete()
+        Charge.objects.create(shipment=second, description="pickup", amount="1.00")
+        ShipmentComment.objects.create(shipment=second, text="late", author_name="ops")
+        second.delete()
+        self.assertEqual(
+            list(Tombstone.objects.order_by("pk").values_list("model", "object_id")),
+            [("charge", charge_pk), ("shipment", second_pk)],
+        )
+        changes = [change for change in self.pull(cursor)[0] if change[0] == "deleted"]
+        self.assertEqual(len(changes), 2)
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.client.get(self.url, {"cursor": "bogus"}).status_code, 400)
+
+
+class MeasureTests(TestCase):
+    def test_parse_legacy_values(self):
+        cases = {
+            ("1,234.5 kg", "weight"): "1234.500",
+            ("1.234,5", "weight"): "1234.500",
+            ("12,5", "weight"): "12.500",
+            ("0.125", "weight"): "0.125",
+            ("۱۲۳ KGS", "weight"): "123.000",
+            ("1.2 t", "weight"): "1200.000",
+            ("3.5 cbm", "volume"): "3.500",
+            ("4 ctns", "count"): "4.000",
+        }
+        for (value, kind), expected in cases.items():
+            self.assertEqual(str(parse_measure(value, kind)), expected, value)
+        for blank in (None, "", " - ", "N/A"):
+            self.assertIsNone(parse_measure(blank, "weight"))
+        for messy in ("10-12", "2 x 20ft", "12 bags", "1.5 pcs"):
+            with self.assertRaises(MeasureParseError):
+                parse_measure(messy, "count" if "pcs" in messy else "weight")
+
+    def test_save_and_backfill_keep_columns_in_sync(self):
+        create_shipments(3, User.objects.create_user("sp"))
+        first, second, third = Shipment.objects.order_by("pk")
+        first.gw, first.pcs, first.mode = "1,000 kg", "2", "air"
+        first.save()
+        self.assertEqual((first.gw_kg, first.pcs_num), (Decimal("1000"), 2))
+
+        # legacy rows written around save()
+        Shipment.objects.filter(pk=second.pk).update(gw="250.5", vol="1,5", mode="air")
+        Shipment.objects.filter(pk=third.pk).update(gw="about 3t", mode="sea_fcl")
+        log = io.StringIO()
+        with mock.patch("sys.stderr", log):
+            call_command("backfill_measures", chunk_size=2, stdout=io.StringIO())
+        self.assertIn(f"{third.pk},{third.ref},gw,about 3t", log.getvalue())
+
+        totals = {row["mode"]: row for row in measure_totals(Shipment.objects.all(), "mode")}
+        self.assertEqual(totals["air"]["total_gw_kg"], Decimal("1250.5"))
+        self.assertEqual(totals["air"]["total_vol_cbm"], Decimal("1.5"))
+        self.assertEqual(totals["sea_fcl"]["unparsed_gw"], 1)
+
+    def test_values_the_columns_cannot_hold_are_unparseable(self):
+        create_shipments(1, User.objects.create_user("sp"))
+        shipment = Shipment.objects.get()
+        shipment.gw, shipment.vol = "123456789012345", "1" * 40
+        shipment.pcs, shipment.cw = "99999999999", "12345678901.5"
+        shipment.save()
+        shipment.refresh_from_db()
+        self.assertEqual((shipment.gw_kg, shipment.vol_cbm, shipment.pcs_num), (None, None, None))
+        self.assertEqual(shipment.cw_kg, Decimal("12345678901.5"))
+
+        values, errors = measure_values(shipment)
+        self.assertEqual(set(errors), {"gw", "vol", "pcs"})
+        self.assertIn("out of range for gw_kg", errors["gw"])
+
+        log = io.StringIO()
+        with mock.patch("sys.stderr", log):
+            call_command("backfill_measures", stdout=io.StringIO())
+        self.assertIn(f"{shipment.pk},{shipment.ref},gw,123456789012345", log.getvalue())
+
+    def test_import_recomputes_the_columns_instead_of_reading_them(self):
+        create_shipments(1, User.objects.create_user("sp"))
+        shipment = Shipment.objects.get()
+        fields = ShipmentModelResource().get_bulk_update_fields()
+        self.assertEqual(fields.count("gw_kg"), 1)  # only as a derived field
+        dataset = tablib.Dataset(
+            [shipment.ref, shipment.client_id, shipment.pol.data, shipment.pod.data, "2 ctns", "10 kg", "7", "99999"],
+            headers=["ref", "client", "pol", "pod", "pcs", "gw", "pcs_num", "gw_kg"],
+        )
+        result = ShipmentModelResource().import_data(dataset, dry_run=False, use_transactions=True)
+        self.assertFalse(result.has_errors())
+        shipment.refresh_from_db()
+        self.assertEqual((shipment.pcs_num, shipment.gw_kg), (2, Decimal("10.000")))
+
+
+@override_settings(CHANGE_FEED_LAG=0)
+class LaneRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        create_shipments(3, cls.admin)
+
+    def snapshot(self):
+        return sorted(
+            LaneMonthlyRollup.objects.values_list("bucket", "shipments", "confirmed", "transit_days", "transit_count", "revenue_usd")
+        )
+
+    def test_incremental_refresh_matches_full_rebuild(self):
+        first, second, third = Shipment.objects.order_by("pk")
+        last_year = third.created_at.replace(year=third.created_at.year - 1)
+        Shipment.objects.filter(pk=third.pk).update(created_at=last_year)
+        refresh_rollups()
+        self.assertEqual(sum(row[1] for row in self.snapshot()), 3)
+
+        first.confirmed = True
+        first.save()
+        Charge.objects.create(shipment=second, description="freight", amount="10.00", currency="USD")
+        Shipment.objects.get(pk=third.pk).delete()
+
+        months = refresh_rollups()
+        self.assertEqual(len(months), 2)
+        incremental = self.snapshot()
+        refresh_rollups(full=True)
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(sum(row[1] for row in incremental), 2)
+        self.assertEqual(sum(row[2] for row in incremental), 1)
+        self.assertEqual(sum(row[5] for row in incremental), Decimal("10.00"))
+
+    def test_dashboard_reads_rollups_only(self):
+        refresh_rollups()
+        self.client.force_login(self.admin)
+        url = reverse("admin:shipment_module_lanemonthlyrollup_changelist")
+        self.client.get(url)  # warm session / theme queries
+        for by in ("lane", "carrier", "mode", "month"):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {"by": by})
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([q for q in queries if '"shipment_module_shipment"' in q["sql"]], by)
+        self.assertEqual(len(response.context["rows"]), 1)
+        self.assertEqual(response.context["rows"][0]["total_shipments"], 3)
+        self.assertEqual(self.client.get(url, {"from": "2025-13"}).status_code, 400)
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True)
+class InstrumentationTests(TestCase):
+    databases = {"default", settings.REPLICA_DATABASE} - {None}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        create_shipments(2, cls.admin)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_instrumented_views_are_logged_and_aggregated(self):
+        shipment = Shipment.objects.first()
+        with self.assertLogs("shipment_module.instrumentation", "INFO") as logs:
+            self.client.get(reverse("admin:shipment_module_shipment_changelist"))
+            self.client.get(reverse("shipment:invoice-detail", args=[shipment.pk]))
+            self.client.get(reverse("shipment:invoice-detail", args=[shipment.pk]))
+            self.client.get(reverse("admin:index"))  # not instrumented
+        self.assertEqual(len(logs.records), 3)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line["view"], "admin:shipment_module_shipment_changelist")
+        self.assertGreater(line["queries"], 0)
+        self.assertEqual(sum(line["queries_by_alias"].values()), line["queries"])
+
+        report = {row["view"]: row for row in view_report()}
+        self.assertEqual(set(report), {"admin:shipment_module_shipment_changelist", "shipment:invoice-detail"})
+        self.assertEqual(report["shipment:invoice-detail"]["requests"], 2)
+
+        response = self.client.get(reverse("shipment:instrumentation-report"))
+        self.assertContains(response, "shipment:invoice-detail")
+        self.client.post(reverse("shipment:instrumentation-report"))
+        self.assertEqual(view_report(), [])
+
+    @override_settings(INSTRUMENTATION_DUPLICATE_THRESHOLD=2)
+    def test_repeated_statements_are_reported(self):
+        self.assertEqual(fingerprint("SELECT 1 WHERE id IN (%s, %s,%s)"), "SELECT 1 WHERE id IN (...)")
+        profiler = QueryProfiler()
+        with connection.execute_wrapper(profiler):
+            for shipment in Shipment.objects.all():
+                shipment.client.name  # one query per row
+        duplicates = record_request("test-view", 0.01, profiler)
+        self.assertEqual(profiler.count, 3)
+        self.assertEqual(list(duplicates.values()), [2])
+        self.assertIn("account_customer", next(iter(duplicates)))
+
+        row = view_report()[0]
+        self.assertEqual((row["queries"], row["n_plus_one"], row["duplicate_queries"]), (3, 1, 1))
+
+    def test_every_database_alias_is_profiled(self):
+        profiler = QueryProfiler()
+        with profile_queries(profiler):
+            for alias in connections:
+                Shipment.objects.using(alias).count()
+        self.assertEqual(profiler.aliases, {alias: 1 for alias in connections})
+
+    def test_report_is_staff_only(self):
+        self.client.force_login(User.objects.create_user("clerk"))
+        self.assertEqual(self.client.get(reverse("shipment:instrumentation-report")).status_code, 403)
+
+
+class SyntheticDataBenchmarkTests(TestCase):
+    def test_generate_and_purge(self):
+        created = generate_synthetic_data(shipments=40, customers=5, parties=10, consoles=3, users=2, months=2)
+        self.assertEqual(created, 40)
+        shipments = synthetic_shipments()
+        self.assertEqual(shipments.count(), 40)
+        self.assertEqual(ShipmentSearchIndex.objects.filter(shipment__in=shipments).count(), 40)
+        self.assertTrue(Charge.objects.filter(shipment__in=shipments).exists())
+        charged = shipments.exclude(charges=None).first()
+        self.assertEqual(set(charged.charge_totals), set(charged.charges.values_list("currency", flat=True)))
+
+        real = Customer.objects.create(name="SYNERGY Trading")
+        self.assertEqual(purge_synthetic_data(), 40)
+        self.assertFalse(Shipment.objects.exists())
+        self.assertTrue(Customer.objects.filter(pk=real.pk).exists())
+        self.assertFalse(PolList.objects.exists())
+
+    def test_leaves_real_shipments_and_todays_refs_alone(self):
+        create_shipments(1, User.objects.create_user("sp"))
+        real = Shipment.objects.get()
+        Shipment.objects.filter(pk=real.pk).update(charge_totals={"USD": "1.00"}, charges_total_usd=1)
+
+        generate_synthetic_data(shipments=20, customers=3, parties=4, consoles=2, users=2, months=1)
+        real.refresh_from_db()
+        self.assertEqual(real.charge_totals, {"USD": "1.00"})
+        today = timezone.localdate()
+        self.assertFalse(synthetic_shipments().filter(ref__startswith=today.strftime("%y%m%d")).exists())
+        self.assertFalse(synthetic_shipments().filter(created_at__date__gte=today).exists())
+
+    @override_settings(DEBUG=False)
+    def test_commands_refuse_to_run_without_debug(self):
+        for command in ("generate_synthetic_data", "bench_suite", "bench_admin_load", "bench_write_amplification",
+                        "bench_import", "bench_search", "bench_api"):
+            with self.assertRaisesMessage(CommandError, "--force"):
+                call_command(command, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(Shipment.objects.exists())
+
+        call_command("generate_synthetic_data", shipments=5, customers=2, parties=2, consoles=1, months=1,
+                     force=True, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(synthetic_shipments().count(), 5)
+
+    def test_bench_import_leaves_nothing_behind(self):
+        customers = Customer.objects.count()
+        call_command("bench_import", rows=5, distinct=2, force=True, stdout=io.StringIO(), stderr=io.StringIO())
+        call_command("bench_import", rows=5, distinct=2, force=True, commit=True, day=date(2000, 1, 2),
+                     stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(Shipment.objects.exists())
+        self.assertFalse(RefCounter.objects.exists())
+        self.assertEqual(Customer.objects.count(), customers)
+        self.assertFalse(User.objects.filter(username__startswith="bench-").exists())
+        self.assertFalse(PolList.objects.exists())
+
+        stdout = io.StringIO()
+        call_command("bench_import", rows=5, distinct=2, force=True, commit=True, keep=True, stdout=stdout, stderr=io.StringIO())
+        self.assertIn("'new': 5", stdout.getvalue())
+        self.assertEqual(sorted(Shipment.objects.values_list("ref", flat=True))[0], "00010201")
+        self.assertEqual(list(RefCounter.objects.values_list("prefix", flat=True)), ["000102"])
+
+    def test_bench_suite_writes_comparable_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "bench.json")
+            options = {"shipments": 30, "rows": 10, "repeat": 1, "force": True,
+                       "stdout": io.StringIO(), "stderr": io.StringIO()}
+            call_command("bench_suite", output=output, **options)
+            with open(output) as f:
+                report = json.load(f)
+            self.assertIn("ref_allocation", report["benchmarks"])
+            self.assertIn("changelist:carrier", report["benchmarks"])
+            self.assertIn("import:new_10", report["benchmarks"])
+            self.assertEqual(set(report["benchmarks"]["invoice:batch_50_warm"]), {"median_ms", "min_ms", "max_ms", "queries"})
+
+            stdout = io.StringIO()
+            call_command("bench_suite", output=os.path.join(tmp, "second.json"), compare=output,
+                         only="manifest", **{**options, "stdout": stdout})
+            self.assertIn("manifest:batch_zip", stdout.getvalue().split("before")[-1])
+
+
+class BulkActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        create_shipments(5, cls.admin)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = reverse("admin:shipment_module_shipment_changelist")
+
+    def act(self, action, pks, **data):
+        return self.client.post(self.url, {"action": action, "index": 0, "_selected_action": pks, **data})
+
+    def test_confirm_is_one_update(self):
+        first, *rest = Shipment.objects.order_by("pk")
+        earlier = timezone.now() - timedelta(days=3)
+        Shipment.objects.filter(pk=first.pk).update(confirm_date=earlier)
+        pks = [s.pk for s in (first, *rest)]
+        stamps = dict(Shipment.objects.values_list("pk", "updated_at"))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.act("bulk_confirm", pks)
+        updates = [q["sql"] for q in queries if q["sql"].startswith('UPDATE "shipment_module_shipment"')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertFalse(Shipment.objects.filter(confirmed=False).exists())
+        self.assertEqual(Shipment.objects.get(pk=first.pk).confirm_date, earlier)
+        self.assertFalse(Shipment.objects.filter(confirm_date=None).exists())
+        for pk, updated_at in Shipment.objects.values_list("pk", "updated_at"):
+            self.assertGreater(updated_at, stamps[pk])
+
+    def test_field_actions_ask_for_the_value_first(self):
+        pks = list(Shipment.objects.values_list("pk", flat=True)[:3])
+        response = self.act("bulk_set_priority", pks)
+        self.assertTemplateUsed(response, "admin/shipment_module/bulk_update.html")
+        self.assertEqual(Shipment.objects.filter(priority="red").count(), 0)
+
+        self.act("bulk_set_priority", pks, apply="1", value="red")
+        self.assertEqual(set(Shipment.objects.filter(priority="red").values_list("pk", flat=True)), set(pks))
+
+    def test_carrier_and_operators(self):
+        shipment = Shipment.objects.first()
+        carrier = Carrier.objects.create(name="Bulkfreight")
+        self.act("bulk_assign_carrier", [shipment.pk], apply="1", value=carrier.pk)
+        shipment.refresh_from_db()
+        self.assertEqual(shipment.carrier, carrier)
+        self.assertIn("Bulkfreight", ShipmentSearchIndex.objects.get(shipment=shipment).document)
+
+        ops = [User.objects.create_user(f"op{i}") for i in range(2)]
+        shipment.operators.add(ops[0])
+        self.act("bulk_add_operators", [shipment.pk], apply="1", value=[u.pk for u in ops])
+        self.assertEqual(set(shipment.operators.all()), set(ops))
+
+
+class ConsolePlannerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        create_shipments(5, cls.admin)
+        cls.console = Console.objects.create(code="CON-1")
+        cls.other = Console.objects.create(code="CON-2")
+        lane = Shipment.objects.order_by("pk").first()
+        for i, shipment in enumerate(Shipment.objects.order_by("pk")):
+            shipment.console = cls.console
+            shipment.pol_id, shipment.pod_id = lane.pol_id, lane.pod_id
+            shipment.pcs, shipment.gw, shipment.cw, shipment.vol = "2", "100 kg", "120", "0.5 cbm"
+            if i == 3:
+                shipment.gw, shipment.cw = "2,000 kg", "2000"  # 20x the median
+            if i == 4:
+                shipment.vol = "n/a"
+            shipment.save()
+        first, second = Shipment.objects.order_by("pk")[:2]
+        Charge.objects.create(shipment=first, description="Freight", amount=Decimal("100"), currency="USD")
+        Charge.objects.create(shipment=second, description="Freight", amount=Decimal("50"), currency="USD")
+        Charge.objects.create(shipment=second, description="Handling", amount=Decimal("30"), currency="EUR")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = reverse("admin:shipment_module_console_planner", args=[self.console.pk])
+
+    def test_totals_and_outliers(self):
+        response = self.client.get(self.url)
+        summary = response.context["summary"]
+        self.assertEqual(summary["shipments"], 5)
+        self.assertEqual(summary["pcs_num"], 10)
+        self.assertEqual(summary["gw_kg"], 2400)
+        self.assertEqual(summary["cw_kg"], 2480)
+        self.assertEqual(summary["vol_cbm"], Decimal("2"))
+        self.assertEqual(summary["charges"], {"EUR": Decimal("30"), "USD": Decimal("150")})
+
+        flags = {row["ref"]: row["flags"] for row in response.context["rows"]}
+        heavy, unparsed = Shipment.objects.order_by("pk")[3:5]
+        self.assertTrue(any(flag.startswith("G.W 2000 kg") for flag in flags[heavy.ref]))
+        self.assertIn("VOL not a number", flags[unparsed.ref])
+        self.assertEqual(response.context["outliers"], 2)
+
+    def test_member_rows_do_not_add_queries(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        create_shipments(20, self.admin)
+        Shipment.objects.filter(console=None).update(console=self.console)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(self.url)
+        self.assertEqual(len(few), len(many))
+
+    def test_move_selected_shipments(self):
+        pks = list(Shipment.objects.order_by("pk").values_list("pk", flat=True)[:2])
+        self.client.post(self.url, {"shipments": pks, "value": self.other.pk})
+        self.assertEqual(set(Shipment.objects.filter(console=self.other).values_list("pk", flat=True)), set(pks))
+        self.assertEqual(Shipment.objects.filter(console=self.console).count(), 3)
+
+        # only members of the planner's console move; empty detaches them
+        self.client.post(self.url, {"shipments": pks, "value": ""})
+        self.assertEqual(Shipment.objects.filter(console=self.other).count(), 2)
+        other_url = reverse("admin:shipment_module_console_planner", args=[self.other.pk])
+        self.client.post(other_url, {"shipments": pks, "value": ""})
+        self.assertEqual(Shipment.objects.filter(console=None, pk__in=pks).count(), 2)
+
+    def test_changelist_counts_members(self):
+        response = self.client.get(reverse("admin:shipment_module_console_changelist"))
+        self.assertContains(response, self.url)
+        self.assertEqual(response.context["cl"].result_list.get(pk=self.console.pk).shipment_count, 5)
+
+    def test_count_is_only_annotated_on_the_changelist(self):
+        for url, params in (
+            (reverse("admin:shipment_module_console_change", args=[self.console.pk]), {}),
+            (self.url, {}),
+            (reverse("admin:autocomplete"), {
+                "app_label": "shipment_module", "model_name": "shipment", "field_name": "console", "term": "CON",
+            }),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url, params).status_code, 200)
+            self.assertFalse([q["sql"] for q in queries if "GROUP BY" in q["sql"]], url)
+
+    def test_non_numeric_selection_is_ignored(self):
+        pk = Shipment.objects.order_by("pk").values_list("pk", flat=True).first()
+        response = self.client.post(self.url, {"shipments": ["abc", "1 OR 1", str(pk)], "value": self.other.pk})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(Shipment.objects.filter(console=self.other).values_list("pk", flat=True)), [pk])
+
+        response = self.client.post(self.url, {"shipments": ["abc"], "value": self.other.pk}, follow=True)
+        self.assertContains(response, "Select the shipments to move.")
+
+
+class DatabaseConnectionSettingsTests(TestCase):
+    def test_sqlite_pragmas_applied_on_connect(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite only")
+        self.assertTrue(connection.settings_dict["CONN_HEALTH_CHECKS"])
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA temp_store")
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+
+class ShipmentDirtyFieldTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_shipments(1, User.objects.create_user("sp"))
+
+    def shipment_updates(self, queries):
+        return [q["sql"] for q in queries if q["sql"].startswith('UPDATE "shipment_module_shipment"')]
+
+    def test_save_writes_changed_and_derived_columns(self):
+        shipment = Shipment.objects.get()
+        shipment.confirmed = True
+        shipment.eta = date(2025, 1, 3)
+        shipment.etdw = date(2025, 1, 10)
+        with CaptureQueriesContext(connection) as queries:
+            shipment.save()
+        [sql] = self.shipment_updates(queries)
+        columns = sql.split(" SET ")[1].split(" WHERE ")[0]
+        for name in ("confirmed", "confirm_date", "eta", "etdw", "transit_time", "updated_at"):
+            self.assertIn(f'"{name}"', columns)
+        self.assertNotIn('"client_id"', columns)
+        self.assertEqual(Shipment.objects.values_list("transit_time", flat=True).get(), 7)
+
+    def test_explicit_update_fields_gain_their_derived_columns(self):
+        shipment = Shipment.objects.get()
+        shipment.gw = "1,200 kg"
+        shipment.priority = "red"
+        shipment.save(update_fields=["gw"])
+        stored = Shipment.objects.get()
+        self.assertEqual((stored.gw_kg, stored.priority), (Decimal("1200"), "green"))
+        self.assertEqual(shipment.get_dirty_fields(), ["priority"])
+
+
+@override_settings(REPLICA_DATABASE="replica")
+class ReplicaRouterTests(TransactionTestCase):
+    # routing decisions only; none of these touch the replica alias.  Not a
+    # TestCase: inside its transaction every read stays on the primary.
+    def test_reads_follow_the_context(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Shipment))
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Shipment), "replica")
+            self.assertEqual(pin_reads(Shipment.objects.all()).db, "replica")
+            with primary_reads():
+                self.assertIsNone(router.db_for_read(Shipment))
+            with transaction.atomic():
+                self.assertIsNone(router.db_for_read(Shipment))
+            self.assertEqual(router.db_for_write(Shipment), "default")
+
+    def test_ref_allocator_stays_on_primary(self):
+        with replica_reads():
+            self.assertEqual(len(RefCounter.objects.allocate(2)), 2)
+
+    def test_middleware_routes_read_views_until_a_write(self):
+        router = ReplicaRouter()
+        seen = []
+
+        def view(request):
+            seen.append(router.db_for_read(Shipment))
+            if request.method == "POST":
+                router.db_for_write(Shipment)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        factory = RequestFactory()
+        changelist = reverse("admin:shipment_module_shipment_changelist")
+        change = reverse("admin:shipment_module_shipment_change", args=[1])
+
+        middleware(factory.get(changelist))
+        middleware(factory.get(change))
+        response = middleware(factory.post(changelist))
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+        sticky = factory.get(changelist)
+        sticky.COOKIES[settings.REPLICA_STICKY_COOKIE] = "1"
+        middleware(sticky)
+        self.assertEqual(seen, ["replica", None, None, None])
+        self.assertIsNone(router.db_for_read(Shipment))
+
+
+@skipUnless(settings.REPLICA_DATABASE, "set DATABASE_REPLICA_NAME to run against a second SQLite file")
+class ReplicaReadYourWritesTests(TransactionTestCase):
+    # the replica test database is separate and never receives the primary's
+    # writes, so whichever database served a page shows in its rows
+    databases = {"default", settings.REPLICA_DATABASE} - {None}
+
+    def copy_to_replica(self, queryset):
+        queryset.model.objects.using("replica").bulk_create(list(queryset))
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.force_login(self.admin)
+        # what the replica would have replicated before the shipment is created
+        self.copy_to_replica(User.objects.all())
+        self.copy_to_replica(Session.objects.all())
+        Theme.objects.get_active()  # admin_interface creates its default theme on first use
+        self.copy_to_replica(Theme.objects.all())
+        create_shipments(1, self.admin)
+        self.url = reverse("admin:shipment_module_shipment_changelist")
+
+    def test_changelist_reads_replica_until_a_save(self):
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.get(self.url)
+        self.assertEqual(response.context["cl"].result_count, 0)
+        self.assertTrue(replica.captured_queries)
+
+        shipment = Shipment.objects.get()
+        response = self.client.post(self.url, {"action": "bulk_set_priority", "index": 0, "apply": "1",
+                                               "_selected_action": [shipment.pk], "value": "red"})
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.get(self.url)
+        self.assertEqual(response.context["cl"].result_count, 1)
+        self.assertFalse(replica.captured_queries)
+
+    def test_lagging_replica_results_are_not_cached(self):
+        cache.clear()
+        shipment = Shipment.objects.select_related("client").get()
+        # the replica has not seen the shipment yet: count and facets come out empty
+        response = self.client.get(self.url)
+        self.assertEqual(response.context["cl"].result_count, 0)
+
+        # a browser that just wrote reads the primary; nothing stale was cached for it
+        self.client.cookies[settings.REPLICA_STICKY_COOKIE] = "1"
+        response = self.client.get(self.url)
+        self.assertEqual(response.context["cl"].result_count, 1)
+        self.assertContains(response, f"{shipment.client.name} (1)")
+
+        # what the primary computed is shared with replica readers
+        del self.client.cookies[settings.REPLICA_STICKY_COOKIE]
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.get(self.url)
+        self.assertEqual(response.context["cl"].result_count, 1)
+        self.assertFalse([q["sql"] for q in replica.captured_queries if "COUNT(" in q["sql"]])
+
+    def test_invoice_rendered_from_a_lagging_replica_is_not_cached(self):
+        cache.clear()
+        shipment = Shipment.objects.get()
+        for model in (Customer, PolList, PodList, TermList, Carrier, Agent, Console, Shipment):
+            self.copy_to_replica(model.objects.all())
+        # bulk_create stamped auto_now; replicated rows keep the primary's
+        Shipment.objects.using("replica").update(updated_at=shipment.updated_at)
+        client = shipment.client
+        old_name = client.name
+        client.name = "Renamed Trading"
+        client.save()
+
+        url = reverse("shipment:invoice-detail", args=[shipment.pk])
+        self.assertContains(self.client.get(url), old_name)
+        self.client.cookies[settings.REPLICA_STICKY_COOKIE] = "1"
+        self.assertContains(self.client.get(url), "Renamed Trading")
 
-# Create your tests here.
@@ -0,0 +1,112 @@
+from decimal import Decimal
+from itertools import groupby
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Charge, Shipment
+
+
+TOTALS_CHUNK_SIZE = 1000
+CENT = Decimal("0.01")
+
+
+# -------------------------------
+# Charge totals
+# -------------------------------
+# Shipment.charge_totals holds the sum of its Charge rows per currency and
+# Shipment.charges_total_usd their USD value (CHARGE_USD_RATES), so reports
+# read totals straight off the shipment row.
+def usd_rates():
+    rates = getattr(settings, "CHARGE_USD_RATES", {"USD": 1})
+    return {currency.upper(): Decimal(str(rate)) for currency, rate in rates.items()}
+
+
+def normalize_currency(currency):
+    return (currency or "USD").strip().upper()
+
+
+def build_totals(rows, rates=None):
+    """
+    (currency, amount) rows -> ({"USD": "10.00", ...}, usd_total).
+    usd_total is None when a currency has no rate, rather than a partial sum.
+    """
+    rates = usd_rates() if rates is None else rates
+    per_currency = {}
+    for currency, amount in rows:
+        currency = normalize_currency(currency)
+        per_currency[currency] = per_currency.get(currency, Decimal(0)) + (amount or Decimal(0))
+
+    usd_total = Decimal(0)
+    for currency, amount in per_currency.items():
+        if currency not in rates:
+            usd_total = None
+            break
+        usd_total += amount * rates[currency]
+    if usd_total is not None:
+        usd_total = usd_total.quantize(CENT)
+
+    return {currency: str(amount.quantize(CENT)) for currency, amount in sorted(per_currency.items())}, usd_total
+
+
+def grouped_totals(charges, rates=None):
+    """
+    One GROUP BY (shipment, currency) over `charges`; yields
+    (shipment_id, per_currency, usd_total) in shipment order.
+    """
+    rows = (
+        charges.order_by("shipment_id", "currency")
+        .values_list("shipment_id", "currency")
+        .annotate(total=Sum("amount"))
+        .iterator(chunk_size=TOTALS_CHUNK_SIZE)
+    )
+    rates = usd_rates() if rates is None else rates
+    for shipment_id, group in groupby(rows, key=lambda row: row[0]):
+        per_currency, usd_total = build_totals(((currency, total) for _, currency, total in group), rates)
+        yield shipment_id, per_currency, usd_total
+
+
+def refresh_charge_totals(shipment_id):
+    """Recompute one shipment's totals with a single aggregate query."""
+    rows = (
+        Charge.objects.filter(shipment_id=shipment_id)
+        .order_by()
+        .values_list("currency")
+        .annotate(total=Sum("amount"))
+    )
+    per_currency, usd_total = build_totals(rows)
+    # update() skips Shipment.save() and its signals; only the totals changed
+    Shipment.objects.filter(pk=shipment_id).update(
+        charge_totals=per_currency, charges_total_usd=usd_total, updated_at=timezone.now()
+    )
+
+
+def rebuild_charge_totals(shipment_model=Shipment, charge_model=Charge, shipments=None):
+    """
+    Rebuild the totals of `shipments` (a queryset; every shipment when None)
+    from one GROUP BY; those without charges are reset by a single UPDATE.
+    Returns the number of shipments with charges.  Also used by the
+    migration with historical models.
+    """
+    if shipments is None:
+        shipments = shipment_model.objects.all()
+        charges = charge_model.objects.all()
+    else:
+        charges = charge_model.objects.filter(shipment__in=shipments.values("pk"))
+    shipments.exclude(
+        pk__in=charge_model.objects.values("shipment_id")
+    ).update(charge_totals={}, charges_total_usd=None)
+
+    updated = 0
+    batch = []
+    for shipment_id, per_currency, usd_total in grouped_totals(charges):
+        batch.append(shipment_model(pk=shipment_id, charge_totals=per_currency, charges_total_usd=usd_total))
+        if len(batch) >= TOTALS_CHUNK_SIZE:
+            shipment_model.objects.bulk_update(batch, ["charge_totals", "charges_total_usd"])
+            updated += len(batch)
+            batch = []
+    if batch:
+        shipment_model.objects.bulk_update(batch, ["charge_totals", "charges_total_usd"])
+        updated += len(batch)
+    return updated
@@ -1,10 +1,17 @@
 from django.urls import path
-from .views import InvoiceViewDetail, main_view, ManifestView
+from .views import ChangeFeedView, InstrumentationReportView, ShipmentListAPIView, InvoiceViewDetail, InvoiceBatchView, main_view, ManifestView, ManifestBatchView
 
 app_name = "shipment"
 urlpatterns = [
     path("", main_view, name='main'),
 
-    path("shipment/invoice/<pk>", InvoiceViewDetail.as_view(), name="invoice-detail"),
+    path("shipment/invoice/batch/", InvoiceBatchView.as_view(), name="invoice-batch"),
+    path("shipment/invoice/<int:pk>", InvoiceViewDetail.as_view(), name="invoice-detail"),
     path("shipment/manifest/<int:pk>/", ManifestView.as_view(), name="manifest-detail"),
+    path("shipment/manifest/batch/", ManifestBatchView.as_view(), name="manifest-batch"),
+
+    path("api/shipments/", ShipmentListAPIView.as_view(), name="api-shipment-list"),
+    path("api/changes/", ChangeFeedView.as_view(), name="api-change-feed"),
+
+    path("shipment/instrumentation/", InstrumentationReportView.as_view(), name="instrumentation-report"),
 ]
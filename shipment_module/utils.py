@@ -1,2 +1,74 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+# ---------------------------
+# SMS gateways
+# ---------------------------
+class SmsGatewayError(Exception):
+    """A send that may succeed when retried later."""
+
+
+class BaseSmsGateway:
+    """
+    Gateways implement send(); send_batch() may be overridden when the
+    provider accepts several messages per request.
+    """
+
+    def send(self, recipient_number, message):
+        raise NotImplementedError
+
+    def send_batch(self, messages):
+        """
+        Send (recipient, message) pairs; returns one error (or None) per pair.
+        """
+        errors = []
+        for recipient_number, message in messages:
+            try:
+                self.send(recipient_number, message)
+            except Exception as exc:
+                errors.append(exc)
+            else:
+                errors.append(None)
+        return errors
+
+
+class ConsoleSmsGateway(BaseSmsGateway):
+    def send(self, recipient_number, message):
+        print(f" Sending SMS to {recipient_number}: {message}")
+
+
+class LocmemSmsGateway(BaseSmsGateway):
+    """In-process gateway for tests; sent messages are kept in `outbox`."""
+    outbox = []
+    # recipients whose sends raise SmsGatewayError
+    failing = set()
+
+    def send(self, recipient_number, message):
+        if recipient_number in self.failing:
+            raise SmsGatewayError(f"gateway rejected {recipient_number}")
+        self.outbox.append((recipient_number, message))
+
+
+def get_sms_gateway():
+    path = getattr(settings, "SMS_GATEWAY", "shipment_module.utils.ConsoleSmsGateway")
+    return import_string(path)()
+
+
 def send_sms(recipient_number: str, message: str):
-    print(f" Sending SMS to {recipient_number}: {message}")
+    # Sends immediately; request code should queue with OutboundMessage.objects.enqueue()
+    get_sms_gateway().send(recipient_number, message)
+
+
+class QueryCounter:
+    """
+    Counts the queries run on a connection; use with connection.execute_wrapper().
+    Unlike CaptureQueriesContext it is not capped by the 9000-entry queries_log.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
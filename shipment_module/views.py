@@ -1,158 +1,161 @@
-from django.http import HttpResponse
-from django.shortcuts import redirect
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.views import View
 from django.views.generic import DetailView
-from django.contrib.auth.mixins import LoginRequiredMixin
-from .models import Shipment
+from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin, UserPassesTestMixin
+from django.template.response import TemplateResponse
+from .api import list_filter_fields, parse_limit, render_page, shipment_page
+from .changefeed import decode_cursor, iter_changes, iter_ndjson
+from .instrumentation import reset_report, view_report
+from .invoices import invoice_page, invoice_queryset
+from .manifest import batch_manifest_response, manifest_queryset, manifest_response
+from .models import Console, Shipment
 
 # Create your views here.
 def main_view(request):
     return redirect('/admin/')
 
 
-class InvoiceViewDetail(DetailView, LoginRequiredMixin):
+class InvoiceViewDetail(LoginRequiredMixin, DetailView):
     model = Shipment
     template_name = 'shipment/invoice_detail.html'
 
+    def get_queryset(self):
+        return invoice_queryset(super().get_queryset())
+
+    def render_to_response(self, context, **kwargs):
+        return HttpResponse(invoice_page([self.object], self.request))
+
+
+class ShipmentBatchMixin:
+    """
+    Shipments picked by ?ids=1,2,3 or ?console=<console id>.
+    """
+
+    def get_batch(self, request):
+        """Returns (queryset, filename stem), or None when neither parameter is valid."""
+        ids = [i for i in request.GET.get("ids", "").split(",") if i.strip().isdigit()]
+        console_id = request.GET.get("console", "")
+
+        if ids:
+            return Shipment.objects.filter(pk__in=ids), None
+        if console_id.isdigit():
+            console = get_object_or_404(Console, pk=console_id)
+            return Shipment.objects.filter(console=console), str(console.code or console.pk)
+        return None
+
+
+class InvoiceBatchView(PermissionRequiredMixin, ShipmentBatchMixin, View):
+    """
+    Printable invoices of many shipments in one page (one select_related query).
+    """
+    permission_required = "shipment_module.view_shipment"
+
+    def get(self, request, *args, **kwargs):
+        batch = self.get_batch(request)
+        if batch is None:
+            return HttpResponseBadRequest("Pass ids=<id,id,...> or console=<id>.")
+        shipments = invoice_queryset(batch[0]).order_by("ref", "pk")
+        return HttpResponse(invoice_page(shipments, request))
+
 
 class ManifestView(LoginRequiredMixin, DetailView):
     model = Shipment
 
+    def get_queryset(self):
+        return manifest_queryset(super().get_queryset())
+
     def render_to_response(self, context, **kwargs):
-        shipment = self.get_object()
-
-        lines = [
-            self.build_voy_line(shipment),
-            self.build_bol_line(shipment),
-            self.build_ctr_line(shipment),
-            self.build_con_line(shipment),
-        ]
-
-        # exact CSV-style output with quotes
-        content = "\n".join(
-            ['"' + '","'.join(str(v or "") for v in line) + '"' for line in lines]
-        )
-
-        response = HttpResponse(content, content_type="text/plain; charset=utf-8")
-        response["Content-Disposition"] = (
-            f'attachment; filename="Manifest_{shipment.ref or shipment.pk}.txt"'
-        )
+        return manifest_response(self.object)
+
+
+class ManifestBatchView(PermissionRequiredMixin, ShipmentBatchMixin, View):
+    """
+    Manifests of many shipments in one download:
+    ?ids=1,2,3 or ?console=<console id>, plus &format=zip for one file per shipment.
+    """
+    permission_required = "shipment_module.view_shipment"
+
+    def get(self, request, *args, **kwargs):
+        batch = self.get_batch(request)
+        if batch is None:
+            return HttpResponseBadRequest("Pass ids=<id,id,...> or console=<id>.")
+        queryset, console = batch
+        filename = f"Manifests_{console}" if console else "Manifests"
+        return batch_manifest_response(queryset, as_zip=request.GET.get("format") == "zip", filename=filename)
+
+
+class ShipmentListAPIView(PermissionRequiredMixin, View):
+    """
+    Read-only JSON listing for integrations, newest first:
+    ?fields=ref,client,eta  &limit=100  &cursor=<next from the previous page>
+    plus the ShipmentAdmin.list_filter filters (see api.build_filters).
+    Responses carry an ETag; a matching If-None-Match gets 304.
+    """
+    permission_required = "shipment_module.view_shipment"
+    raise_exception = True
+
+    def get(self, request, *args, **kwargs):
+        filter_fields = list_filter_fields(admin.site._registry[Shipment].list_filter)
+        try:
+            page = shipment_page(request.GET, filter_fields)
+        except ValidationError as exc:
+            return JsonResponse({"error": exc.messages}, status=400)
+
+        body, etag = render_page(page)
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
         return response
 
-    # =========================
-    # VOY
-    # =========================
-    def build_voy_line(self, shipment):
-        flight_1, flight_2 = self.get_flights(shipment)
-        
-        return [
-            "VOY",
-            shipment.cnee.national_id or "",
-            shipment.carrier.national_id or "",
-            flight_1, #1?
-            flight_2, #1?
-            #2?
-            self.format_date(shipment.eta) or "",
-            "",
-            "MFI",
-            "1",
-            shipment.manifest_no or "",
-        ]
-
-    # =========================
-    # BOL
-    # =========================
-    def build_bol_line(self, shipment):
-
-        return [
-            "BOL",
-            shipment.hawb or "",
-            "10102122004", "10102122004",
-            shipment.pol.airport_abbr or "",              
-            shipment.pol.airport_abbr or "",
-            #2?
-            self.format_date(shipment.eta) or "",
-            "",
-            "I",
-            "S",
-            "", "",
-            "G",
-            "N","Y","FCL/FCL",
-            shipment.pol.country_abbr or "",
-            "","","","",
-            shipment.mawb or "",
-            "", "",
-            shipment.shipper.name or "",
-            shipment.pol.country_name or "",
-            "",
-            shipment.cnee.national_id or "",
-            shipment.cnee or "",
-            "","","","","","","","","","NM",
-            shipment.hscode or "",
-            shipment.commodity or "",
-            shipment.pcs or "",
-            "CTN",
-            "CTN",
-            "BULK1234567", #12?
-            "1","1","0","1",
-            shipment.gw or "",
-            shipment.gw or "",
-            "0","0","0","0","Y","",""
-        ]
-
-    # =========================
-    # CTR
-    # =========================
-    def build_ctr_line(self, shipment):
-        return [
-            "CTR",
-            "BULK1234567", #12?
-            "1",
-            "1",
-            "1",
-        ]
-
-    # =========================
-    # CON
-    # =========================
-    def build_con_line(self, shipment):
-        return [
-            "CON",
-            shipment.manifest_no or "",
-            "NM",
-            shipment.commodity or "",
-            "N",
-            shipment.hscode or "",
-            shipment.pcs or "",
-            "CTN",
-            "CTN",
-            shipment.pcs or "",
-            shipment.gw or "",
-            shipment.vol or "",
-            "N",
-            "",
-            "",
-            "0",
-            "C",
-            "D",
-            "N",
-            "0",
-            "0",
-            "C",
-        ]
-
-    # =========================
-    # Helpers
-    # =========================
-    def get_flights(self, shipment):
-        """
-        Flights are derived, not stored.
-        Adjust logic later if needed.
-        """
-        if shipment.mode and shipment.mode.startswith("air"):
-            return ("EK9873", "EK9873")
-        return ("", "")
-
-    def format_date(self, date_obj):
-        if not date_obj:
-            return ""
-        return date_obj.strftime("%d%b%Y").upper()
\ No newline at end of file
+
+class ChangeFeedView(PermissionRequiredMixin, View):
+    """
+    NDJSON stream of the shipments, charges, comments and deletions changed
+    since ?cursor= (everything when omitted), oldest first.  Cursor lines are
+    interleaved after every chunk; store the last one and pass it next time.
+    ?limit= caps the rows per stream.
+    """
+    permission_required = "shipment_module.view_shipment"
+    raise_exception = True
+
+    def get(self, request, *args, **kwargs):
+        cursor = request.GET.get("cursor", "")
+        try:
+            decode_cursor(cursor)
+            limit = parse_limit(request.GET.get("limit")) if request.GET.get("limit") else None
+        except ValidationError as exc:
+            return JsonResponse({"error": exc.messages}, status=400)
+        changes = iter_changes(cursor, limit=limit)
+        return StreamingHttpResponse(iter_ndjson(changes), content_type="application/x-ndjson")
+
+
+class InstrumentationReportView(UserPassesTestMixin, View):
+    """
+    Staff-only totals of InstrumentationMiddleware: per view time, queries,
+    SQL time and the statements repeated within one request (likely N+1).
+    POST resets the counters.
+    """
+
+    def test_func(self):
+        return self.request.user.is_active and self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        context = {
+            **admin.site.each_context(request),
+            "title": "Request instrumentation",
+            "rows": view_report(),
+            "enabled": settings.INSTRUMENTATION_ENABLED,
+            "threshold": settings.INSTRUMENTATION_DUPLICATE_THRESHOLD,
+        }
+        return TemplateResponse(request, "shipment/instrumentation_report.html", context)
+
+    def post(self, request, *args, **kwargs):
+        reset_report()
+        return redirect("shipment:instrumentation-report")